@@ -3,16 +3,22 @@
 # Intent Parser Agent 
 # --------------------------------------------------
 
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Literal, Any
+from datetime import datetime
+from typing import Optional, List, Dict, Literal, Any, Union
 from pydantic import BaseModel, Field
 import os
 import re
+import threading
 from dotenv import load_dotenv
 
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from llm_response_cache import acached_llm_call, cached_llm_call
+from reason_classifier import classify_reason
+from date_grammar import WEEKDAY_MAP, next_weekday, parse_dates
+from session_store import SessionStore
+
 # ==================================================
 # CONFIG
 # ==================================================
@@ -33,14 +39,14 @@ CANONICAL_REASONS = [
     "Other",
 ]
 
-# import logging
+import logging
 
-# logging.basicConfig(
-#     level=logging.INFO,
-#     format="%(asctime)s | %(levelname)s | %(message)s"
-# )
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
 
-# logger = logging.getLogger("intent-parser")
+logger = logging.getLogger("intent-parser")
 
 # ==================================================
 # SCHEMAS
@@ -137,87 +143,117 @@ def calculate_duration(start_iso: str, end_iso: str) -> int:
     return (end - start).days + 1
 
 
-WEEKDAY_MAP = {
-    "monday": 0,
-    "tuesday": 1,
-    "wednesday": 2,
-    "thursday": 3,
-    "friday": 4,
-    "saturday": 5,
-    "sunday": 6,
+def parse_human_date_range(text: str, reference: datetime):
+    """
+    (start, end) ISO dates found by the date grammar, or (None, None) when
+    there are none, they are too ambiguous, or the message has words the
+    grammar did not account for ("extend", "sick", ...) that may change
+    what the dates mean; the LLM's dates stand then.
+    """
+    parsed = parse_dates(text, reference)
+    if parsed.confident and not parsed.unparsed:
+        return parsed.start_date, parsed.end_date
+
+    return None, None
+
+# ==================================================
+# FAST PATH (NO LLM)
+# ==================================================
+
+CONFIRM_YES = {
+    "yes", "y", "yeah", "yep", "yup", "ok", "okay", "confirm", "confirmed",
+    "correct", "sure", "yes please", "go ahead", "looks good",
+}
+CONFIRM_NO = {"no", "n", "nope", "nah", "change", "not correct", "incorrect", "wrong"}
+CANCEL_WORDS = {
+    "cancel", "cancel it", "cancel leave", "cancel my leave", "stop",
+    "never mind", "nevermind", "forget it", "dont apply", "don't apply",
 }
 
+# Whole-message replies that map to exactly one reason
+REASON_REPLIES = {reason.lower(): reason for reason in CANONICAL_REASONS}
+REASON_REPLIES.update({
+    "sick": "Sickness for Self",
+    "i am sick": "Sickness for Self",
+    "i'm sick": "Sickness for Self",
+    "unwell": "Sickness for Self",
+    "not well": "Sickness for Self",
+    "fever": "Sickness for Self",
+    "wedding": "Family function",
+    "marriage": "Family function",
+    "outstation": "Going Outstation",
+    "out of station": "Going Outstation",
+    "travel": "Going Outstation",
+    "travelling": "Going Outstation",
+})
 
-def next_weekday(reference: datetime, weekday: int) -> datetime:
-    """Return next occurrence of a weekday"""
-    days_ahead = weekday - reference.weekday()
-    if days_ahead <= 0:
-        days_ahead += 7
-    return reference + timedelta(days=days_ahead)
+# Longer reason replies go to the LLM (they often carry dates or changes too)
+REASON_REPLY_MAX_WORDS = 12
 
+ROUTER_STATS = {"llm_calls": 0, "llm_avoided": 0, "confirmation": 0, "cancellation": 0, "date": 0, "reason": 0}
+_stats_lock = threading.Lock()
 
-def parse_human_date_range(text: str, reference: datetime):
-    t = text.lower().strip()
-
-    start = None
-    end = None
-
-    # --------------------------------------------------
-    # RANGE EXPRESSIONS: "from X to Y"
-    # --------------------------------------------------
-    if "from" in t and "to" in t:
-
-        if "tomorrow" in t:
-            start = reference + timedelta(days=1)
-
-        if "day after tomorrow" in t:
-            end = reference + timedelta(days=2)
-
-        if "today" in t:
-            start = reference
-
-    # --------------------------------------------------
-    # SINGLE RELATIVE DAYS (only if range not detected)
-    # --------------------------------------------------
-    if start is None and end is None:
-
-        if "day after tomorrow" in t:
-            start = reference + timedelta(days=2)
-            end = start
-
-        elif "tomorrow" in t:
-            start = reference + timedelta(days=1)
-            end = start
-
-        elif "today" in t:
-            start = reference
-            end = start
-
-    # --------------------------------------------------
-    # DURATION: next / upcoming N days
-    # --------------------------------------------------
-    m = re.search(r"(next|upcoming)\s+(\d+)\s+days", t)
-    if m:
-        days = int(m.group(2))
-        start = reference
-        end = reference + timedelta(days=days - 1)
-
-    m = re.search(r"for\s+(\d+)\s+days", t)
-    if m:
-        days = int(m.group(1))
-        start = reference
-        end = reference + timedelta(days=days - 1)
-
-    # --------------------------------------------------
-    # FINAL SAFETY
-    # --------------------------------------------------
-    if start and not end:
-        end = start
-
-    if start and end:
-        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
 
-    return None, None
+def _count(*names: str):
+    with _stats_lock:
+        for name in names:
+            ROUTER_STATS[name] += 1
+
+
+def _normalize_reply(text: str) -> str:
+    t = re.sub(r"[^\w\s'-]", " ", text.lower())
+    return " ".join(t.split())
+
+
+def route_without_llm(text: str, state: LeaveState, reference: Optional[datetime] = None) -> Optional[ExtractionResult]:
+    """
+    Resolve a short reply to a pending question locally.
+    Only used while the bot waits for a field or a confirmation; returns
+    None when the message needs the LLM.
+    """
+    awaiting_confirmation = state.parsing_status == "needs_confirmation" and not state.preview_confirmed
+    if not (state.awaiting_field or awaiting_confirmation):
+        return None
+
+    reply = _normalize_reply(text)
+
+    if reply in CANCEL_WORDS:
+        _count("llm_avoided", "cancellation")
+        return ExtractionResult(intent_type="cancel_leave")
+
+    if awaiting_confirmation:
+        if reply in CONFIRM_YES:
+            _count("llm_avoided", "confirmation")
+            return ExtractionResult(confirmation="yes")
+        if reply in CONFIRM_NO:
+            _count("llm_avoided", "confirmation")
+            return ExtractionResult(confirmation="no")
+        return None
+
+    if state.awaiting_field in {"start_date", "end_date"}:
+        # Nothing but dates, and unambiguous ones
+        parsed = parse_dates(text, reference or datetime.now())
+        if parsed.confident and not parsed.unparsed:
+            _count("llm_avoided", "date")
+            return ExtractionResult(start_date=parsed.start_date, end_date=parsed.end_date)
+
+    if state.awaiting_field == "reason":
+        reason = REASON_REPLIES.get(reply)
+        if reason is None and _is_reason_only(reply, reference):
+            reason = classify_reason(reply)
+        if reason:
+            _count("llm_avoided", "reason")
+            return ExtractionResult(reason=reason)
+
+    return None
+
+
+def _is_reason_only(reply: str, reference: Optional[datetime] = None) -> bool:
+    """A short reply with no dates or numbers, e.g. "my mom is unwell"."""
+    if not reply or len(reply.split()) > REASON_REPLY_MAX_WORDS or re.search(r"\d", reply):
+        return False
+    parsed = parse_dates(reply, reference or datetime.now())
+    return parsed.start_date is None and parsed.end_date is None
 
 # ==================================================
 # INTENT EXTRACTION (LLM)
@@ -333,18 +369,23 @@ prompt = ChatPromptTemplate.from_messages([
 ])
 
 
-def extract_intent(text: str) -> ExtractionResult:
-    structured_llm = llm.with_structured_output(ExtractionResult)
-    chain = prompt | structured_llm
+# Compiled once; with_structured_output() builds the schema on every call
+structured_llm = llm.with_structured_output(ExtractionResult)
+extraction_chain = prompt | structured_llm
 
-    now = datetime.now()
-    current_date = now.strftime("%Y-%m-%d")
 
-    result = chain.invoke({"input": text, "current_date": current_date})
+def _extraction_messages(text: str, current_date: str) -> List[Dict[str, str]]:
+    """Rendered prompt, used as the response cache key."""
+    return [
+        {"role": m.type, "content": m.content}
+        for m in prompt.format_messages(input=text, current_date=current_date)
+    ]
 
-    # ─────────────────────────────────────
-    # HARD DATE NORMALIZATION (FINAL AUTHORITY)
-    # ─────────────────────────────────────
+
+def _normalize_dates(result: ExtractionResult, text: str, now: datetime) -> ExtractionResult:
+    """
+    HARD DATE NORMALIZATION (FINAL AUTHORITY)
+    """
     start, end = parse_human_date_range(text, now)
 
     if start:
@@ -354,6 +395,38 @@ def extract_intent(text: str) -> ExtractionResult:
     return result
 
 
+def extract_intent(text: str) -> ExtractionResult:
+    now = datetime.now()
+    current_date = now.strftime("%Y-%m-%d")
+
+    # Shared response cache: same prompt + message + date → same extraction
+    cached = cached_llm_call(
+        OPENAI_MODEL,
+        _extraction_messages(text, current_date),
+        {"temperature": 0, "structured_output": ExtractionResult.__name__},
+        lambda: extraction_chain.invoke({"input": text, "current_date": current_date}).dict()
+    )
+    return _normalize_dates(ExtractionResult(**cached), text, now)
+
+
+async def aextract_intent(text: str) -> ExtractionResult:
+    """Async extract_intent(); the LLM call does not block a thread."""
+    now = datetime.now()
+    current_date = now.strftime("%Y-%m-%d")
+
+    async def call():
+        result = await extraction_chain.ainvoke({"input": text, "current_date": current_date})
+        return result.dict()
+
+    cached = await acached_llm_call(
+        OPENAI_MODEL,
+        _extraction_messages(text, current_date),
+        {"temperature": 0, "structured_output": ExtractionResult.__name__},
+        call
+    )
+    return _normalize_dates(ExtractionResult(**cached), text, now)
+
+
 
 # ==================================================
 # BUSINESS VALIDATION
@@ -453,23 +526,13 @@ def validate_state(state: LeaveState) -> LeaveState:
 # MAIN FUNCTION FOR LANGGRAPH
 # ==================================================
 
-def parse_intent_and_dates(
+def _load_state(
     user_message: str,
     login_response: Dict[str, Any],
-    current_state: Optional[Dict[str, Any]] = None
-) -> Dict[str, Any]:
-    """
-    Main function to parse intent and dates for LangGraph integration.
-    
-    Args:
-        user_message: The user's input message
-        login_response: Full login response from common login API
-        current_state: Current state from LangGraph (optional)
-        
-    Returns:
-        Dictionary containing updated state
-    """
-    
+    current_state: Optional[Union[Dict[str, Any], LeaveState]]
+) -> LeaveState:
+    """Start of a turn: load (or create) the state and refresh session info."""
+
     # Extract session info from login response
     session_id = login_response.get("session_id")
     empCode = login_response.get("empCode")
@@ -479,8 +542,10 @@ def parse_intent_and_dates(
     
     logger.info(f"Session={session_id} | User={username} | Message={user_message}")
     
-    # Initialize or load state from LangGraph
-    if current_state:
+    # Initialize or load state from LangGraph (or the session store)
+    if isinstance(current_state, LeaveState):
+        state = current_state
+    elif current_state:
         state = LeaveState(**current_state)
     else:
         state = LeaveState(
@@ -500,8 +565,128 @@ def parse_intent_and_dates(
     if not state.application_date:
         state.application_date = application_date
 
-    # Extract intent using LLM
-    extracted = extract_intent(user_message)
+    return state
+
+
+def parse_intent_and_dates(
+    user_message: str,
+    login_response: Dict[str, Any],
+    current_state: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Main function to parse intent and dates for LangGraph integration.
+    
+    Args:
+        user_message: The user's input message
+        login_response: Full login response from common login API
+        current_state: Current state from LangGraph (optional)
+        
+    Returns:
+        Dictionary containing updated state
+    """
+    state = _load_state(user_message, login_response, current_state)
+
+    # Short replies to a pending question skip the LLM
+    extracted = route_without_llm(user_message, state)
+    if extracted is None:
+        _count("llm_calls")
+        extracted = extract_intent(user_message)
+
+    return apply_extraction(state, extracted, user_message).dict()
+
+
+async def aparse_intent_and_dates(
+    user_message: str,
+    login_response: Dict[str, Any],
+    current_state: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Async parse_intent_and_dates(); awaits the LLM instead of blocking."""
+    state = _load_state(user_message, login_response, current_state)
+
+    extracted = route_without_llm(user_message, state)
+    if extracted is None:
+        _count("llm_calls")
+        extracted = await aextract_intent(user_message)
+
+    return apply_extraction(state, extracted, user_message).dict()
+
+
+# ==================================================
+# SERVER-SIDE SESSIONS
+# ==================================================
+#
+# parse_session_turn() keeps the LeaveState in `leave_sessions` keyed by
+# session_id; the caller sends only the message and gets back the fields
+# that changed this turn (chat_response and parsing_status always included).
+
+leave_sessions = SessionStore("a1:leave_state", model=LeaveState)
+
+
+def _begin_session_turn(user_message: str, login_response: Dict[str, Any]):
+    session_id = login_response.get("session_id")
+    if not session_id:
+        raise ValueError("login_response has no session_id")
+
+    stored = leave_sessions.get(session_id)
+    before = stored.dict() if stored is not None else {}
+    return session_id, before, _load_state(user_message, login_response, stored)
+
+
+def _finish_session_turn(session_id: str, before: Dict[str, Any], state: LeaveState, result: LeaveState) -> Dict[str, Any]:
+    after = result.dict()
+    changes = {k: v for k, v in after.items() if k not in before or before[k] != v}
+
+    if result.parsing_status == "cancelled":
+        leave_sessions.delete(session_id)
+    elif before and result is state:
+        leave_sessions.update(session_id, result, changes)
+    else:
+        leave_sessions.put(session_id, result)
+
+    changes["chat_response"] = result.chat_response
+    changes["parsing_status"] = result.parsing_status
+    return changes
+
+
+def parse_session_turn(user_message: str, login_response: Dict[str, Any]) -> Dict[str, Any]:
+    """parse_intent_and_dates() against the stored session; returns the changed fields."""
+    session_id, before, state = _begin_session_turn(user_message, login_response)
+
+    extracted = route_without_llm(user_message, state)
+    if extracted is None:
+        _count("llm_calls")
+        extracted = extract_intent(user_message)
+
+    return _finish_session_turn(session_id, before, state, apply_extraction(state, extracted, user_message))
+
+
+async def aparse_session_turn(user_message: str, login_response: Dict[str, Any]) -> Dict[str, Any]:
+    """Async parse_session_turn()."""
+    session_id, before, state = _begin_session_turn(user_message, login_response)
+
+    extracted = route_without_llm(user_message, state)
+    if extracted is None:
+        _count("llm_calls")
+        extracted = await aextract_intent(user_message)
+
+    return _finish_session_turn(session_id, before, state, apply_extraction(state, extracted, user_message))
+
+
+def get_session_state(session_id: str) -> Optional[Dict[str, Any]]:
+    """Full LeaveState of a session, e.g. to hand over to the next agent."""
+    state = leave_sessions.get(session_id)
+    return state.dict() if state is not None else None
+
+
+def end_session(session_id: str):
+    leave_sessions.delete(session_id)
+
+
+def apply_extraction(state: LeaveState, extracted: ExtractionResult, user_message: str) -> LeaveState:
+    """
+    Rest of the turn, shared by the sync and async entry points:
+    fold one extraction into the state and validate it.
+    """
     logger.info(f"Extracted: {extracted.dict()}")
     
     # ─────────────────────────────────────────────
@@ -512,12 +697,12 @@ def parse_intent_and_dates(
             intent_type="cancel_leave",
             parsing_status="cancelled",
             chat_response="Leave application cancelled. Feel free to start over whenever you'd like.",
-            session_id=session_id,
-            empCode=empCode,
-            username=username,
-            application_date=application_date
+            session_id=state.session_id,
+            empCode=state.empCode,
+            username=state.username,
+            application_date=datetime.now().strftime("%Y-%m-%d")
         )
-        return cancelled_state.dict()
+        return cancelled_state
 
     # ─────────────────────────────────────────────
     # SET INTENT TYPE (apply_leave or update_leave)
@@ -530,11 +715,11 @@ def parse_intent_and_dates(
     
     # FALLBACK: If LLM missed confirmation, check manually
     if extracted.confirmation is None and state.parsing_status == "needs_confirmation":
-        msg_lower = user_message.strip().lower()
-        if msg_lower in ["yes", "yeah", "yep", "ok", "okay", "confirm", "correct", "sure"]:
+        msg_lower = _normalize_reply(user_message)
+        if msg_lower in CONFIRM_YES:
             extracted.confirmation = "yes"
             logger.info("FALLBACK: Detected 'yes' confirmation manually")
-        elif msg_lower in ["no", "nope", "nah", "change"]:
+        elif msg_lower in CONFIRM_NO:
             extracted.confirmation = "no"
             logger.info("FALLBACK: Detected 'no' confirmation manually")
 
@@ -562,7 +747,7 @@ def parse_intent_and_dates(
                 state.chat_response = f"Please provide new {field.replace('_', ' ')}."
                 state.parsing_status = "incomplete"
                 state.intent_type = "update_leave"
-                return state.dict()
+                return state
 
         elif extracted.intent_type == "update_leave" and not field:
             # User said "update" but didn't specify what
@@ -572,7 +757,7 @@ def parse_intent_and_dates(
                 "What would you like to change? "
                 "You can say: change start date, change end date, or change reason."
             )
-            return state.dict()
+            return state
 
     # ─────────────────────────────────────────────
     # HANDLE CONFIRMATION STEP
@@ -581,18 +766,18 @@ def parse_intent_and_dates(
         if extracted.confirmation == "yes":
             state.preview_confirmed = True
             state.parsing_status = "complete"
-            state.message_for_user = (
+            state.chat_response = (
                 "Parsing has been completed. Checking genuineness score."
             )
-            return state.dict()
+            return state
 
         if extracted.confirmation == "no":
             state.parsing_status = "incomplete"
             state.intent_type = "update_leave"
             state.chat_response = "Okay, what would you like to change?"
-            return state.dict()
+            return state
         
-        return state.dict()
+        return state
 
     # ─────────────────────────────────────────────
     # DATE HANDLING 
@@ -653,13 +838,13 @@ def parse_intent_and_dates(
             "Reply YES to confirm or tell me what to change."
         )
 
-        return state.dict()
+        return state
 
     # ─────────────────────────────────────────────
     # FINAL STATE
     # ─────────────────────────────────────────────
     logger.info(f"Final State={state.dict()}")
-    return state.dict()
+    return state
 
 
 
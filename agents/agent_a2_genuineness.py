@@ -5,19 +5,35 @@
 
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import httpx
+import asyncio
+import os
+import sqlite3
+import time
 import statistics
-from collections import Counter
+from collections import Counter, deque
+from bisect import bisect_left, bisect_right
 import calendar
 import logging
+from functools import lru_cache
+from fractions import Fraction
+
+import numpy as np
+
+from leave_history_store import (
+    HISTORY_FRESH_SECONDS, leave_history_sync_state, status_counts, sync_leave_history
+)
+from session_store import MemoryBackend
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ================= CONFIG =================
 class Config:
-    LEAVE_API = "https://devmcdphcmplatform.omfysgroup.com/user/leaves/showleavereport"
+    LEAVE_API = os.getenv(
+        "LEAVE_REPORT_API", "https://devmcdphcmplatform.omfysgroup.com/user/leaves/showleavereport"
+    )
 
     WEIGHTS = {
         "reason": 0.30,
@@ -32,8 +48,29 @@ class Config:
     MONTH_END_DAYS = 7
     SUDDEN_CHANGE_RATIO = 1.8
 
+    # Batch re-scoring: employees whose history is fetched concurrently
+    BATCH_CONCURRENCY = 10
+
+    # Feature snapshots buffer this many days around the requested window
+    SNAPSHOT_MARGIN_DAYS = 60
+    # Snapshots kept in memory (LRU), each dropped after this long unused
+    SNAPSHOT_MAX_ENTRIES = 2000
+    SNAPSHOT_TTL_SECONDS = 1800
+
+    # Shared HTTP client for the leave API
+    HTTP_TIMEOUT = 30
+    HTTP_MAX_CONNECTIONS = 50
+    HTTP_MAX_KEEPALIVE = 20
+    HTTP_KEEPALIVE_EXPIRY = 60
+
 config = Config()
 
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # ================= MODELS =================
 class CurrentRequest(BaseModel):
     """Current leave request details from Intent Parser"""
@@ -55,14 +92,26 @@ class GenuinenessState(BaseModel):
     username: Optional[str] = None
 
 # ================= HELPERS =================
-def parse_date(date_str: str) -> datetime:
-    """Parse date string in multiple formats"""
-    for fmt in ("%d-%b-%Y", "%Y-%m-%d", "%d-%m-%Y"):
+DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d", "%d-%m-%Y")
+
+@lru_cache(maxsize=65536)
+def _parse_date_cached(date_str: str) -> Optional[datetime]:
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt)
         except ValueError:
             continue
-    raise ValueError(f"Invalid date format: {date_str}")
+    return None
+
+def parse_date(date_str: str) -> datetime:
+    """Parse date string in multiple formats (each distinct string is parsed once)"""
+    if not isinstance(date_str, str):
+        # Same TypeError strptime would raise
+        return datetime.strptime(date_str, DATE_FORMATS[0])
+    parsed = _parse_date_cached(date_str)
+    if parsed is None:
+        raise ValueError(f"Invalid date format: {date_str}")
+    return parsed
 
 CANONICAL_REASONS = {
     "family function": "Family function",
@@ -80,44 +129,197 @@ def normalize_reason(raw_reason: str) -> str:
         return "Other"
     return CANONICAL_REASONS.get(raw_reason.strip().lower(), "Other")
 
+# ================= COLUMNAR HISTORY =================
+REASON_LABELS = list(dict.fromkeys(CANONICAL_REASONS.values()))
+REASON_CODES = {label: i for i, label in enumerate(REASON_LABELS)}
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+WEEKDAY_CODES = {name: i for i, name in enumerate(WEEKDAYS)}
+SANDWICH_WEEKDAYS = [WEEKDAY_CODES["Friday"], WEEKDAY_CODES["Monday"]]
+
+def _number(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+class LeaveHistory:
+    """
+    Leave report converted once into columns, so every factor is a handful
+    of NumPy operations instead of a pass over the leave dicts.
+
+    starts          datetime64[D], NaT where start_date is missing/unparseable
+    durations       c_duration_days, NaN where missing/None
+    notice          c_advance_notice_days, NaN where missing/None
+    reason_codes    index into REASON_LABELS (normalized c_reason_category)
+    weekday_codes   index into WEEKDAYS of c_leave_start_weekday, -1 if unknown
+    approved / rejected / cancelled   status flags (substring match, as before)
+    """
+
+    def __init__(self, leaves: List[Dict]):
+        self.leaves = leaves
+
+        starts = []
+        for l in leaves:
+            try:
+                starts.append(parse_date(l["start_date"]))
+            except Exception:
+                starts.append(None)
+        self.starts = np.array(
+            [np.datetime64(d.date(), "D") if d else np.datetime64("NaT") for d in starts],
+            dtype="datetime64[D]"
+        )
+        self.start_valid = ~np.isnat(self.starts)
+
+        self.durations = np.array([_number(l.get("c_duration_days")) for l in leaves], dtype=float)
+        # A present but non-numeric duration disables the sudden-change check
+        self.durations_summable = all(
+            isinstance(l.get("c_duration_days", 0), (int, float)) for l in leaves
+        )
+        self.notice = np.array([_number(l.get("c_advance_notice_days")) for l in leaves], dtype=float)
+
+        self.reason_codes = np.array(
+            [REASON_CODES[normalize_reason(l.get("c_reason_category", ""))] for l in leaves],
+            dtype=np.int16
+        )
+        self.weekday_codes = np.array(
+            [WEEKDAY_CODES.get(l.get("c_leave_start_weekday"), -1) for l in leaves],
+            dtype=np.int8
+        )
+
+        statuses = [l.get("status", "").lower() for l in leaves]
+        self.approved = np.array(["approved" in st for st in statuses], dtype=bool)
+        self.rejected = np.array(["reject" in st for st in statuses], dtype=bool)
+        self.cancelled = np.array(["cancelled" in st for st in statuses], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.leaves)
+
+    @classmethod
+    def of(cls, leaves) -> "LeaveHistory":
+        """Accept either raw leave dicts or an already built history."""
+        return leaves if isinstance(leaves, cls) else cls(leaves)
+
+    def reason_counts(self) -> np.ndarray:
+        return np.bincount(self.reason_codes, minlength=len(REASON_LABELS))
+
+# ================= HTTP CLIENT =================
+# One pooled AsyncClient per event loop: keep-alive (and HTTP/2 when h2 is
+# installed) so repeated checks reuse the TLS connection to the leave API.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# (token, start, end) -> task of the upstream call currently in flight
+_inflight: Dict[tuple, "asyncio.Task"] = {}
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client for the running event loop, created on first use."""
+    global _client, _client_loop, _inflight
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A client (and its pending calls) cannot be reused across loops
+        _client = httpx.AsyncClient(
+            verify=False,
+            http2=HTTP2_AVAILABLE,
+            timeout=config.HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        _client_loop = loop
+        _inflight = {}
+    return _client
+
+async def startup_http_client():
+    """App startup hook: open the pool before the first request."""
+    get_http_client()
+
+async def close_http_client():
+    """App shutdown hook: close pooled connections."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+    _inflight.clear()
+
 # ================= API CALLS =================
+async def _fetch_leaves(token: str, start: str, end: str) -> Dict[str, Any]:
+    r = await get_http_client().post(
+        config.LEAVE_API,
+        json={"start_date": start, "end_date": end},
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=config.HTTP_TIMEOUT
+    )
+    r.raise_for_status()
+
+    data = r.json().get("data", {})
+    return {
+        "leaves": data.get("leaveReport", []),
+        "counts": data.get("count", {})
+    }
+
+async def request_leaves(token: str, start: str, end: str) -> Dict[str, Any]:
+    """
+    Leave report for [start, end]; raises on API errors.
+    Concurrent calls for the same (token, start, end) share one upstream request.
+    """
+    get_http_client()
+    key = (token, start, end)
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_leaves(token, start, end))
+        _inflight[key] = task
+
+        inflight = _inflight
+        def _forget(done):
+            if inflight.get(key) is done:
+                del inflight[key]
+        task.add_done_callback(_forget)
+
+    # shield: one caller being cancelled must not cancel the shared call
+    data = await asyncio.shield(task)
+    return {"leaves": list(data["leaves"]), "counts": dict(data["counts"])}
+
 async def get_leaves(token: str, start: str, end: str) -> Dict[str, Any]:
     """Fetch leave history from API using token"""
     try:
-        async with httpx.AsyncClient(verify=False) as client:
-            r = await client.post(
-                config.LEAVE_API,
-                json={"start_date": start, "end_date": end},
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30
-            )
-            
-            if r.status_code != 200:
-                logger.error(f"Leave API returned status {r.status_code}")
-                return {"leaves": [], "counts": {}}
-            
-            data = r.json().get("data", {})
-            return {
-                "leaves": data.get("leaveReport", []),
-                "counts": data.get("count", {})
-            }
+        return await request_leaves(token, start, end)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Leave API returned status {e.response.status_code}")
     except httpx.TimeoutException:
         logger.error("Leave API request timed out")
-        return {"leaves": [], "counts": {}}
     except Exception as e:
         logger.error(f"Error fetching leaves: {str(e)}")
-        return {"leaves": [], "counts": {}}
+    return {"leaves": [], "counts": {}}
+
+async def get_leave_history(token: str, emp_code: Optional[str], start: str, end: str) -> Dict[str, Any]:
+    """
+    Leave history for [start, end] from the local store, syncing only the
+    delta from the leave API. Falls back to a direct fetch without emp_code.
+    Raises httpx.HTTPError when the API fails and no stored copy exists, so
+    callers report the failure instead of scoring an empty history.
+    """
+    if not emp_code:
+        return await request_leaves(token, start, end)
+
+    try:
+        return await sync_leave_history(
+            str(emp_code), start, end,
+            lambda s, e: request_leaves(token, s, e),
+            lambda d: parse_date(d).strftime("%Y-%m-%d")
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Leave history store unavailable ({e}), fetching directly")
+        return await request_leaves(token, start, end)
 
 # ================= FACTOR 1: REASON FREQUENCY =================
-def calc_reason_freq(leaves: List[Dict], curr_reason: str) -> Dict:
-    """Calculate reason frequency score"""
-    total = len(leaves)
+def score_reason_freq(similar: int, total: int) -> Dict:
     if total == 0:
         return {"raw_score": 95, "flags": []}
 
-    norm = normalize_reason(curr_reason)
-    counts = Counter(normalize_reason(l.get("c_reason_category", "")) for l in leaves)
-    rate = counts.get(norm, 0) / total
+    rate = similar / total
 
     if rate < 0.05: score = 95
     elif rate < 0.10: score = 85
@@ -129,38 +331,24 @@ def calc_reason_freq(leaves: List[Dict], curr_reason: str) -> Dict:
 
     return {
         "raw_score": score,
-        "similar_reason_count": counts.get(norm, 0),
+        "similar_reason_count": similar,
         "frequency_rate": round(rate, 3),
         "flags": flags
     }
 
+def calc_reason_freq(leaves: List[Dict], curr_reason: str) -> Dict:
+    """Calculate reason frequency score"""
+    history = LeaveHistory.of(leaves)
+    if not len(history):
+        return score_reason_freq(0, 0)
+    similar = int(history.reason_counts()[REASON_CODES[normalize_reason(curr_reason)]])
+    return score_reason_freq(similar, len(history))
+
 # ================= FACTOR 2: TIMING PATTERNS =================
-def calc_timing(leaves: List[Dict], curr_start: datetime) -> Dict:
-    """Calculate timing pattern score"""
-    total = len(leaves)
+def score_timing(sandwich: int, month_end: int, total: int, curr_start: datetime) -> Dict:
     if total == 0:
         return {"raw_score": 95, "flags": []}
 
-    sandwich = 0
-    month_end = 0
-
-    for l in leaves:
-        try:
-            sd = parse_date(l["start_date"])
-            weekday = l.get("c_leave_start_weekday")
-
-            # Sandwich leave: Friday or Monday
-            if weekday in ("Friday", "Monday"):
-                sandwich += 1
-
-            # Month-end (last 7 days)
-            last_day = calendar.monthrange(sd.year, sd.month)[1]
-            if sd.day >= last_day - (config.MONTH_END_DAYS - 1):
-                month_end += 1
-        except Exception as e:
-            logger.warning(f"Error parsing leave date: {e}")
-            continue
-
     sandwich_rate = sandwich / total if total > 0 else 0
     month_end_rate = month_end / total if total > 0 else 0
 
@@ -190,25 +378,39 @@ def calc_timing(leaves: List[Dict], curr_start: datetime) -> Dict:
         "flags": flags
     }
 
-# ================= FACTOR 3: DURATION CONSISTENCY =================
-def calc_duration(leaves: List[Dict], curr_dur: int, curr_reason: str) -> Dict:
-    """Calculate duration consistency score"""
-    if not leaves:
-        return {"raw_score": 95, "flags": []}
+def is_month_end(starts: np.ndarray) -> np.ndarray:
+    """Start dates (datetime64[D]) falling in the last MONTH_END_DAYS of their month."""
+    months = starts.astype("datetime64[M]")
+    day = (starts - months.astype("datetime64[D]")).astype(int) + 1
+    last_day = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(int)
+    return day >= last_day - (config.MONTH_END_DAYS - 1)
+
+def calc_timing(leaves: List[Dict], curr_start: datetime) -> Dict:
+    """Calculate timing pattern score"""
+    history = LeaveHistory.of(leaves)
+    total = len(history)
+    if total == 0:
+        return score_timing(0, 0, 0, curr_start)
 
-    durs = [l["c_duration_days"] for l in leaves if l.get("c_duration_days")]
-    if not durs:
+    valid = history.start_valid
+    if not valid.all():
+        logger.warning(f"Skipped {int((~valid).sum())} leaves with unparseable start dates")
+
+    # Sandwich leave: Friday or Monday
+    sandwich = int(np.count_nonzero(valid & np.isin(history.weekday_codes, SANDWICH_WEEKDAYS)))
+
+    # Month-end (last 7 days)
+    month_end = int(np.count_nonzero(is_month_end(history.starts[valid])))
+
+    return score_timing(sandwich, month_end, total, curr_start)
+
+# ================= FACTOR 3: DURATION CONSISTENCY =================
+def score_duration(n_durs: int, avg: float, std: float, base: Optional[float], curr_dur: int) -> Dict:
+    """n_durs/avg/std: non-zero durations; base: mean duration for the current reason, if any."""
+    if not n_durs:
         return {"raw_score": 95, "flags": []}
-    
-    avg = statistics.mean(durs)
-    std = statistics.stdev(durs) if len(durs) > 1 else 0
 
-    reason_durs = [
-        l["c_duration_days"]
-        for l in leaves
-        if normalize_reason(l.get("c_reason_category", "")) == normalize_reason(curr_reason)
-    ]
-    base = statistics.mean(reason_durs) if reason_durs else avg
+    base = avg if base is None else base
     deviation = abs(curr_dur - base)
 
     if deviation <= std: score = 95
@@ -220,24 +422,36 @@ def calc_duration(leaves: List[Dict], curr_dur: int, curr_reason: str) -> Dict:
 
     return {
         "raw_score": score,
-        "duration_deviation": round(deviation, 2),
+        "duration_deviation": round(float(deviation), 2),
         "flags": flags
     }
 
+def calc_duration(leaves: List[Dict], curr_dur: int, curr_reason: str) -> Dict:
+    """Calculate duration consistency score"""
+    history = LeaveHistory.of(leaves)
+    if not len(history):
+        return score_duration(0, 0, 0, None, curr_dur)
+
+    known = ~np.isnan(history.durations)
+    durs = history.durations[known & (history.durations != 0)]
+    if not durs.size:
+        return score_duration(0, 0, 0, None, curr_dur)
+
+    avg = durs.mean()
+    std = durs.std(ddof=1) if durs.size > 1 else 0
+
+    reason_durs = history.durations[known & (history.reason_codes == REASON_CODES[normalize_reason(curr_reason)])]
+    base = reason_durs.mean() if reason_durs.size else None
+
+    return score_duration(durs.size, avg, std, base, curr_dur)
+
 # ================= FACTOR 4: ADVANCE NOTICE =================
-def calc_notice(leaves: List[Dict], curr_adv: int) -> Dict:
-    """Calculate advance notice score"""
-    if not leaves:
+def score_notice(n_advs: int, hist_avg: float, last_minute: int, curr_adv: int) -> Dict:
+    if not n_advs:
         score = 90 if curr_adv >= config.WELL_PLANNED else 60
         return {"raw_score": score, "flags": []}
 
-    advs = [l["c_advance_notice_days"] for l in leaves if l.get("c_advance_notice_days") is not None]
-    if not advs:
-        score = 90 if curr_adv >= config.WELL_PLANNED else 60
-        return {"raw_score": score, "flags": []}
-    
-    hist_avg = statistics.mean(advs)
-    last_minute_rate = sum(1 for a in advs if a <= config.LAST_MINUTE) / len(advs)
+    last_minute_rate = last_minute / n_advs
 
     if curr_adv >= config.WELL_PLANNED:
         score = 95 if curr_adv >= hist_avg else 85
@@ -250,14 +464,33 @@ def calc_notice(leaves: List[Dict], curr_adv: int) -> Dict:
 
     return {"raw_score": score, "flags": flags}
 
+def calc_notice(leaves: List[Dict], curr_adv: int) -> Dict:
+    """Calculate advance notice score"""
+    history = LeaveHistory.of(leaves)
+    advs = history.notice[~np.isnan(history.notice)]
+    if not advs.size:
+        return score_notice(0, 0, 0, curr_adv)
+
+    last_minute = int(np.count_nonzero(advs <= config.LAST_MINUTE))
+    return score_notice(advs.size, advs.mean(), last_minute, curr_adv)
+
 # ================= FACTOR 5: BEHAVIOUR CONSISTENCY =================
-def calc_behaviour(leaves: List[Dict], counts: Dict) -> Dict:
-    """Calculate behaviour consistency score"""
-    if not leaves:
+def score_behaviour(
+    n_leaves: int,
+    counts: Dict,
+    gaps: Optional[tuple],
+    recent: Optional[tuple]
+) -> Dict:
+    """
+    gaps:   (avg_gap, gap_std) between consecutive start dates, None if unavailable
+    recent: (recent_count, hist_duration_sum, recent_duration_sum) for the last
+            90 days before the latest start, None if unavailable
+    """
+    if not n_leaves:
         return {"raw_score": 95, "flags": []}
 
     # Approval / cancellation
-    total = sum(counts.values()) if counts else len(leaves)
+    total = sum(counts.values()) if counts else n_leaves
     if total == 0:
         return {"raw_score": 95, "flags": []}
 
@@ -270,36 +503,24 @@ def calc_behaviour(leaves: List[Dict], counts: Dict) -> Dict:
     cancellation_rate = round(cancelled / total, 3) if total else 0
 
     # Gap analysis
-    try:
-        starts = sorted(parse_date(l["start_date"]) for l in leaves)
-        gaps = [(starts[i] - starts[i-1]).days for i in range(1, len(starts))]
-
-        avg_gap = statistics.mean(gaps) if gaps else 0
-        gap_std = statistics.stdev(gaps) if len(gaps) > 1 else 0
-    except Exception as e:
-        logger.warning(f"Error calculating gaps: {e}")
-        avg_gap = 0
-        gap_std = 0
+    avg_gap, gap_std = gaps if gaps is not None else (0, 0)
 
     # Sudden change (last 3 months)
-    try:
-        starts = sorted(parse_date(l["start_date"]) for l in leaves)
-        cutoff = max(starts) - timedelta(days=90)
-        recent = [l for l in leaves if parse_date(l["start_date"]) >= cutoff]
+    if recent is not None:
+        n_recent, hist_dur_sum, recent_dur_sum = recent
 
         hist_months = 12
         recent_months = 3
 
         hist_count_avg = total / hist_months
-        recent_count_avg = len(recent) / recent_months
+        recent_count_avg = n_recent / recent_months
 
-        hist_dur_avg = sum(l.get("c_duration_days", 0) for l in leaves) / hist_months
-        recent_dur_avg = sum(l.get("c_duration_days", 0) for l in recent) / recent_months if recent else 0
+        hist_dur_avg = hist_dur_sum / hist_months
+        recent_dur_avg = recent_dur_sum / recent_months if n_recent else 0
 
         sudden_freq = recent_count_avg > hist_count_avg * config.SUDDEN_CHANGE_RATIO
         sudden_dur = recent_dur_avg > hist_dur_avg * config.SUDDEN_CHANGE_RATIO
-    except Exception as e:
-        logger.warning(f"Error calculating sudden changes: {e}")
+    else:
         sudden_freq = False
         sudden_dur = False
 
@@ -328,18 +549,48 @@ def calc_behaviour(leaves: List[Dict], counts: Dict) -> Dict:
         "flags": flags
     }
 
+def calc_behaviour(leaves: List[Dict], counts: Dict) -> Dict:
+    """Calculate behaviour consistency score"""
+    history = LeaveHistory.of(leaves)
+    if not len(history):
+        return score_behaviour(0, counts, None, None)
+
+    all_dates_valid = bool(history.start_valid.all())
+    starts = np.sort(history.starts)
+
+    gaps = None
+    if all_dates_valid:
+        diffs = np.diff(starts).astype(int)
+        gaps = (
+            float(diffs.mean()) if diffs.size else 0,
+            float(diffs.std(ddof=1)) if diffs.size > 1 else 0
+        )
+    else:
+        logger.warning("Error calculating gaps: unparseable leave start date")
+
+    recent = None
+    if all_dates_valid and history.durations_summable:
+        is_recent = history.starts >= starts[-1] - np.timedelta64(90, "D")
+        durations = np.nan_to_num(history.durations)
+        recent = (int(np.count_nonzero(is_recent)), durations.sum(), durations[is_recent].sum())
+    else:
+        logger.warning("Error calculating sudden changes: unusable leave dates/durations")
+
+    return score_behaviour(len(history), counts, gaps, recent)
+
 # ================= HELPER FUNCTIONS =================
+def order_common_reasons(counts, first_seen: Dict[int, int]) -> List[Dict]:
+    """Most common first; ties in order of first appearance (as Counter.most_common)"""
+    order = sorted(first_seen, key=lambda code: (-counts[code], first_seen[code]))
+    return [{"reason": REASON_LABELS[code], "count": int(counts[code])} for code in order]
+
 def compute_common_reasons(leaves: List[Dict]) -> List[Dict]:
     """Compute most common leave reasons"""
-    counts = Counter(
-        normalize_reason(l.get("c_reason_category", "Other"))
-        for l in leaves
-    )
-    return [{"reason": k, "count": v} for k, v in counts.most_common()]
+    history = LeaveHistory.of(leaves)
+    codes, first_seen = np.unique(history.reason_codes, return_index=True)
+    return order_common_reasons(history.reason_counts(), dict(zip(codes.tolist(), first_seen.tolist())))
 
-def approval_stats(leaves: List[Dict]) -> Dict:
-    """Calculate approval statistics"""
-    total = len(leaves)
+def score_approval_stats(total: int, approved: int, rejected: int, cancelled: int) -> Dict:
     if total == 0:
         return {
             "total_approved": 0,
@@ -349,10 +600,6 @@ def approval_stats(leaves: List[Dict]) -> Dict:
             "cancelled_leaves": 0,
             "cancellation_rate": 0
         }
-    
-    approved = sum(1 for l in leaves if "approved" in l.get("status", "").lower())
-    rejected = sum(1 for l in leaves if "reject" in l.get("status", "").lower())
-    cancelled = sum(1 for l in leaves if "cancelled" in l.get("status", "").lower())
 
     return {
         "total_approved": approved,
@@ -363,164 +610,556 @@ def approval_stats(leaves: List[Dict]) -> Dict:
         "cancellation_rate": round(cancelled / total, 3)
     }
 
-# ================= CORE ANALYSIS =================
-async def perform_analysis(
-    token: str,
-    emp_code: str,
-    curr: CurrentRequest
-) -> Dict[str, Any]:
+def approval_stats(leaves: List[Dict]) -> Dict:
+    """Calculate approval statistics"""
+    history = LeaveHistory.of(leaves)
+    return score_approval_stats(
+        len(history),
+        int(np.count_nonzero(history.approved)),
+        int(np.count_nonzero(history.rejected)),
+        int(np.count_nonzero(history.cancelled))
+    )
+
+# ================= FEATURE SNAPSHOTS =================
+class RunningMoments:
     """
-    Perform the core genuineness analysis
+    Mean / sample variance supporting both add and remove, kept as exact
+    sums of 2x and (2x)^2. Durations are whole or half days and gaps whole
+    days, so the sums are integers and removing a value leaves no rounding
+    residue, unlike a running Welford update (other values fall back to
+    exact fractions).
     """
-    try:
-        # Parse dates
-        end = parse_date(curr.end_date)
-        start = end - timedelta(days=365)
-        
-        # Fetch historical leaves
-        leave_data = await get_leaves(
-            token, 
-            start.strftime("%Y-%m-%d"), 
-            end.strftime("%Y-%m-%d")
+    __slots__ = ("n", "s1", "s2")
+
+    def __init__(self):
+        self.n = 0
+        self.s1 = 0
+        self.s2 = 0
+
+    @staticmethod
+    def _halves(x: float):
+        x2 = x * 2
+        return int(x2) if float(x2).is_integer() else Fraction(x) * 2
+
+    @property
+    def mean(self) -> float:
+        return float(self.s1 / (2 * self.n)) if self.n else 0.0
+
+    def add(self, x: float):
+        h = self._halves(x)
+        self.n += 1
+        self.s1 += h
+        self.s2 += h * h
+
+    def remove(self, x: float):
+        h = self._halves(x)
+        self.n -= 1
+        self.s1 -= h
+        self.s2 -= h * h
+
+    def std(self) -> float:
+        if self.n <= 1:
+            return 0
+        return float((self.n * self.s2 - self.s1 * self.s1) / (4 * self.n * (self.n - 1))) ** 0.5
+
+class _Entry:
+    """Per-leave values the running features need, extracted once."""
+    __slots__ = ("day", "order", "reason", "sandwich", "month_end", "duration",
+                 "summable", "notice", "bucket", "approved", "rejected", "cancelled")
+
+    def __init__(self, leave: Dict, order: int, history: "LeaveHistory", i: int):
+        self.order = order
+        self.day = int(history.starts[i].astype(int)) if history.start_valid[i] else None
+        self.reason = int(history.reason_codes[i])
+        self.sandwich = self.day is not None and int(history.weekday_codes[i]) in SANDWICH_WEEKDAYS
+        self.month_end = self.day is not None and bool(is_month_end(history.starts[i:i + 1])[0])
+        self.duration = float(history.durations[i])
+        self.summable = isinstance(leave.get("c_duration_days", 0), (int, float))
+        self.notice = float(history.notice[i])
+        # Count block key, as in status_counts()
+        self.bucket = str(leave.get("status", "")).lower()
+        self.approved = bool(history.approved[i])
+        self.rejected = bool(history.rejected[i])
+        self.cancelled = bool(history.cancelled[i])
+
+class FeatureSnapshot:
+    """
+    Running genuineness features for one employee over a sliding date window.
+
+    The leaves of a fetched buffer are sorted by start date; the active
+    window is an index range [lo, hi) of that buffer. Moving the window
+    adds/removes entries at either end, updating counts, exact running moments of
+    durations and gaps, and the 90-day recency counters, so each entry costs
+    O(1) as it enters or leaves. Scoring a request is then O(1) in the
+    length of the history. Leaves with unparseable start dates cannot be
+    placed on the timeline and stay active for the snapshot's lifetime.
+    """
+
+    def __init__(self, emp_code: str, leaves: List[Dict], buffer_start: str, buffer_end: str):
+        self.emp_code = emp_code
+        self.buffer_start = buffer_start
+        self.buffer_end = buffer_end
+        self.synced_at: Optional[float] = None
+        self.source: List[Dict] = list(leaves)
+
+        history = LeaveHistory(self.source)
+        entries = [_Entry(l, i, history, i) for i, l in enumerate(self.source)]
+        self._entries = sorted((e for e in entries if e.day is not None), key=lambda e: (e.day, e.order))
+        self._days = [e.day for e in self._entries]
+        self.lo = self.hi = self.r = 0
+
+        self.n = 0
+        self.reason_counts = [0] * len(REASON_LABELS)
+        self.reason_orders = [deque() for _ in REASON_LABELS]
+        self.undated_first: Dict[int, int] = {}
+        self.sandwich = self.month_end = 0
+        self.durations = RunningMoments()
+        self.reason_dur_sum = [0.0] * len(REASON_LABELS)
+        self.reason_dur_n = [0] * len(REASON_LABELS)
+        self.dur_sum = 0.0
+        self.unsummable = 0
+        self.notice_n = self.notice_last_minute = 0
+        self.notice_sum = 0.0
+        self.buckets = status_counts([])
+        self.approved = self.rejected = self.cancelled = 0
+        self.gaps = RunningMoments()
+        self.n_recent = 0
+        self.recent_dur_sum = 0.0
+
+        self.undated = [e for e in entries if e.day is None]
+        for e in self.undated:
+            self._add(e)
+            self.undated_first.setdefault(e.reason, e.order)
+
+    # ---------- entry bookkeeping ----------
+    def _add(self, e: _Entry, sign: int = 1):
+        self.n += sign
+        self.reason_counts[e.reason] += sign
+        self.sandwich += sign * e.sandwich
+        self.month_end += sign * e.month_end
+        if not np.isnan(e.duration):
+            self.reason_dur_sum[e.reason] += sign * e.duration
+            self.reason_dur_n[e.reason] += sign
+            self.dur_sum += sign * e.duration
+            if e.duration != 0:
+                (self.durations.add if sign > 0 else self.durations.remove)(e.duration)
+        self.unsummable += sign * (not e.summable)
+        if not np.isnan(e.notice):
+            self.notice_n += sign
+            self.notice_sum += sign * e.notice
+            self.notice_last_minute += sign * (e.notice <= config.LAST_MINUTE)
+        self.buckets[e.bucket] = self.buckets.get(e.bucket, 0) + sign
+        self.approved += sign * e.approved
+        self.rejected += sign * e.rejected
+        self.cancelled += sign * e.cancelled
+
+    def _recent(self, e: _Entry, sign: int):
+        self.n_recent += sign
+        if not np.isnan(e.duration):
+            self.recent_dur_sum += sign * e.duration
+
+    def _push_back(self):
+        e = self._entries[self.hi]
+        if self.hi > self.lo:
+            self.gaps.add(e.day - self._days[self.hi - 1])
+        else:
+            self.r = self.hi
+        self._add(e)
+        self.reason_orders[e.reason].append(e.order)
+        self.hi += 1
+        # New latest start: it is recent, older entries may fall out
+        self._recent(e, 1)
+        while self._days[self.r] < e.day - 90:
+            self._recent(self._entries[self.r], -1)
+            self.r += 1
+
+    def _push_front(self):
+        i = self.lo - 1
+        e = self._entries[i]
+        if self.hi > self.lo:
+            self.gaps.add(self._days[self.lo] - e.day)
+            if self.r == self.lo and e.day >= self._days[self.hi - 1] - 90:
+                self._recent(e, 1)
+                self.r = i
+        else:
+            self.hi, self.r = self.lo, i
+            self._recent(e, 1)
+        self._add(e)
+        self.reason_orders[e.reason].appendleft(e.order)
+        self.lo = i
+
+    def _pop_front(self):
+        e = self._entries[self.lo]
+        self._add(e, -1)
+        self.reason_orders[e.reason].popleft()
+        if self.hi - self.lo > 1:
+            self.gaps.remove(self._days[self.lo + 1] - e.day)
+        if self.r == self.lo:
+            self._recent(e, -1)
+            self.r += 1
+        self.lo += 1
+
+    def _pop_back(self):
+        i = self.hi - 1
+        e = self._entries[i]
+        self._add(e, -1)
+        self.reason_orders[e.reason].pop()
+        if i > self.lo:
+            self.gaps.remove(e.day - self._days[i - 1])
+        self._recent(e, -1)
+        self.hi = i
+        self.r = min(self.r, self.hi)
+        # Earlier latest start: the recency cutoff moves back
+        if self.hi > self.lo:
+            cutoff = self._days[self.hi - 1] - 90
+            while self.r > self.lo and self._days[self.r - 1] >= cutoff:
+                self.r -= 1
+                self._recent(self._entries[self.r], 1)
+
+    # ---------- window / buffer ----------
+    def covers(self, start: str, end: str) -> bool:
+        return self.buffer_start <= start and end <= self.buffer_end
+
+    def set_window(self, start: str, end: str):
+        """Make [start, end] (ISO dates, inclusive) the active window."""
+        lo = bisect_left(self._days, date.fromisoformat(start).toordinal() - EPOCH_ORDINAL)
+        hi = bisect_right(self._days, date.fromisoformat(end).toordinal() - EPOCH_ORDINAL)
+        if self.hi == self.lo:
+            self.lo = self.hi = self.r = lo
+        while self.hi < hi:
+            self._push_back()
+        while self.lo > lo:
+            self._push_front()
+        while self.lo < lo:
+            self._pop_front()
+        while self.hi > hi:
+            self._pop_back()
+
+    def append(self, leave: Dict) -> bool:
+        """
+        Add a newly synced leave to the end of the buffer (it enters the
+        active window when the window reaches it). Returns False when the
+        leave is out of order or undated, in which case the snapshot must
+        be rebuilt.
+        """
+        history = LeaveHistory([leave])
+        e = _Entry(leave, len(self.source), history, 0)
+        if e.day is None or (self._days and e.day < self._days[-1]):
+            return False
+        self.source.append(leave)
+        self._entries.append(e)
+        self._days.append(e.day)
+        return True
+
+    # ---------- features ----------
+    def counts(self) -> Dict:
+        if not self.n:
+            return {}
+        base = status_counts([])
+        return {k: v for k, v in self.buckets.items() if v or k in base}
+
+    def factors(self, curr_reason: str, curr_start: datetime, curr_dur: int, curr_adv: int):
+        reason = REASON_CODES[normalize_reason(curr_reason)]
+
+        f1 = score_reason_freq(self.reason_counts[reason], self.n)
+        f2 = score_timing(self.sandwich, self.month_end, self.n, curr_start)
+        f3 = score_duration(
+            self.durations.n, self.durations.mean, self.durations.std(),
+            self.reason_dur_sum[reason] / self.reason_dur_n[reason] if self.reason_dur_n[reason] else None,
+            curr_dur
+        )
+        f4 = score_notice(
+            self.notice_n, self.notice_sum / self.notice_n if self.notice_n else 0,
+            self.notice_last_minute, curr_adv
         )
-        leaves = leave_data["leaves"]
-        counts = leave_data["counts"]
 
-        logger.info(f"Fetched {len(leaves)} historical leaves for {emp_code}")
+        dated = not self.undated
+        gaps = (self.gaps.mean if self.gaps.n else 0, self.gaps.std()) if dated else None
+        recent = (self.n_recent, self.dur_sum, self.recent_dur_sum) if dated and not self.unsummable else None
+        f5 = score_behaviour(self.n, self.counts(), gaps, recent)
 
-        # Calculate current request metrics
-        curr_start = parse_date(curr.start_date)
-        curr_dur = (parse_date(curr.end_date) - curr_start).days + 1
-        curr_adv = (curr_start - parse_date(curr.application_date)).days
+        return f1, f2, f3, f4, f5
 
-        # Calculate all factors
-        f1 = calc_reason_freq(leaves, curr.reason_category)
-        f2 = calc_timing(leaves, curr_start)
-        f3 = calc_duration(leaves, curr_dur, curr.reason_category)
-        f4 = calc_notice(leaves, curr_adv)
-        f5 = calc_behaviour(leaves, counts)
-
-        factors = {
-            "reason": f1, 
-            "timing": f2, 
-            "duration": f3, 
-            "notice": f4, 
-            "behaviour": f5
-        }
+    def common_reasons(self) -> List[Dict]:
+        first_seen = dict(self.undated_first)
+        for code, orders in enumerate(self.reason_orders):
+            if orders:
+                first_seen[code] = min(orders[0], first_seen.get(code, orders[0]))
+        return order_common_reasons(self.reason_counts, first_seen)
+
+    def approval_stats(self) -> Dict:
+        return score_approval_stats(self.n, self.approved, self.rejected, self.cancelled)
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# emp_code -> snapshot over that employee's last fetched buffer
+_snapshots = MemoryBackend(config.SNAPSHOT_MAX_ENTRIES)
+SNAPSHOT_STATS = {"expired": 0, "evicted": 0}
+
+def clear_feature_snapshots():
+    global _snapshots
+    _snapshots = MemoryBackend(config.SNAPSHOT_MAX_ENTRIES)
 
-        # Calculate weighted total score
-        total = sum(factors[k]["raw_score"] * config.WEIGHTS[k] for k in factors)
+async def get_feature_snapshot(token: str, emp_code: str, start: str, end: str) -> FeatureSnapshot:
+    """
+    The employee's snapshot with [start, end] as active window. Served from
+    memory while the history store's sync is fresh; otherwise the store is
+    synced and new leaves are appended (or the snapshot rebuilt when the
+    synced history changed in place).
+    """
+    emp_code = str(emp_code)
+    snapshot = _snapshots.get(emp_code, config.SNAPSHOT_TTL_SECONDS, SNAPSHOT_STATS)
+    state = leave_history_sync_state(emp_code)
+
+    fresh = (
+        snapshot is not None and state is not None
+        and snapshot.synced_at == state["synced_at"]
+        and time.time() - state["synced_at"] < HISTORY_FRESH_SECONDS
+        and snapshot.covers(start, end)
+    )
+    if not fresh:
+        margin = timedelta(days=config.SNAPSHOT_MARGIN_DAYS)
+        buffer_start = (date.fromisoformat(start) - margin).isoformat()
+        buffer_end = (date.fromisoformat(end) + margin).isoformat()
+        if snapshot is not None:
+            buffer_start = min(buffer_start, snapshot.buffer_start)
+            buffer_end = max(buffer_end, snapshot.buffer_end)
+
+        leave_data = await get_leave_history(token, emp_code, buffer_start, buffer_end)
+        leaves = leave_data["leaves"]
 
-        # Determine category and recommendation
-        if total >= 85:
-            category, rec = "Highly genuine", "approve"
-        elif total >= 60:
-            category, rec = "Moderately genuine", "approve"
-        elif total >= 40:
-            category, rec = "Low genuineness", "approve"
+        reusable = (
+            snapshot is not None
+            and snapshot.buffer_start == buffer_start
+            and leaves[:len(snapshot.source)] == snapshot.source
+            and all(snapshot.append(l) for l in leaves[len(snapshot.source):])
+        )
+        if reusable:
+            snapshot.buffer_end = buffer_end
         else:
-            category, rec = "Extremely suspicious", "reject"
+            snapshot = FeatureSnapshot(emp_code, leaves, buffer_start, buffer_end)
+            _snapshots.put(emp_code, snapshot, config.SNAPSHOT_TTL_SECONDS, SNAPSHOT_STATS)
 
-        # Compute additional statistics
-        common_reasons = compute_common_reasons(leaves)
-        stats = approval_stats(leaves)
+        state = leave_history_sync_state(emp_code)
+        snapshot.synced_at = state["synced_at"] if state else None
 
-        # Build complete analysis result
-        return {
-            "employee_id": emp_code,
-            "analysis_period": "12 months",
-
-            "current_request": {
-                "reason": curr.reason_category.lower(),
-                "start_date": curr.start_date,
-                "end_date": curr.end_date,
-                "duration_days": curr_dur,
-                "advance_notice_days": curr_adv,
-                "has_attachment": False,
-                "attachment_type": None
-            },
+    snapshot.set_window(start, end)
+    return snapshot
 
-            "factor_1_reason_frequency": {
-                "weight": config.WEIGHTS["reason"],
-                "similar_reason_count": f1["similar_reason_count"],
-                "total_leaves": len(leaves),
-                "frequency_rate": f1["frequency_rate"],
-                "common_reasons": common_reasons,
-                "current_reason_normalized": normalize_reason(curr.reason_category),
-                "is_overused": "REASON_OVERUSED" in f1["flags"],
-                "raw_score": f1["raw_score"]
-            },
+def analyze_feature_snapshot(emp_code: str, curr: CurrentRequest, snapshot: FeatureSnapshot) -> Dict[str, Any]:
+    """analyze_leave_history() computed from a snapshot's running features"""
+    curr_start = parse_date(curr.start_date)
+    curr_dur = (parse_date(curr.end_date) - curr_start).days + 1
+    curr_adv = (curr_start - parse_date(curr.application_date)).days
 
-            "factor_2_timing_patterns": {
-                "weight": config.WEIGHTS["timing"],
-                "total_leaves": len(leaves),
-                "sandwich_leaves": {
-                    "count": int(f2["sandwich_rate"] * len(leaves)),
-                    "sandwich_rate": f2["sandwich_rate"]
-                },
-                "month_end_rate": f2["month_end_rate"],
-                "current_request_flags": {
-                    "is_sandwich": "CURRENT_SANDWICH" in f2["flags"],
-                    "is_month_end": "CURRENT_MONTH_END" in f2["flags"]
-                },
-                "raw_score": f2["raw_score"]
-            },
+    f1, f2, f3, f4, f5 = snapshot.factors(curr.reason_category, curr_start, curr_dur, curr_adv)
+    return build_analysis(
+        emp_code, curr, curr_dur, curr_adv, snapshot.n, snapshot.counts(),
+        f1, f2, f3, f4, f5, snapshot.common_reasons(), snapshot.approval_stats()
+    )
 
-            "factor_3_duration_consistency": {
-                "weight": config.WEIGHTS["duration"],
-                "current_duration": curr_dur,
-                "duration_deviation": f3["duration_deviation"],
-                "is_abnormal": "DURATION_OUTLIER" in f3["flags"],
-                "justification_needed": f3["raw_score"] < 60,
-                "raw_score": f3["raw_score"]
-            },
+# ================= CORE ANALYSIS =================
+def build_analysis(
+    emp_code: str,
+    curr: CurrentRequest,
+    curr_dur: int,
+    curr_adv: int,
+    n_leaves: int,
+    counts: Dict,
+    f1: Dict, f2: Dict, f3: Dict, f4: Dict, f5: Dict,
+    common_reasons: List[Dict],
+    stats: Dict
+) -> Dict[str, Any]:
+    """Weighted total, category and the full analysis payload from the five factors"""
+    factors = {
+        "reason": f1, 
+        "timing": f2, 
+        "duration": f3, 
+        "notice": f4, 
+        "behaviour": f5
+    }
 
-            "factor_4_advance_notice": {
-                "weight": config.WEIGHTS["notice"],
-                "advance_days": curr_adv,
-                "current_is_last_minute": "LAST_MINUTE_REQUEST" in f4["flags"],
-                "raw_score": f4["raw_score"]
-            },
+    # Calculate weighted total score
+    total = sum(factors[k]["raw_score"] * config.WEIGHTS[k] for k in factors)
 
-            "factor_5_behaviour_consistency": {
-                "weight": config.WEIGHTS["behaviour"],
-                "approval_rate": stats["approval_rate"],
-                "rejection_rate": stats["rejection_rate"],
-                "cancellation_rate": stats["cancellation_rate"],
-                "pattern_stability": {
-                    "consistent_leave_spacing": f5["avg_gap_days"] > 7,
-                    "behavioral_anomaly_detected": len(f5["flags"]) > 0,
-                    "stability_score": round(1 - (len(f5["flags"]) * 0.15), 2)
-                },
-                "raw_score": f5["raw_score"]
-            },
+    # Determine category and recommendation
+    if total >= 85:
+        category, rec = "Highly genuine", "approve"
+    elif total >= 60:
+        category, rec = "Moderately genuine", "approve"
+    elif total >= 40:
+        category, rec = "Low genuineness", "approve"
+    else:
+        category, rec = "Extremely suspicious", "reject"
 
-            "additional_context": {
-                "approval_history": {
-                    "total_approved": counts.get("approved", 0),
-                    "approval_rate": f5["approval_rate"]
-                },
-                "rejection_history": {
-                    "total_rejections": counts.get("rejected", 0),
-                    "rejection_rate": f5["rejection_rate"]
-                },
-                "cancellation_pattern": {
-                    "cancelled_leaves": counts.get("cancelled", 0),
-                    "cancellation_rate": f5["cancellation_rate"]
-                }
+    # Build complete analysis result
+    return {
+        "employee_id": emp_code,
+        "analysis_period": "12 months",
+
+        "current_request": {
+            "reason": curr.reason_category.lower(),
+            "start_date": curr.start_date,
+            "end_date": curr.end_date,
+            "duration_days": curr_dur,
+            "advance_notice_days": curr_adv,
+            "has_attachment": False,
+            "attachment_type": None
+        },
+
+        "factor_1_reason_frequency": {
+            "weight": config.WEIGHTS["reason"],
+            "similar_reason_count": f1["similar_reason_count"],
+            "total_leaves": n_leaves,
+            "frequency_rate": f1["frequency_rate"],
+            "common_reasons": common_reasons,
+            "current_reason_normalized": normalize_reason(curr.reason_category),
+            "is_overused": "REASON_OVERUSED" in f1["flags"],
+            "raw_score": f1["raw_score"]
+        },
+
+        "factor_2_timing_patterns": {
+            "weight": config.WEIGHTS["timing"],
+            "total_leaves": n_leaves,
+            "sandwich_leaves": {
+                "count": int(f2["sandwich_rate"] * n_leaves),
+                "sandwich_rate": f2["sandwich_rate"]
+            },
+            "month_end_rate": f2["month_end_rate"],
+            "current_request_flags": {
+                "is_sandwich": "CURRENT_SANDWICH" in f2["flags"],
+                "is_month_end": "CURRENT_MONTH_END" in f2["flags"]
+            },
+            "raw_score": f2["raw_score"]
+        },
+
+        "factor_3_duration_consistency": {
+            "weight": config.WEIGHTS["duration"],
+            "current_duration": curr_dur,
+            "duration_deviation": f3["duration_deviation"],
+            "is_abnormal": "DURATION_OUTLIER" in f3["flags"],
+            "justification_needed": f3["raw_score"] < 60,
+            "raw_score": f3["raw_score"]
+        },
+
+        "factor_4_advance_notice": {
+            "weight": config.WEIGHTS["notice"],
+            "advance_days": curr_adv,
+            "current_is_last_minute": "LAST_MINUTE_REQUEST" in f4["flags"],
+            "raw_score": f4["raw_score"]
+        },
+
+        "factor_5_behaviour_consistency": {
+            "weight": config.WEIGHTS["behaviour"],
+            "approval_rate": stats["approval_rate"],
+            "rejection_rate": stats["rejection_rate"],
+            "cancellation_rate": stats["cancellation_rate"],
+            "pattern_stability": {
+                "consistent_leave_spacing": f5["avg_gap_days"] > 7,
+                "behavioral_anomaly_detected": len(f5["flags"]) > 0,
+                "stability_score": round(1 - (len(f5["flags"]) * 0.15), 2)
             },
+            "raw_score": f5["raw_score"]
+        },
 
-            "calculated_score": {
-                "factor_1_weighted": round(f1["raw_score"] * config.WEIGHTS["reason"], 2),
-                "factor_2_weighted": round(f2["raw_score"] * config.WEIGHTS["timing"], 2),
-                "factor_3_weighted": round(f3["raw_score"] * config.WEIGHTS["duration"], 2),
-                "factor_4_weighted": round(f4["raw_score"] * config.WEIGHTS["notice"], 2),
-                "factor_5_weighted": round(f5["raw_score"] * config.WEIGHTS["behaviour"], 2),
-                "total_score": round(total, 2),
-                "score_category": category,
-                "recommendation": rec,
+        "additional_context": {
+            "approval_history": {
+                "total_approved": counts.get("approved", 0),
+                "approval_rate": f5["approval_rate"]
+            },
+            "rejection_history": {
+                "total_rejections": counts.get("rejected", 0),
+                "rejection_rate": f5["rejection_rate"]
+            },
+            "cancellation_pattern": {
+                "cancelled_leaves": counts.get("cancelled", 0),
+                "cancellation_rate": f5["cancellation_rate"]
             }
+        },
+
+        "calculated_score": {
+            "factor_1_weighted": round(f1["raw_score"] * config.WEIGHTS["reason"], 2),
+            "factor_2_weighted": round(f2["raw_score"] * config.WEIGHTS["timing"], 2),
+            "factor_3_weighted": round(f3["raw_score"] * config.WEIGHTS["duration"], 2),
+            "factor_4_weighted": round(f4["raw_score"] * config.WEIGHTS["notice"], 2),
+            "factor_5_weighted": round(f5["raw_score"] * config.WEIGHTS["behaviour"], 2),
+            "total_score": round(total, 2),
+            "score_category": category,
+            "recommendation": rec,
         }
+    }
+
+
+def analyze_leave_history(
+    emp_code: str,
+    curr: CurrentRequest,
+    leaves: List[Dict],
+    counts: Dict
+) -> Dict[str, Any]:
+    """
+    Score the current request against an already fetched leave history
+    """
+    try:
+        # Calculate current request metrics
+        curr_start = parse_date(curr.start_date)
+        curr_dur = (parse_date(curr.end_date) - curr_start).days + 1
+        curr_adv = (curr_start - parse_date(curr.application_date)).days
+
+        # Calculate all factors on one columnar copy of the history
+        history = LeaveHistory(leaves)
+        f1 = calc_reason_freq(history, curr.reason_category)
+        f2 = calc_timing(history, curr_start)
+        f3 = calc_duration(history, curr_dur, curr.reason_category)
+        f4 = calc_notice(history, curr_adv)
+        f5 = calc_behaviour(history, counts)
+
+        common_reasons = compute_common_reasons(history)
+        stats = approval_stats(history)
+
+        return build_analysis(
+            emp_code, curr, curr_dur, curr_adv, len(leaves), counts,
+            f1, f2, f3, f4, f5, common_reasons, stats
+        )
+
+    except Exception as e:
+        logger.exception(f"Error in analyze_leave_history: {str(e)}")
+        raise
+
+async def perform_analysis(
+    token: str,
+    emp_code: str,
+    curr: CurrentRequest
+) -> Dict[str, Any]:
+    """
+    Perform the core genuineness analysis
+    """
+    try:
+        # Parse dates
+        end = parse_date(curr.end_date)
+        start = end - timedelta(days=365)
+
+        if emp_code:
+            try:
+                snapshot = await get_feature_snapshot(
+                    token, emp_code, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+                )
+                return analyze_feature_snapshot(emp_code, curr, snapshot)
+            except sqlite3.Error as e:
+                logger.error(f"Feature snapshot unavailable ({e}), scoring from a full fetch")
+
+        # Fetch historical leaves
+        leave_data = await get_leave_history(
+            token,
+            emp_code,
+            start.strftime("%Y-%m-%d"),
+            end.strftime("%Y-%m-%d")
+        )
+        leaves = leave_data["leaves"]
+        counts = leave_data["counts"]
+
+        logger.info(f"Fetched {len(leaves)} historical leaves for {emp_code}")
+
+        return analyze_leave_history(emp_code, curr, leaves, counts)
 
     except Exception as e:
         logger.exception(f"Error in perform_analysis: {str(e)}")
@@ -669,3 +1308,225 @@ async def assess_genuineness(
         return state.dict()
 
 
+# ================= BATCH SCORING =================
+class BatchRequestError(Exception):
+    def __init__(self, message: str, error_code: str):
+        super().__init__(message)
+        self.error_code = error_code
+
+def _batch_request(item: Dict[str, Any], token: Optional[str]):
+    """Validate one batch item -> (emp_code, token, CurrentRequest, window end)."""
+    missing_fields = [f for f in ("start_date", "end_date", "reason") if not item.get(f)]
+    if missing_fields:
+        raise BatchRequestError(
+            f"Missing required leave details: {', '.join(missing_fields)}", "MISSING_LEAVE_DETAILS"
+        )
+
+    # The leave report answers for the token's owner: a shared token would
+    # score (and store) its owner's history under this employee
+    emp_code = item.get("empCode") or item.get("employee_id")
+    token = item.get("token") or (None if emp_code else token)
+    if not token:
+        raise BatchRequestError("Authentication token not found", "MISSING_TOKEN")
+
+    curr = CurrentRequest(
+        reason_category=item["reason"],
+        start_date=item["start_date"],
+        end_date=item["end_date"],
+        application_date=item.get("application_date", datetime.now().strftime("%Y-%m-%d"))
+    )
+    try:
+        end = parse_date(curr.end_date)
+        parse_date(curr.start_date)
+        parse_date(curr.application_date)
+    except ValueError as e:
+        raise BatchRequestError(f"Invalid date format: {str(e)}", "INVALID_DATE_FORMAT")
+
+    return emp_code, token, curr, end
+
+def _history_window(leave_data: Dict[str, Any], start: datetime, end: datetime, full_window: bool) -> Dict[str, Any]:
+    """Cut one request's 12-month window out of the employee's widest fetch."""
+    if full_window:
+        return leave_data
+
+    leaves = []
+    for l in leave_data["leaves"]:
+        try:
+            if start <= parse_date(l["start_date"]) <= end:
+                leaves.append(l)
+        except Exception:
+            continue
+    return {"leaves": leaves, "counts": status_counts(leaves) if leaves else {}}
+
+async def stream_genuineness_batch(
+    items: List[Dict[str, Any]],
+    token: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    summary: Optional[Dict[str, Any]] = None
+):
+    """
+    Score many leave requests, yielding each result as soon as it is ready.
+
+    items: dicts with empCode, start_date, end_date, reason, the
+           employee's own token and optionally application_date. A row
+           naming an employee but carrying no token fails with
+           MISSING_TOKEN; `token` only serves rows without an empCode
+           (the token owner's own requests).
+    Each employee's history is fetched once, over the widest window their
+    requests need, through the pooled client; at most max_concurrency
+    employees are fetched at a time. A failing request yields a "failed"
+    result without affecting the others. `summary`, if given, is filled
+    with the batch counters and throughput.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max_concurrency or config.BATCH_CONCURRENCY)
+    summary = summary if summary is not None else {}
+    summary.update({"total": len(items), "completed": 0, "failed": 0, "employees": 0})
+
+    # Widest window per employee
+    parsed = {}
+    windows: Dict[tuple, List[datetime]] = {}
+    for index, item in enumerate(items):
+        try:
+            emp_code, emp_token, curr, end = _batch_request(item, token)
+        except (BatchRequestError, ValueError) as e:
+            parsed[index] = e
+            continue
+        key = (emp_code, emp_token)
+        parsed[index] = (key, curr, end)
+        window = windows.setdefault(key, [end, end])
+        window[0], window[1] = min(window[0], end), max(window[1], end)
+    summary["employees"] = len(windows)
+
+    histories: Dict[tuple, asyncio.Task] = {}
+
+    async def fetch_history(key):
+        emp_code, emp_token = key
+        first_end, last_end = windows[key]
+        async with semaphore:
+            return await get_leave_history(
+                emp_token,
+                emp_code,
+                (first_end - timedelta(days=365)).strftime("%Y-%m-%d"),
+                last_end.strftime("%Y-%m-%d")
+            )
+
+    async def score(index):
+        item = items[index]
+        request = parsed[index]
+        result = {"index": index, "employee_id": item.get("empCode") or item.get("employee_id")}
+        try:
+            if isinstance(request, Exception):
+                raise request
+
+            key, curr, end = request
+            if key not in histories:
+                histories[key] = asyncio.ensure_future(fetch_history(key))
+            leave_data = await histories[key]
+
+            first_end, last_end = windows[key]
+            leave_data = _history_window(
+                leave_data, end - timedelta(days=365), end, first_end == last_end
+            )
+            analysis_result = analyze_leave_history(key[0], curr, leave_data["leaves"], leave_data["counts"])
+
+            result.update({
+                "status": "completed",
+                "genuineness_assessment": {
+                    "total_score": analysis_result["calculated_score"]["total_score"],
+                    "recommendation": analysis_result["calculated_score"]["recommendation"]
+                },
+                "analysis_result": analysis_result
+            })
+        except BatchRequestError as e:
+            result.update({"status": "failed", "error": str(e), "error_code": e.error_code})
+        except ValueError as e:
+            result.update({"status": "failed", "error": f"Invalid date format: {str(e)}", "error_code": "INVALID_DATE_FORMAT"})
+        except httpx.HTTPError as e:
+            result.update({"status": "failed", "error": f"API communication error: {str(e)}", "error_code": "API_ERROR"})
+        except Exception as e:
+            logger.exception(f"Batch scoring failed for request {index}")
+            result.update({"status": "failed", "error": f"Unexpected error during analysis: {str(e)}", "error_code": "ANALYSIS_ERROR"})
+        return result
+
+    tasks = [asyncio.ensure_future(score(index)) for index in range(len(items))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            summary["completed" if result["status"] == "completed" else "failed"] += 1
+            elapsed = time.perf_counter() - started
+            summary["elapsed_seconds"] = round(elapsed, 3)
+            summary["requests_per_second"] = round((summary["completed"] + summary["failed"]) / elapsed, 2) if elapsed else None
+            yield result
+    finally:
+        # Consumer stopped early: do not leave scoring/fetch tasks running
+        for task in tasks + list(histories.values()):
+            if not task.done():
+                task.cancel()
+
+async def assess_genuineness_batch(
+    items: List[Dict[str, Any]],
+    token: Optional[str] = None,
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """Non-streaming form: results in input order plus the throughput summary."""
+    summary: Dict[str, Any] = {}
+    results = [r async for r in stream_genuineness_batch(items, token, max_concurrency, summary)]
+    results.sort(key=lambda r: r["index"])
+
+    logger.info(
+        f"Batch genuineness: {summary['completed']}/{summary['total']} completed, "
+        f"{summary['failed']} failed, {summary.get('requests_per_second')} req/s"
+    )
+    return {"results": results, "summary": summary}
+
+
+# ================= LIVE SCORING =================
+async def live_genuineness_score(
+    leave_details: Dict[str, Any],
+    login_response: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Lightweight score for dates as they are typed in the chat: uses the
+    employee's feature snapshot, so repeated calls only move its window.
+    Returns None fields when the details are incomplete or invalid.
+    """
+    emp_code = login_response.get("empCode")
+    token = login_response.get("token")
+    empty = {"total_score": None, "score_category": None, "recommendation": None, "flags": []}
+
+    if not token or not emp_code or not all(leave_details.get(f) for f in ("start_date", "end_date", "reason")):
+        return empty
+
+    try:
+        curr = CurrentRequest(
+            reason_category=leave_details["reason"],
+            start_date=leave_details["start_date"],
+            end_date=leave_details["end_date"],
+            application_date=leave_details.get("application_date", datetime.now().strftime("%Y-%m-%d"))
+        )
+        end = parse_date(curr.end_date)
+        snapshot = await get_feature_snapshot(
+            token, emp_code,
+            (end - timedelta(days=365)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        )
+        result = analyze_feature_snapshot(emp_code, curr, snapshot)
+    except ValueError:
+        return empty
+
+    score = result["calculated_score"]
+    flags = [
+        name for name, on in (
+            ("REASON_OVERUSED", result["factor_1_reason_frequency"]["is_overused"]),
+            ("CURRENT_SANDWICH", result["factor_2_timing_patterns"]["current_request_flags"]["is_sandwich"]),
+            ("CURRENT_MONTH_END", result["factor_2_timing_patterns"]["current_request_flags"]["is_month_end"]),
+            ("DURATION_OUTLIER", result["factor_3_duration_consistency"]["is_abnormal"]),
+            ("LAST_MINUTE_REQUEST", result["factor_4_advance_notice"]["current_is_last_minute"]),
+        ) if on
+    ]
+    return {
+        "total_score": score["total_score"],
+        "score_category": score["score_category"],
+        "recommendation": score["recommendation"],
+        "flags": flags
+    }
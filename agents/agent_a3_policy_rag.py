@@ -1,8 +1,29 @@
 import os
+import re
+import json
+import asyncio
+import contextlib
+import threading
 from dotenv import load_dotenv
 from docx import Document
+import numpy as np
 import openai
 
+from agent_a3_policy_store import (
+    document_hash,
+    fact_key,
+    load_fact_store,
+    load_policy_index,
+    make_fact,
+    read_text_snapshot,
+    remember_document_hash,
+    save_fact_store,
+    save_policy_index,
+    stat_signature,
+    write_text_snapshot,
+)
+from llm_response_cache import acached_llm_call, cached_llm_call
+
 load_dotenv()
 
 
@@ -10,6 +31,36 @@ load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 POLICY_DOC_PATH = os.getenv("POLICY_DOC_PATH")
 
+# Compiled answers, keyed by policy document hash + question key
+POLICY_FACT_STORE_PATH = os.getenv("POLICY_FACT_STORE_PATH") or (
+    f"{POLICY_DOC_PATH}.facts.json" if POLICY_DOC_PATH else None
+)
+
+# Ask all pending questions about a chunk in one JSON call
+POLICY_BATCH_EXTRACTION = os.getenv("POLICY_BATCH_EXTRACTION", "true").lower() == "true"
+
+# Parsed policy text + chunks, so worker processes skip re-parsing the DOCX
+POLICY_SNAPSHOT_PATH = os.getenv("POLICY_SNAPSHOT_PATH") or (
+    f"{POLICY_DOC_PATH}.snapshot.txt" if POLICY_DOC_PATH else None
+)
+
+# Embedding index over policy paragraphs (same MiniLM model as the RAG services)
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+POLICY_RETRIEVAL = os.getenv("POLICY_RETRIEVAL", "true").lower() == "true"
+POLICY_TOP_K = int(os.getenv("POLICY_TOP_K", "3"))
+POLICY_INDEX_PATH = os.getenv("POLICY_INDEX_PATH") or (
+    f"{POLICY_DOC_PATH}.index.npz" if POLICY_DOC_PATH else None
+)
+
+# Deterministic extractor runs before the LLM; below this confidence it defers
+POLICY_RULES_ENABLED = os.getenv("POLICY_RULES_ENABLED", "true").lower() == "true"
+POLICY_RULE_MIN_CONFIDENCE = float(os.getenv("POLICY_RULE_MIN_CONFIDENCE", "0.85"))
+
+# Parallel chunk queries per question in the async path
+POLICY_MAX_CONCURRENCY = int(os.getenv("POLICY_MAX_CONCURRENCY", "4"))
+
+NOT_SPECIFIED = "Not specified in policy"
+
 POLICY_QUESTIONS = {
 
     "Family function": [
@@ -352,8 +403,6 @@ def load_policy_text():
     
     return "\n".join(full_text)
 
-policy_text = load_policy_text()
-
 
 # --------- CHUNK POLICY---------------------
 
@@ -365,6 +414,168 @@ def chunk_text(text, max_words=800):
     ]
 
 
+def chunk_paragraphs(text, max_words=200):
+    """Group consecutive paragraphs into chunks of at most max_words words."""
+    chunks = []
+    current = []
+    current_words = 0
+
+    for para in text.split("\n"):
+        words = len(para.split())
+        if not words:
+            continue
+
+        if current and current_words + words > max_words:
+            chunks.append("\n".join(current))
+            current, current_words = [], 0
+
+        if words > max_words:
+            chunks.extend(chunk_text(para, max_words))
+            continue
+
+        current.append(para)
+        current_words += words
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
+
+
+# --------- POLICY INDEX ---------------------
+
+_embeddings = None
+_question_vectors = {}
+
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    return _embeddings
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def build_policy_index(text, chunks=None):
+    """
+    Embed the paragraph chunks of the policy text. The index is persisted
+    next to the document and reused until the document hash changes.
+    """
+    doc_hash = document_hash(POLICY_DOC_PATH)
+
+    loaded = load_policy_index(POLICY_INDEX_PATH, doc_hash, EMBEDDING_MODEL_NAME)
+    if loaded:
+        chunks, vectors = loaded
+    else:
+        if chunks is None:
+            chunks = chunk_paragraphs(text)
+        vectors = _normalize(get_embeddings().embed_documents(chunks)) if chunks else np.zeros((0, 0))
+        save_policy_index(POLICY_INDEX_PATH, doc_hash, EMBEDDING_MODEL_NAME, chunks, vectors)
+
+    return {"chunks": chunks, "vectors": vectors}
+
+
+# --------- LAZY POLICY LOADING ---------------------
+
+_policy_lock = threading.Lock()
+_index_lock = threading.Lock()
+_policy = {"signature": None, "text": None, "chunks": None, "index": None}
+
+
+def _policy_doc_path():
+    if not POLICY_DOC_PATH:
+        raise RuntimeError("POLICY_DOC_PATH is not set")
+    return POLICY_DOC_PATH
+
+
+def _load_policy():
+    """
+    Policy text and paragraph chunks, loaded on first use.
+    The DOCX is only parsed when the text snapshot is missing or stale;
+    the snapshot is revalidated by the document's mtime/size and, if
+    those changed, by its content hash.
+    """
+    signature = stat_signature(_policy_doc_path())
+
+    with _policy_lock:
+        if _policy["signature"] == signature:
+            return _policy
+
+        text = chunks = None
+        snapshot = read_text_snapshot(POLICY_SNAPSHOT_PATH)
+        if snapshot:
+            header, snapshot_text, snapshot_chunks = snapshot
+            if (header["mtime_ns"], header["size"]) == signature:
+                remember_document_hash(POLICY_DOC_PATH, signature, header["sha256"])
+                text, chunks = snapshot_text, snapshot_chunks
+            elif document_hash(POLICY_DOC_PATH) == header["sha256"]:
+                # Touched but not edited: keep the text, refresh the header
+                text, chunks = snapshot_text, snapshot_chunks
+                write_text_snapshot(POLICY_SNAPSHOT_PATH, signature, header["sha256"], text, chunks)
+
+        if text is None:
+            text = load_policy_text()
+            chunks = chunk_paragraphs(text)
+            write_text_snapshot(
+                POLICY_SNAPSHOT_PATH, signature, document_hash(POLICY_DOC_PATH), text, chunks
+            )
+
+        _policy.update(signature=signature, text=text, chunks=chunks, index=None)
+        return _policy
+
+
+def get_policy_text():
+    return _load_policy()["text"]
+
+
+def get_policy_index():
+    """Embedding index for the current policy version (None if retrieval is off)."""
+    if not POLICY_RETRIEVAL:
+        return None
+
+    policy = _load_policy()
+    with _index_lock:
+        if policy["index"] is None:
+            policy["index"] = build_policy_index(policy["text"], policy["chunks"])
+        return policy["index"]
+
+
+def __getattr__(name):
+    # Module-level policy_text / policy_index are now resolved lazily
+    if name == "policy_text":
+        return get_policy_text()
+    if name == "policy_index":
+        return get_policy_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def relevant_chunks(policy_text, question, top_k=None):
+    """
+    Top-k policy chunks for a question, most similar first.
+    Without an index every chunk is returned in document order.
+    """
+    policy_index = get_policy_index()
+    if policy_index is None or not policy_index["chunks"]:
+        return chunk_text(policy_text)
+
+    vector = _question_vectors.get(question)
+    if vector is None:
+        vector = _normalize(get_embeddings().embed_query(question))
+        _question_vectors[question] = vector
+
+    scores = policy_index["vectors"] @ vector
+    k = min(top_k or POLICY_TOP_K, len(scores))
+    top = np.argsort(-scores, kind="stable")[:k]
+
+    return [policy_index["chunks"][i] for i in top]
+
+
 # ------------------PARSE ANSWER PARSER -----------------------
 
 def parse_policy_value(value):
@@ -386,6 +597,233 @@ def parse_policy_value(value):
 
 
 
+# ----------------- RULE-BASED EXTRACTION -------------------
+
+CL_TERM = r"(?:casual leave|\bCL\b)"
+PL_TERM = r"(?:privilege(?:d)? leave|earned leave|\bPL\b)"
+LWP_TERM = r"(?:leave without pay|\bLWP\b)"
+LEAVE_TERMS = {"cl": CL_TERM, "pl": PL_TERM, "lwp": LWP_TERM}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "fifteen": 15, "twenty": 20, "thirty": 30,
+}
+NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+MAX_DAYS = re.compile(
+    r"(?:maximum|max\.?|up\s*to|not\s+exceed(?:ing)?|limited\s+to)\s+(?:of\s+)?"
+    + NUMBER + r"(?:\s*\(\d+\))?\s+(?:consecutive\s+|working\s+|leave\s+)*days",
+    re.IGNORECASE,
+)
+PERCENT = re.compile(r"(\d+)\s*(?:%|per\s*cent|percent)", re.IGNORECASE)
+
+NEGATIVE = re.compile(
+    r"\b(?:not|cannot|can't|never)\s+(?:be\s+)?"
+    r"(?:allowed|permitted|availed|taken|granted|eligible|counted|included|considered|required|applicable|used)",
+    re.IGNORECASE,
+)
+POSITIVE = re.compile(
+    r"\b(?:is|are|be|shall\s+be|will\s+be)\s+"
+    r"(?:allowed|permitted|availed|taken|granted|counted|included|considered|required|applicable)"
+    r"|\bcan\s+(?:be\s+)?(?:availed|taken|used|applied)|\bmust\b|\beligible\b",
+    re.IGNORECASE,
+)
+
+PURPOSE_TERMS = {
+    "family_function": (r"family function", None),
+    "outstation": (r"outstation|out\s*of\s*station|travel", None),
+    "sickness": (r"sickness|illness|medical", r"family member"),
+    "family_sickness": (r"(?:sickness|illness)\s+of\s+(?:a\s+)?family member", None),
+    "death_of_relatives": (r"death of (?:a\s+)?relatives?", None),
+    "death_of_family_member": (r"death of (?:a\s+|an\s+)?(?:immediate\s+)?family member", None),
+    "other_reasons": (r"personal|other reasons", None),
+}
+
+
+def _rule(kind, require, exclude=None):
+    return {
+        "kind": kind,
+        "require": [re.compile(r, re.IGNORECASE) for r in require],
+        "exclude": [re.compile(r, re.IGNORECASE) for r in (exclude or [])],
+    }
+
+
+def _build_rules():
+    rules = {}
+
+    for leave, term in LEAVE_TERMS.items():
+        others = [t for name, t in LEAVE_TERMS.items() if name != leave]
+        rules[f"max_{leave}_consecutive_days"] = _rule(
+            "max_days", [term, r"consecutive|at a (?:time|stretch)"], others + [r"month"]
+        )
+
+    for purpose, (pattern, exclude) in PURPOSE_TERMS.items():
+        for leave in ("cl", "pl"):
+            others = [t for name, t in LEAVE_TERMS.items() if name != leave]
+            rules[f"{leave}_allowed_for_{purpose}"] = _rule(
+                "yes_no", [LEAVE_TERMS[leave], pattern], others + ([exclude] if exclude else [])
+            )
+
+    rules["monthly_leave_limit"] = _rule("max_days", [r"\bmonth"])
+    rules["minimum_team_availability_percentage"] = _rule("percent", [r"\bteam", r"availab"])
+    rules["lwp_allowed"] = _rule("yes_no", [LWP_TERM, r"exhaust|insufficient|balance"], [r"trainee"])
+    rules["lwp_allowed_when_balances_exhausted"] = rules["lwp_allowed"]
+    rules["lwp_allowed_for_trainee"] = _rule("yes_no", [LWP_TERM, r"trainee"])
+    rules["weekends_counted_for_leave"] = _rule("yes_no", [r"weekend", r"count|includ|consider"])
+    rules["special_leave_for_death_of_family_member"] = _rule(
+        "yes_no", [r"special leave|bereavement", r"death"]
+    )
+    rules["special_approval_required_for_long_leave"] = _rule(
+        "yes_no", [r"approval", r"exceed|more than|beyond"]
+    )
+    rules["max_leave_days_with_approval"] = rules["special_approval_required_for_long_leave"]
+
+    return rules
+
+
+POLICY_RULES = _build_rules()
+
+RULE_STATS = {"attempted": 0, "hits": 0}
+_rule_stats_lock = threading.Lock()
+
+# Clause boundaries inside a sentence; list commas are not boundaries
+CLAUSE_BREAK = re.compile(r";|:|\b(?:but|except|however|whereas|unless|while|although)\b", re.IGNORECASE)
+
+# Confidence of one deciding sentence: every rule term in the clause that
+# carries the value, or the terms spread over several clauses
+CLAUSE_CONFIDENCE = 0.88
+SENTENCE_CONFIDENCE = 0.7
+# Added per further sentence agreeing on the same value
+AGREEMENT_BONUS = 0.05
+MAX_RULE_CONFIDENCE = 0.97
+
+
+def _count_rule(*names):
+    with _rule_stats_lock:
+        for name in names:
+            RULE_STATS[name] += 1
+
+
+def _sentences(chunk):
+    return [s for s in re.split(r"(?<=[.;!?])\s+|\n", chunk) if s.strip()]
+
+
+def _clauses(sentence):
+    return [c for c in CLAUSE_BREAK.split(sentence) if c.strip()]
+
+
+def _to_number(token):
+    token = token.lower()
+    return int(token) if token.isdigit() else NUMBER_WORDS.get(token)
+
+
+def _clause_value(kind, clause):
+    if kind == "max_days":
+        values = {_to_number(m) for m in MAX_DAYS.findall(clause)}
+        return str(values.pop()) if len(values) == 1 else None
+
+    if kind == "percent":
+        values = set(PERCENT.findall(clause))
+        return values.pop() if len(values) == 1 else None
+
+    negative = NEGATIVE.search(clause)
+    # "not allowed" also contains "allowed": look for a positive outside the negation
+    positive = POSITIVE.search(NEGATIVE.sub(" ", clause))
+    if negative and not positive:
+        return "NO"
+    if positive and not negative:
+        return "YES"
+    return None
+
+
+def _rule_value(rule, sentence):
+    """
+    (value, confidence) for one sentence, or None. The value is read from
+    the clause naming every rule term; failing that, from the clauses
+    naming the rule's most specific (last) term, at lower confidence.
+    Clauses disagreeing with each other give None.
+    """
+    clauses = _clauses(sentence)
+    scoped = [c for c in clauses if all(r.search(c) for r in rule["require"])]
+    confidence = CLAUSE_CONFIDENCE
+    if not scoped:
+        scoped = [c for c in clauses if rule["require"][-1].search(c)]
+        confidence = SENTENCE_CONFIDENCE
+
+    values = {_clause_value(rule["kind"], c) for c in scoped} - {None}
+    if len(values) != 1:
+        return None
+    return values.pop(), confidence
+
+
+def extract_policy_value(chunks, key):
+    """
+    Deterministic extraction for a question key.
+    Returns (raw_answer, confidence); raw_answer is None when the rules
+    cannot decide (no rule, no matching sentence, or conflicting values).
+    Confidence comes from how tightly the best sentence matched, raised a
+    little for every further sentence agreeing with it.
+    """
+    rule = POLICY_RULES.get(key)
+    if rule is None:
+        return None, 0.0
+
+    matches = []
+    for chunk in chunks:
+        for sentence in _sentences(chunk):
+            if not all(r.search(sentence) for r in rule["require"]):
+                continue
+            if any(r.search(sentence) for r in rule["exclude"]):
+                continue
+            match = _rule_value(rule, sentence)
+            if match is not None:
+                matches.append(match)
+
+    values = {value for value, _ in matches}
+    if len(values) != 1:
+        return None, 0.0
+
+    confidence = max(c for _, c in matches) + AGREEMENT_BONUS * (len(matches) - 1)
+    return values.pop(), round(min(confidence, MAX_RULE_CONFIDENCE), 2)
+
+
+def extract_policy_answers(policy_text, questions):
+    """
+    Run the rule-based extractor over each question's retrieved chunks.
+    Returns (answers, remaining): confident answers keyed by question key,
+    and the questions that still need the LLM.
+    """
+    if not POLICY_RULES_ENABLED:
+        return {}, list(questions)
+
+    answers = {}
+    remaining = []
+
+    for q in questions:
+        raw, confidence = extract_policy_value(relevant_chunks(policy_text, q["question"]), q["key"])
+
+        if raw is not None and confidence >= POLICY_RULE_MIN_CONFIDENCE:
+            answers[q["key"]] = raw
+            _count_rule("attempted", "hits")
+        else:
+            remaining.append(q)
+            _count_rule("attempted")
+
+    return answers, remaining
+
+
+def rule_extractor_stats():
+    """How many questions the rules answered without an LLM call."""
+    attempted = RULE_STATS["attempted"]
+    return {
+        "attempted": attempted,
+        "hits": RULE_STATS["hits"],
+        "llm_fallbacks": attempted - RULE_STATS["hits"],
+        "hit_rate": round(RULE_STATS["hits"] / attempted, 3) if attempted else 0.0,
+    }
+
+
 # ----------------- LLM -------------------
 
 SYSTEM_PROMPT = """
@@ -398,12 +836,35 @@ RULES:
 - Do not explain.
 """
 
-def ask_policy_llm(policy_text, question, answer_type):
+def _chat(messages):
+    """Temperature-0 GPT-4 call through the shared response cache."""
+    def call():
+        response = openai.ChatCompletion.create(
+            model="gpt-4",
+            temperature=0,
+            messages=messages
+        )
+        return response.choices[0].message.content
 
-    chunks = chunk_text(policy_text)
-    
-    for chunk in chunks:
-        user_prompt = f"""
+    return cached_llm_call("gpt-4", messages, {"temperature": 0}, call)
+
+
+async def _achat(messages, semaphore=None):
+    """Async _chat(); only cache misses take a semaphore slot."""
+    async def call():
+        async with semaphore or contextlib.nullcontext():
+            response = await openai.ChatCompletion.acreate(
+                model="gpt-4",
+                temperature=0,
+                messages=messages
+            )
+        return response.choices[0].message.content
+
+    return await acached_llm_call("gpt-4", messages, {"temperature": 0}, call)
+
+
+def _question_messages(chunk, question, answer_type):
+    user_prompt = f"""
 POLICY DOCUMENT:
 {chunk}
 
@@ -412,17 +873,19 @@ QUESTION:
 
 Answer type: {answer_type}
 """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            temperature=0,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
 
-        answer = response.choices[0].message.content.strip()
+def ask_policy_llm(policy_text, question, answer_type, chunks=None):
+
+    if chunks is None:
+        chunks = chunk_text(policy_text)
+    
+    for chunk in chunks:
+        answer = _chat(_question_messages(chunk, question, answer_type)).strip()
 
         # If model gives a concrete answer, return it
         if answer not in ["Not specified in policy", ""]:
@@ -431,21 +894,287 @@ Answer type: {answer_type}
     # If no chunk contained the answer
     return "Not specified in policy"
 
-def query_leave_policies(state: dict):
-    reason = state["reason"]
-    questions= POLICY_QUESTIONS.get(reason,[])
 
-    policy_facts={}
+async def aask_policy_llm(policy_text, question, answer_type, max_concurrency=None, chunks=None):
+    """
+    Async variant of ask_policy_llm().
+    All chunks are queried concurrently (bounded by a semaphore). The answer
+    of the earliest chunk in document order wins, as in the sequential walk:
+    once chunk i answers, later chunks are cancelled, and the result is
+    settled as soon as every chunk before i has come back unanswered.
+    """
+    if chunks is None:
+        chunks = chunk_text(policy_text)
+    if not chunks:
+        return NOT_SPECIFIED
+
+    semaphore = asyncio.Semaphore(max_concurrency or POLICY_MAX_CONCURRENCY)
+
+    async def ask_chunk(chunk):
+        answer = await _achat(_question_messages(chunk, question, answer_type), semaphore)
+        return answer.strip()
+
+    tasks = [asyncio.ensure_future(ask_chunk(chunk)) for chunk in chunks]
+    index_of = {task: i for i, task in enumerate(tasks)}
+
+    best_index = None
+    best_answer = NOT_SPECIFIED
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                answer = task.result()
+                i = index_of[task]
+                if answer not in [NOT_SPECIFIED, ""] and (best_index is None or i < best_index):
+                    best_index, best_answer = i, answer
+
+            if best_index is not None:
+                # Later chunks can no longer win
+                for task in pending:
+                    if index_of[task] > best_index:
+                        task.cancel()
+                pending = {task for task in pending if index_of[task] < best_index}
+
+        return best_answer
+
+    finally:
+        outstanding = [task for task in tasks if not task.done()]
+        for task in outstanding:
+            task.cancel()
+        if outstanding:
+            await asyncio.gather(*outstanding, return_exceptions=True)
+
+
+BATCH_SYSTEM_PROMPT = """
+You are an HR policy assistant.
+
+RULES:
+- Answer ONLY using the provided policy document.
+- Answer every question key listed.
+- Each answer is strictly YES, NO, or a NUMBER.
+- If the answer is not explicitly mentioned, use "Not specified in policy".
+- Respond with ONLY a JSON object mapping each key to its answer, no markdown.
+"""
+
+
+def _normalize_batch_answer(value):
+    if isinstance(value, bool):
+        return "YES" if value else "NO"
+    if isinstance(value, (int, float)):
+        return str(int(value)) if float(value).is_integer() else str(value)
+    if value is None:
+        return NOT_SPECIFIED
+    return str(value).strip()
+
+
+def ask_policy_llm_batch(policy_text, questions):
+    """
+    Batched variant of ask_policy_llm().
+    Every still-unanswered question is asked about a chunk in a single
+    JSON call; keys answered by an earlier chunk are dropped from the
+    prompts of later chunks. With the policy index, a question is only
+    asked about its own top-k chunks. A key left open by a malformed reply
+    is asked again on its own, so a parse failure never becomes a stored
+    "Not specified". Returns {key: raw_answer}.
+    """
+    pending = {}
     for q in questions:
-        raw = ask_policy_llm(
+        pending.setdefault(q["key"], q)
+
+    candidates = {
+        key: relevant_chunks(policy_text, q["question"])
+        for key, q in pending.items()
+    }
+
+    # Best-ranked chunks of every question first
+    chunk_order = []
+    for rank in range(max((len(c) for c in candidates.values()), default=0)):
+        for chunks in candidates.values():
+            if rank < len(chunks) and chunks[rank] not in chunk_order:
+                chunk_order.append(chunks[rank])
+
+    answers = {}
+    # Keys whose chunk reply could not be parsed: no answer is known for them
+    unparsed = set()
+
+    for chunk in chunk_order:
+        asked = {
+            key: q for key, q in pending.items()
+            if chunk in candidates[key]
+        }
+        if not asked:
+            continue
+
+        question_lines = "\n".join(
+            f"- {key}: {q['question']} (answer type: {q['answer_type']})"
+            for key, q in asked.items()
+        )
+        user_prompt = f"""
+POLICY DOCUMENT:
+{chunk}
+
+QUESTIONS:
+{question_lines}
+"""
+
+        content = _chat([
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]).strip()
+        content = content.replace("```json", "").replace("```", "").strip()
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, dict):
+            unparsed.update(asked)
+            continue
+
+        for key in list(asked):
+            answer = _normalize_batch_answer(parsed.get(key))
+            if answer not in [NOT_SPECIFIED, ""]:
+                answers[key] = answer
+                del pending[key]
+
+    for key, q in pending.items():
+        if key in unparsed:
+            # A malformed reply is not "not specified": ask this question on its own
+            answers[key] = ask_policy_llm(
+                policy_text, q["question"], q["answer_type"], chunks=candidates[key]
+            )
+        else:
+            answers[key] = NOT_SPECIFIED
+
+    return answers
+
+
+def ask_policy_questions(policy_text, questions):
+    """
+    Answer a list of POLICY_QUESTIONS entries -> {key: raw_answer}.
+    The rule-based extractor goes first; only undecided questions
+    reach the LLM.
+    """
+    answers, questions = extract_policy_answers(policy_text, questions)
+    if not questions:
+        return answers
+
+    if POLICY_BATCH_EXTRACTION:
+        answers.update(ask_policy_llm_batch(policy_text, questions))
+        return answers
+
+    for q in questions:
+        answers[q["key"]] = ask_policy_llm(
             policy_text,
             q["question"],
-            q["answer_type"]
+            q["answer_type"],
+            chunks=relevant_chunks(policy_text, q["question"])
         )
-        policy_facts[q["key"]]=parse_policy_value(raw)
+    return answers
+
+
+def unique_policy_questions():
+    """All POLICY_QUESTIONS across reasons, de-duplicated by key."""
+    unique = {}
+    for questions in POLICY_QUESTIONS.values():
+        for q in questions:
+            unique.setdefault(q["key"], q)
+    return list(unique.values())
+
+
+async def aask_policy_questions(policy_text, questions):
+    """Async ask_policy_questions(): questions are answered concurrently."""
+    answers, questions = extract_policy_answers(policy_text, questions)
+    if not questions:
+        return answers
+
+    if POLICY_BATCH_EXTRACTION:
+        answers.update(await asyncio.to_thread(ask_policy_llm_batch, policy_text, questions))
+        return answers
+
+    llm_answers = await asyncio.gather(*[
+        aask_policy_llm(
+            policy_text,
+            q["question"],
+            q["answer_type"],
+            chunks=relevant_chunks(policy_text, q["question"])
+        )
+        for q in questions
+    ])
+    answers.update({q["key"]: answer for q, answer in zip(questions, llm_answers)})
+    return answers
+
+
+# --------------- COMPILED FACT STORE -------------------
+
+def _missing_facts(questions):
+    doc_hash = document_hash(_policy_doc_path())
+    store = load_fact_store(POLICY_FACT_STORE_PATH)
+    missing = [q for q in questions if fact_key(doc_hash, q["key"]) not in store]
+    return doc_hash, store, missing
 
+
+def _store_answers(doc_hash, store, answers):
+    for key, raw in answers.items():
+        store[fact_key(doc_hash, key)] = make_fact(parse_policy_value(raw), raw)
+    save_fact_store(POLICY_FACT_STORE_PATH, store, doc_hash=doc_hash)
+
+
+def _facts_for(doc_hash, store, questions):
+    policy_facts={}
+    for q in questions:
+        policy_facts[q["key"]] = store[fact_key(doc_hash, q["key"])]["value"]
     return policy_facts
 
+
+def compile_policy_facts(force=False):
+    """
+    Build the fact store for the current policy document version.
+    Only questions missing for this document hash are sent to the LLM
+    (all of them when force=True). Facts of older versions are dropped.
+    """
+    questions = unique_policy_questions()
+    if force:
+        doc_hash = document_hash(_policy_doc_path())
+        store, missing = load_fact_store(POLICY_FACT_STORE_PATH), questions
+    else:
+        doc_hash, store, missing = _missing_facts(questions)
+
+    _store_answers(doc_hash, store, ask_policy_questions(get_policy_text(), missing))
+    return {
+        k.split(":", 1)[1]: v["value"]
+        for k, v in store.items()
+        if k.startswith(f"{doc_hash}:")
+    }
+
+
+def query_leave_policies(state: dict):
+    reason = state["reason"]
+    questions= POLICY_QUESTIONS.get(reason,[])
+
+    doc_hash, store, missing = _missing_facts(questions)
+
+    # Not compiled yet for this policy version
+    if missing:
+        _store_answers(doc_hash, store, ask_policy_questions(get_policy_text(), missing))
+
+    return _facts_for(doc_hash, store, questions)
+
+
+async def aquery_leave_policies(state: dict):
+    """Async query_leave_policies()."""
+    reason = state["reason"]
+    questions= POLICY_QUESTIONS.get(reason,[])
+
+    doc_hash, store, missing = _missing_facts(questions)
+
+    if missing:
+        _store_answers(doc_hash, store, await aask_policy_questions(get_policy_text(), missing))
+
+    return _facts_for(doc_hash, store, questions)
+
 """
 state = {
     "emp_id": "OMI-0001",
@@ -460,3 +1189,9 @@ print(policy_facts)
 
 
 """
+
+
+if __name__ == "__main__":
+    # Precompile the fact store after a policy document edit
+    facts = compile_policy_facts()
+    print(f"Compiled {len(facts)} policy facts into {POLICY_FACT_STORE_PATH}")
@@ -0,0 +1,224 @@
+# agent_a3_policy_store.py
+# --------------------------------------------------
+# Disk-backed stores for the Policy RAG agent (A3)
+# --------------------------------------------------
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_lock = threading.Lock()
+
+# path -> ((mtime_ns, size), sha256)
+_hash_cache: Dict[str, Any] = {}
+
+# path -> ((mtime_ns, size), facts)
+_fact_cache: Dict[str, Any] = {}
+
+
+# ----------------- DOCUMENT VERSION -------------------
+
+def stat_signature(path: str):
+    """(mtime_ns, size) of a file, used to revalidate derived artefacts."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def remember_document_hash(path: str, signature, doc_hash: str):
+    """Seed the hash cache, e.g. with the hash recorded in a text snapshot."""
+    with _lock:
+        _hash_cache[path] = (tuple(signature), doc_hash)
+
+
+def document_hash(path: str) -> str:
+    """
+    Content hash (sha256) of the policy document.
+    Re-hashed only when the file's mtime/size change.
+    """
+    signature = stat_signature(path)
+
+    with _lock:
+        cached = _hash_cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    doc_hash = digest.hexdigest()
+
+    with _lock:
+        _hash_cache[path] = (signature, doc_hash)
+    return doc_hash
+
+
+# ----------------- ATOMIC WRITE -------------------
+
+def atomic_write(path: str, data: bytes):
+    """Write to a temp file in the same directory and rename over the target."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# ----------------- POLICY FACT STORE -------------------
+
+def fact_key(doc_hash: str, question_key: str) -> str:
+    return f"{doc_hash}:{question_key}"
+
+
+def load_fact_store(path: Optional[str]) -> Dict[str, Any]:
+    """
+    Load the compiled fact store:
+        {"<doc sha256>:<question key>": {"value": ..., "raw": ..., "compiled_at": ...}}
+    Missing or unreadable files give an empty store.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    signature = stat_signature(path)
+    with _lock:
+        cached = _fact_cache.get(path)
+        if cached and cached[0] == signature:
+            return dict(cached[1])
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            facts = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    with _lock:
+        _fact_cache[path] = (signature, facts)
+    return dict(facts)
+
+
+def save_fact_store(path: Optional[str], facts: Dict[str, Any], doc_hash: Optional[str] = None):
+    """
+    Persist the fact store. When doc_hash is given, entries compiled for
+    older versions of the policy document are dropped.
+    """
+    if not path:
+        return
+
+    if doc_hash:
+        prefix = f"{doc_hash}:"
+        facts = {k: v for k, v in facts.items() if k.startswith(prefix)}
+
+    atomic_write(path, json.dumps(facts, indent=2, sort_keys=True).encode("utf-8"))
+
+    with _lock:
+        _fact_cache[path] = (stat_signature(path), dict(facts))
+
+
+def make_fact(value: Any, raw: Optional[str]) -> Dict[str, Any]:
+    return {
+        "value": value,
+        "raw": raw,
+        "compiled_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# ----------------- CHUNK EMBEDDING INDEX -------------------
+
+def save_policy_index(path: Optional[str], doc_hash: str, model: str, chunks: List[str], vectors):
+    """Persist chunk texts and their (L2-normalised) embeddings as .npz."""
+    if not path:
+        return
+
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        vectors=np.asarray(vectors, dtype=np.float32),
+        chunks=np.array(json.dumps(chunks)),
+        doc_hash=np.array(doc_hash),
+        model=np.array(model),
+    )
+    atomic_write(path, buffer.getvalue())
+
+
+def load_policy_index(path: Optional[str], doc_hash: str, model: str):
+    """
+    Load a persisted index. Returns (chunks, vectors), or None when the
+    file is missing or was built for another document version / model.
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["doc_hash"]) != doc_hash or str(data["model"]) != model:
+                return None
+            return json.loads(str(data["chunks"])), data["vectors"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# ----------------- TEXT SNAPSHOT -------------------
+#
+# Layout: one JSON header line, the policy text, then the paragraph
+# chunks separated by RECORD_SEPARATOR. The header records the source
+# document's (mtime_ns, size, sha256) so every worker can validate the
+# snapshot without opening the DOCX.
+
+RECORD_SEPARATOR = "\x1e"
+
+
+def write_text_snapshot(path: Optional[str], signature, doc_hash: str, text: str, chunks: List[str]):
+    if not path:
+        return
+
+    text_bytes = text.encode("utf-8")
+    header = {
+        "mtime_ns": signature[0],
+        "size": signature[1],
+        "sha256": doc_hash,
+        "text_bytes": len(text_bytes),
+    }
+    body = RECORD_SEPARATOR.join(chunks).encode("utf-8")
+    atomic_write(path, json.dumps(header).encode("utf-8") + b"\n" + text_bytes + body)
+
+
+def read_text_snapshot(path: Optional[str]):
+    """
+    Read a snapshot. Returns (header, text, chunks) or None when the file
+    is missing or unreadable. Validation is left to the caller.
+    The text is decoded into each process's memory; what the snapshot
+    saves is the DOCX parse, not the copy.
+    """
+    if not path or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        header_end = data.find(b"\n")
+        if header_end < 0:
+            return None
+        header = json.loads(data[:header_end].decode("utf-8"))
+
+        text_start = header_end + 1
+        text_end = text_start + header["text_bytes"]
+        text = data[text_start:text_end].decode("utf-8")
+        body = data[text_end:].decode("utf-8")
+    except (OSError, ValueError, KeyError):
+        return None
+
+    chunks = body.split(RECORD_SEPARATOR) if body else []
+    return header, text, chunks
@@ -1,61 +1,134 @@
 from agent_a3_policy_rag import query_leave_policies
+from employee_context_cache import employee_key, get_employee_context
+from team_calendar import team_availability as calendar_team_availability
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
 import os
+import threading
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 
 
 LEAVE_BALANCE_API = os.getenv("LEAVE_BALANCE_API")
 EMPLOYEE_DETAILS_API = os.getenv("EMPLOYEE_DETAIL_API")
 total_leave_with_sandwich=os.getenv("total_leave_with_sandwich")
 
-def agent_a4_policy_and_eligibility(state: dict, token: str) -> dict:
-    """
-    Agent A4
-    Input:
-      - state (from previous agents)
-      - token (from login API / LangGraph)
-    Output:
-      - updated state
-    """
+# Policy lookup + 3 HTTP calls run side by side
+A4_MAX_WORKERS = int(os.getenv("A4_MAX_WORKERS", "16"))
+A4_HTTP_POOL_SIZE = int(os.getenv("A4_HTTP_POOL_SIZE", "20"))
+# Bulk (HR planning) runs get their own, smaller pool so they never queue
+# ahead of interactive eligibility checks
+A4_BULK_MAX_WORKERS = int(os.getenv("A4_BULK_MAX_WORKERS", "4"))
 
-    policy_facts = query_leave_policies(state)
+_executor = ThreadPoolExecutor(max_workers=A4_MAX_WORKERS, thread_name_prefix="a4")
+_bulk_executor = ThreadPoolExecutor(max_workers=A4_BULK_MAX_WORKERS, thread_name_prefix="a4-bulk")
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Keep-alive session shared by all A4 calls (connection pooling)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=A4_HTTP_POOL_SIZE,
+                pool_maxsize=A4_HTTP_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
 
-    # ---------------- EMPLOYEE CONTEXT ----------------
-    headers = {"Authorization": f"Bearer {token}"}
 
-    # Leave balance
-    lb_resp = requests.get(
+# ---------------- EMPLOYEE CONTEXT ----------------
+
+def fetch_leave_balances(headers: dict) -> dict:
+    lb_resp = get_http_session().get(
         LEAVE_BALANCE_API, headers=headers, timeout=10, verify=False
     )
     lb_resp.raise_for_status()
 
+    balances = {"CL": 0.0, "PL": 0.0}
+    for item in lb_resp.json().get("data", []):
+        if item.get("leaveTypeCode") in balances:
+            balances[item["leaveTypeCode"]] = item.get("balance", 0.0)
+    return balances
+
+
+def fetch_sandwich_leave_count(state: dict, headers: dict) -> int:
     payload = {
     "startDate": state["start_date"],
     "endDate": state["end_date"],
     "leaveType": "CL"
     }
     # total leave
-    result= requests.post(total_leave_with_sandwich,json=payload,headers=headers,timeout=10,verify=False)
+    result= get_http_session().post(total_leave_with_sandwich,json=payload,headers=headers,timeout=10,verify=False)
     
     result.raise_for_status()
 
-    with_sandwich_leave_count = int(result.json()["data"]["noofleaves"])
+    return int(result.json()["data"]["noofleaves"])
 
-    balances = {"CL": 0.0, "PL": 0.0}
-    for item in lb_resp.json().get("data", []):
-        if item.get("leaveTypeCode") in balances:
-            balances[item["leaveTypeCode"]] = item.get("balance", 0.0)
 
-    # Employee details
-    ed_resp = requests.get(
+def fetch_employee_details(headers: dict) -> dict:
+    ed_resp = get_http_session().get(
         EMPLOYEE_DETAILS_API, headers=headers, timeout=10
     )
     ed_resp.raise_for_status()
 
-    emp = ed_resp.json()["data"]["Employee Details"]
+    return ed_resp.json()["data"]["Employee Details"]
 
+
+def team_availability_for(emp_code, start_date, end_date) -> Tuple[float, str]:
+    """
+    (availability %, source): "team_calendar" when the employee is on a
+    loaded team whose leave history is fully synced, otherwise "estimate"
+    (fixed 10-member team, 2 on leave).
+    """
+    team_availability = calendar_team_availability(emp_code, start_date, end_date)
+    if team_availability is not None:
+        return team_availability, "team_calendar"
+
+    # No complete team calendar for this employee: legacy estimate
     team_size = 10
     team_members_on_leave = 2
-    team_availability = ((team_size - team_members_on_leave) / team_size) * 100
+    return ((team_size - team_members_on_leave) / team_size) * 100, "estimate"
+
+
+def agent_a4_policy_and_eligibility(state: dict, token: str) -> dict:
+    """
+    Agent A4
+    Input:
+      - state (from previous agents)
+      - token (from login API / LangGraph)
+    Output:
+      - updated state
+    """
+
+    headers = {"Authorization": f"Bearer {token}"}
+    emp_code = employee_key(state)
+
+    # Independent lookups: latency is the slowest call, not the sum.
+    # Balance and details are cached per employee until A6/A7 invalidate them.
+    policy_future = _executor.submit(query_leave_policies, state)
+    balance_future = _executor.submit(
+        get_employee_context, emp_code, "leave_balance", lambda: fetch_leave_balances(headers)
+    )
+    sandwich_future = _executor.submit(fetch_sandwich_leave_count, state, headers)
+    details_future = _executor.submit(
+        get_employee_context, emp_code, "employee_details", lambda: fetch_employee_details(headers)
+    )
+
+    policy_facts = policy_future.result()
+    balances = balance_future.result()
+    with_sandwich_leave_count = sandwich_future.result()
+    emp = details_future.result()
+
+    team_availability, team_availability_source = team_availability_for(
+        emp_code, state["start_date"], state["end_date"]
+    )
 
 
     employee_context = {
@@ -63,7 +136,8 @@ def agent_a4_policy_and_eligibility(state: dict, token: str) -> dict:
         "gender": emp["employee_gender"],
         "on_notice_period": emp["notice_period_status"],
         "employee_status": emp["employee_status"],
-        "team_availiblity": team_availability
+        "team_availiblity": team_availability,
+        "team_availability_source": team_availability_source
     }
 
     # ---------------- ELIGIBILITY LOGIC ----------------
@@ -122,3 +196,200 @@ def agent_a4_policy_and_eligibility(state: dict, token: str) -> dict:
     }
 
     return state
+
+
+# ---------------- BULK ELIGIBILITY (HR PLANNING) ----------------
+
+def _policy_limits(policy_facts: dict) -> dict:
+    """Scalar policy inputs of the eligibility rules, as used by A4 above."""
+    def allowed(prefix):
+        key = next((k for k in policy_facts if k.startswith(prefix)), None)
+        return bool(key) and policy_facts.get(key) is not False
+
+    def number(key, default):
+        value = policy_facts.get(key, default)
+        return float(default if value is None else value)
+
+    min_team = policy_facts.get("minimum_team_availability_percentage")
+
+    return {
+        "min_team": np.nan if min_team is None else float(min_team),
+        "cl_allowed": allowed("cl_allowed_for_"),
+        "pl_allowed": allowed("pl_allowed_for_"),
+        "max_cl": number("max_cl_consecutive_days", 0),
+        "max_pl": number("max_pl_consecutive_days", 0),
+        "lwp_allowed": bool(policy_facts.get("lwp_allowed", True)),
+        "max_lwp": number("max_lwp_consecutive_days", 8),
+        "lwp_trainee": bool(policy_facts.get("lwp_allowed_for_trainee", True)),
+    }
+
+
+class _UnverifiedOwner(Exception):
+    """Employee Details carried no employee identifier to check."""
+
+    def __init__(self, details: dict):
+        super().__init__("Employee details do not name the employee")
+        self.details = details
+
+
+def _bulk_employee_context(emp_code: str, headers: dict):
+    """
+    (balances, details) for one bulk row. The balance and details APIs
+    answer for the token's owner, so a payload naming another employee is
+    an error, and one naming no employee is used for this row only: it is
+    not cached under emp_code.
+    """
+    def owned_details():
+        details = fetch_employee_details(headers)
+        owner = employee_key(details)
+        if owner is None:
+            raise _UnverifiedOwner(details)
+        if owner != str(emp_code):
+            raise PermissionError(f"Token does not belong to employee {emp_code}")
+        return details
+
+    try:
+        details = get_employee_context(emp_code, "employee_details", owned_details)
+    except _UnverifiedOwner as e:
+        return fetch_leave_balances(headers), e.details
+    balances = get_employee_context(emp_code, "leave_balance", lambda: fetch_leave_balances(headers))
+    return balances, details
+
+
+def bulk_policy_and_eligibility(rows: list, token: str = None) -> list:
+    """
+    Evaluate eligibility for many (employee, start, end, reason) rows.
+
+    rows: dicts with empCode, start_date, end_date, reason, calendar_days
+          and the employee's own token. Balance and details are only
+          served for the token's owner, so a row without its own token
+          (or with someone else's) gets an `error`; `token` is used for
+          the sandwich count only.
+
+    Policy facts are loaded once per reason, balances/details once per
+    employee and the sandwich count once per row, all on the bulk pool
+    (A4_BULK_MAX_WORKERS), separate from the interactive A4 pool.
+    The CL/PL/LWP arithmetic then runs column-wise with NumPy.
+    Each result carries the row identifiers, an `eligibility` dict in the
+    same shape as state["eligibility"] and the team availability used with
+    its source ("team_calendar" or "estimate"), or an `error`.
+    """
+    if not rows:
+        return []
+
+    # ---- Fan out all lookups ----
+    policy_futures = {
+        reason: _bulk_executor.submit(query_leave_policies, {"reason": reason})
+        for reason in {row["reason"] for row in rows}
+    }
+
+    employee_futures = {}
+    sandwich_futures = []
+    for row in rows:
+        emp_code = employee_key(row)
+        row_token = row.get("token")
+
+        if emp_code not in employee_futures:
+            if not emp_code or not row_token:
+                employee_futures[emp_code] = ValueError(f"No token for employee {emp_code}")
+            else:
+                employee_futures[emp_code] = _bulk_executor.submit(
+                    _bulk_employee_context, emp_code, {"Authorization": f"Bearer {row_token}"}
+                )
+        sandwich_futures.append(_bulk_executor.submit(
+            fetch_sandwich_leave_count, row, {"Authorization": f"Bearer {row_token or token}"}
+        ))
+
+    # ---- Collect, isolating failures per row ----
+    limits = {}
+    for reason, future in policy_futures.items():
+        try:
+            limits[reason] = _policy_limits(future.result())
+        except Exception as e:
+            limits[reason] = e
+
+    employees = {}
+    for emp_code, future in employee_futures.items():
+        try:
+            employees[emp_code] = future if isinstance(future, Exception) else future.result()
+        except Exception as e:
+            employees[emp_code] = e
+
+    results = []
+    valid = []
+    for i, row in enumerate(rows):
+        result = {
+            "empCode": employee_key(row),
+            "start_date": row["start_date"],
+            "end_date": row["end_date"],
+            "reason": row["reason"],
+        }
+        results.append(result)
+
+        employee = employees[result["empCode"]]
+        error = limits[row["reason"]] if isinstance(limits[row["reason"]], Exception) else None
+        error = error or (employee if isinstance(employee, Exception) else None)
+        try:
+            sandwich = sandwich_futures[i].result()
+        except Exception as e:
+            error = error or e
+
+        if error is not None:
+            result["error"] = str(error)
+            continue
+
+        result["total_leave"] = sandwich
+        valid.append(i)
+
+    if not valid:
+        return results
+
+    # ---- Column-wise eligibility ----
+    def column(fn, dtype=float):
+        return np.array([fn(rows[i]) for i in valid], dtype=dtype)
+
+    def limit(name, dtype=float):
+        return column(lambda row: limits[row["reason"]][name], dtype)
+
+    def employee(row):
+        return employees[employee_key(row)]
+
+    calendar_days = column(lambda row: row["calendar_days"])
+    cl_balance = column(lambda row: employee(row)[0].get("CL", 0))
+    pl_balance = column(lambda row: employee(row)[0].get("PL", 0))
+    is_trainee = column(lambda row: employee(row)[1]["employee_status"] == "Trainee", bool)
+    team = [
+        team_availability_for(employee_key(rows[i]), rows[i]["start_date"], rows[i]["end_date"])
+        for i in valid
+    ]
+    team_availability = np.array([value for value, _ in team], dtype=float)
+
+    min_team = limit("min_team")
+    team_ok = np.isnan(min_team) | (team_availability >= np.nan_to_num(min_team))
+
+    cl_max_days = np.where(limit("cl_allowed", bool) & team_ok, np.minimum(cl_balance, limit("max_cl")), 0.0)
+    pl_max_days = np.where(limit("pl_allowed", bool) & team_ok, np.minimum(pl_balance, limit("max_pl")), 0.0)
+
+    lwp_eligible = (
+        limit("lwp_allowed", bool)
+        & (calendar_days <= limit("max_lwp"))
+        & team_ok
+        & (~is_trainee | limit("lwp_trainee", bool))
+    )
+
+    overall_eligible = (cl_max_days + pl_max_days >= calendar_days) | lwp_eligible
+
+    for j, i in enumerate(valid):
+        result = results[i]
+        result["eligibility"] = {
+            "overall_eligibility": "Eligible" if overall_eligible[j] else "Not Eligible",
+            "eligibility": {
+                "CL": {"eligible": bool(cl_max_days[j] > 0), "max_days_possible": float(cl_max_days[j])},
+                "PL": {"eligible": bool(pl_max_days[j] > 0), "max_days_possible": float(pl_max_days[j])},
+                "LWP": {"eligible": bool(lwp_eligible[j])},"total_leave":result.pop("total_leave")
+            }
+        }
+        result["team_availability"] = float(team_availability[j])
+        result["team_availability_source"] = team[j][1]
+
+    return results
@@ -5,34 +5,60 @@ Production-ready implementation with 100% dynamic constraint handling
 KEY IMPROVEMENTS:
 1. ✅ Strict validation of ALL agent outputs
 2. ✅ Dynamic constraint calculation (min of balance, max_days_possible, policy)
-3. ✅ Intelligent plan generation algorithm
+3. ✅ Exact plan solver (agent_a5_plan_solver) - every feasible split enumerated
 4. ✅ Comprehensive edge case handling
 5. ✅ Zero invalid plans guaranteed
-6. ✅ Better AI prompting with exact constraints
-7. ✅ Enhanced fallback logic
+6. ✅ AI only writes explanations (optional, A5_PLAN_LLM_EXPLANATIONS)
+7. ✅ Deterministic plans, no LLM call on the hot path
 8. ✅ Full audit trail logging
 
 Company Policy: Only CL, PL, and LWP (NO SL)
 """
 
 import openai
+import copy
 import json
+import logging
 import os
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
+from llm_response_cache import cached_llm_call
+from agent_a5_plan_solver import calculate_balance_after, solve_leave_plans
+from session_store import SessionStore
+
 load_dotenv()
 
 # OpenAI Configuration
 openai.api_key = os.getenv("OPENAI_API_KEY", "your-openai-api-key")
 
+# Plans always come from the solver; the LLM only rewrites explanations
+PLAN_LLM_EXPLANATIONS = os.getenv("A5_PLAN_LLM_EXPLANATIONS", "false").lower() == "true"
+
 # ============================================
-# MODULE-LEVEL STATE CACHE
+# PER-SESSION PLAN STORE
 # ============================================
 
-_cached_plans_state = None
-_last_confirmed_plan_id = None
+# {"plans_state": <optimize_leave_plan() result>, "confirmed_plan_id": int | None}
+# per session id; in-process by default, shared via SESSION_REDIS_URL or
+# SESSION_SQLITE_PATH so any worker can serve the confirm step
+plan_sessions = SessionStore("a5:plans")
+
+# Used by callers that predate per-session plans; every such caller shares it
+DEFAULT_PLAN_SESSION = "default"
+
+logger = logging.getLogger(__name__)
+
+
+def _plan_session(session_id: Optional[str], caller: str) -> str:
+    if session_id:
+        return session_id
+    logger.warning(
+        f"{caller}() called without session_id; using the shared "
+        f"'{DEFAULT_PLAN_SESSION}' session, visible to every other such caller"
+    )
+    return DEFAULT_PLAN_SESSION
 
 
 # ============================================
@@ -90,37 +116,6 @@ def calculate_working_days(start_date: str, end_date: str, daytype: str, calenda
         return float(calendar_days)
 
 
-# ============================================
-# HELPER: CALCULATE BALANCE AFTER
-# ============================================
-
-def calculate_balance_after(leave_breakdown: List[Dict], current_balance: Dict) -> Dict:
-    """
-    Calculate remaining balance after applying leave plan
-    
-    Args:
-        leave_breakdown: [{"type": "CL", "days": 2.5}, {"type": "PL", "days": 3}]
-        current_balance: {"CL": 4.0, "PL": 0.0}
-    
-    Returns:
-        {"CL": 1.5, "PL": 0.0}
-    """
-    balance_after = {
-        "CL": current_balance.get("CL", 0.0),
-        "PL": current_balance.get("PL", 0.0)
-    }
-    
-    for leave in leave_breakdown:
-        leave_type = leave["type"]
-        days = leave["days"]
-        
-        if leave_type in balance_after:
-            balance_after[leave_type] -= days
-            balance_after[leave_type] = round(balance_after[leave_type], 1)
-    
-    return balance_after
-
-
 # ============================================
 # NEW: CALCULATE ACTUAL USABLE LIMITS
 # ============================================
@@ -207,419 +202,92 @@ def calculate_usable_limits(
 
 
 # ============================================
-# NEW: RULE-BASED INTELLIGENT PLAN GENERATOR
+# OPTIONAL: AI-WRITTEN PLAN EXPLANATIONS
 # ============================================
 
-def generate_intelligent_plans(
-    duration: float,
-    usable_limits: Dict,
-    leave_balance: Dict,
-    max_lwp_days: int,
-    daytype: str,
-    reason: str
-) -> List[Dict]:
+def explain_plans_with_ai(plans: List[Dict], duration: float, reason: str, daytype: str) -> List[Dict]:
     """
-    Generate diverse, valid plans using intelligent rule-based logic
-    
-    This function GUARANTEES all plans are valid by construction
-    
-    Args:
-        duration: Total days needed
-        usable_limits: From calculate_usable_limits()
-        leave_balance: Current balances
-        max_lwp_days: Max LWP from Agent 3
-        daytype: Day type
-        reason: Leave reason
-    
-    Returns:
-        List of valid, diverse plans
-    """
-    
-    plans = []
-    
-    cl_info = usable_limits["CL"]
-    pl_info = usable_limits["PL"]
-    lwp_info = usable_limits["LWP"]
-    
-    cl_max = cl_info["max_usable"]
-    pl_max = pl_info["max_usable"]
-    
-    cl_eligible = cl_info["eligible"]
-    pl_eligible = pl_info["eligible"]
-    lwp_eligible = lwp_info["eligible"]
-    
-    # ========================================
-    # SCENARIO 1: HALF-DAY ONLY (0.5 days)
-    # ========================================
-    if duration == 0.5:
-        if cl_eligible and cl_max >= 0.5:
-            plans.append({
-                "plan_name": "Plan 1: 0.5 days CL",
-                "leave_breakdown": [{"type": "CL", "days": 0.5}],
-                "is_recommended": True,
-                "explanation": f"Half-day Casual Leave ({daytype}). Quick approval.",
-                "balance_after": calculate_balance_after([{"type": "CL", "days": 0.5}], leave_balance)
-            })
-        
-        if pl_eligible and pl_max >= 0.5:
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: 0.5 days PL",
-                "leave_breakdown": [{"type": "PL", "days": 0.5}],
-                "is_recommended": len(plans) == 0,
-                "explanation": f"Half-day Privileged Leave ({daytype}). Preserves CL balance.",
-                "balance_after": calculate_balance_after([{"type": "PL", "days": 0.5}], leave_balance)
-            })
-        
-        if lwp_eligible and len(plans) == 0:
-            plans.append({
-                "plan_name": "Plan 1: 0.5 days LWP",
-                "leave_breakdown": [{"type": "LWP", "days": 0.5}],
-                "is_recommended": True,
-                "explanation": f"Half-day Leave Without Pay ({daytype}).",
-                "balance_after": calculate_balance_after([{"type": "LWP", "days": 0.5}], leave_balance)
-            })
-        
-        return plans
-    
-    # ========================================
-    # SCENARIO 2: FULL/MIXED DAYS
-    # ========================================
-    
-    # Plan 1: Use only CL (if possible)
-    if cl_eligible and cl_max >= duration:
-        plans.append({
-            "plan_name": f"Plan {len(plans)+1}: {duration} days CL",
-            "leave_breakdown": [{"type": "CL", "days": duration}],
-            "is_recommended": True,
-            "explanation": "Uses only Casual Leave. Quick approval, no approval needed.",
-            "balance_after": calculate_balance_after([{"type": "CL", "days": duration}], leave_balance)
-        })
-    
-    # Plan 2: Use only PL (if possible)
-    if pl_eligible and pl_max >= duration:
-        plans.append({
-            "plan_name": f"Plan {len(plans)+1}: {duration} days PL",
-            "leave_breakdown": [{"type": "PL", "days": duration}],
-            "is_recommended": len(plans) == 0,
-            "explanation": "Uses only Privileged Leave. Preserves CL for emergencies.",
-            "balance_after": calculate_balance_after([{"type": "PL", "days": duration}], leave_balance)
-        })
-    
-    # Plan 3: Use only LWP (if no paid leave available)
-    if lwp_eligible and duration <= max_lwp_days and cl_max == 0 and pl_max == 0:
-        plans.append({
-            "plan_name": f"Plan {len(plans)+1}: {duration} days LWP",
-            "leave_breakdown": [{"type": "LWP", "days": duration}],
-            "is_recommended": len(plans) == 0,
-            "explanation": "Leave Without Pay. No paid leave available.",
-            "balance_after": calculate_balance_after([{"type": "LWP", "days": duration}], leave_balance)
-        })
-    
-    # Plan 4: Mix CL + PL (if both available and needed)
-    if cl_eligible and pl_eligible and cl_max > 0 and pl_max > 0 and (cl_max + pl_max) >= duration:
-        # Use maximum CL first, then PL
-        cl_use = min(cl_max, duration)
-        pl_need = duration - cl_use
-        
-        if pl_need > 0 and pl_need <= pl_max:
-            breakdown = [
-                {"type": "CL", "days": cl_use},
-                {"type": "PL", "days": pl_need}
-            ]
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: {cl_use} days CL + {pl_need} days PL",
-                "leave_breakdown": breakdown,
-                "is_recommended": len(plans) == 0,
-                "explanation": f"Balanced combination using maximum eligible leaves.",
-                "balance_after": calculate_balance_after(breakdown, leave_balance)
-            })
-    
-    # Plan 5: CL + LWP (if CL available but insufficient)
-    if cl_eligible and lwp_eligible and cl_max > 0 and cl_max < duration:
-        lwp_need = duration - cl_max
-        
-        if lwp_need <= max_lwp_days:
-            breakdown = [
-                {"type": "CL", "days": cl_max},
-                {"type": "LWP", "days": lwp_need}
-            ]
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: {cl_max} days CL + {lwp_need} days LWP",
-                "leave_breakdown": breakdown,
-                "is_recommended": len(plans) == 0,
-                "explanation": f"Uses all available CL ({cl_max} days), supplements with unpaid leave.",
-                "balance_after": calculate_balance_after(breakdown, leave_balance)
-            })
-    
-    # Plan 6: PL + LWP (if PL available but insufficient)
-    if pl_eligible and lwp_eligible and pl_max > 0 and pl_max < duration:
-        lwp_need = duration - pl_max
-        
-        if lwp_need <= max_lwp_days:
-            breakdown = [
-                {"type": "PL", "days": pl_max},
-                {"type": "LWP", "days": lwp_need}
-            ]
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: {pl_max} days PL + {lwp_need} days LWP",
-                "leave_breakdown": breakdown,
-                "is_recommended": len(plans) == 0,
-                "explanation": f"Uses all available PL ({pl_max} days), supplements with unpaid leave.",
-                "balance_after": calculate_balance_after(breakdown, leave_balance)
-            })
-    
-    # Plan 7: CL + PL + LWP (if both paid leaves available but insufficient)
-    if cl_eligible and pl_eligible and lwp_eligible and (cl_max + pl_max) > 0 and (cl_max + pl_max) < duration:
-        lwp_need = duration - cl_max - pl_max
-        
-        if lwp_need <= max_lwp_days:
-            breakdown = [
-                {"type": "CL", "days": cl_max},
-                {"type": "PL", "days": pl_max},
-                {"type": "LWP", "days": lwp_need}
-            ]
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: {cl_max} CL + {pl_max} PL + {lwp_need} LWP",
-                "leave_breakdown": breakdown,
-                "is_recommended": len(plans) == 0,
-                "explanation": f"Uses all available paid leaves, supplements with {lwp_need} days unpaid leave.",
-                "balance_after": calculate_balance_after(breakdown, leave_balance)
-            })
-    
-    # Alternative: PL first, then CL (different preference)
-    if cl_eligible and pl_eligible and pl_max > 0 and cl_max > 0 and (pl_max + cl_max) >= duration and len(plans) < 6:
-        pl_use = min(pl_max, duration)
-        cl_need = duration - pl_use
-        
-        if cl_need > 0 and cl_need <= cl_max and cl_need != pl_use:  # Avoid duplicate
-            breakdown = [
-                {"type": "PL", "days": pl_use},
-                {"type": "CL", "days": cl_need}
-            ]
-            plans.append({
-                "plan_name": f"Plan {len(plans)+1}: {pl_use} days PL + {cl_need} days CL",
-                "leave_breakdown": breakdown,
-                "is_recommended": False,
-                "explanation": f"Alternative combination prioritizing PL first.",
-                "balance_after": calculate_balance_after(breakdown, leave_balance)
-            })
-    
-    return plans[:6]  # Limit to 6 plans
-
-
-# ============================================
-# IMPROVED: AI-POWERED PLAN GENERATION
-# ============================================
+    Rewrite the solver's explanations with GPT-4. The plans themselves
+    (breakdown, balances, order) are never changed; on any error or a reply
+    that does not match the plans, the solver's explanations are kept.
 
-def generate_diverse_plans_with_ai(
-    duration: float,
-    usable_limits: Dict,
-    leave_balance: Dict,
-    max_lwp_days: int,
-    reason: str,
-    daytype: str
-) -> List[Dict]:
-    """
-    Generate DIVERSE leave plan combinations using AI with STRICT constraints
-    
     Args:
+        plans: From solve_leave_plans()
         duration: Total days needed (including sandwich)
-        usable_limits: From calculate_usable_limits()
-        leave_balance: {"CL": 4.0, "PL": 0.0}
-        max_lwp_days: Max consecutive LWP allowed
         reason: Leave reason
         daytype: "fullday", "halfday_1st", "halfday_2nd"
-    
+
     Returns:
-        List of diverse, validated leave plans
+        The same plans, explanations replaced where the AI gave one
     """
-    
-    cl_info = usable_limits["CL"]
-    pl_info = usable_limits["PL"]
-    lwp_info = usable_limits["LWP"]
-    
-    # Build ultra-precise constraint description
-    constraints = []
-    
-    if cl_info["eligible"]:
-        constraints.append(
-            f"CL: MAXIMUM {cl_info['max_usable']} days (Balance: {cl_info['balance']}, "
-            f"Eligibility Limit: {cl_info['max_possible']}, Policy Limit: {cl_info['policy_limit']})"
-        )
-    else:
-        constraints.append("CL: NOT ELIGIBLE")
-    
-    if pl_info["eligible"]:
-        constraints.append(
-            f"PL: MAXIMUM {pl_info['max_usable']} days (Balance: {pl_info['balance']}, "
-            f"Eligibility Limit: {pl_info['max_possible']}, Policy Limit: {pl_info['policy_limit']})"
-        )
-    else:
-        constraints.append("PL: NOT ELIGIBLE")
-    
-    if lwp_info["eligible"]:
-        constraints.append(f"LWP: MAXIMUM {max_lwp_days} consecutive days (Unlimited balance)")
-    else:
-        constraints.append("LWP: NOT ELIGIBLE")
-    
-    # Half-day handling
-    half_day_note = ""
-    if duration == 0.5:
-        half_day_note = f"""
-CRITICAL - HALF-DAY LEAVE ({daytype}):
-- Duration is EXACTLY 0.5 days
-- Generate ONLY plans with 0.5 days total
-- Valid examples: "0.5 CL", "0.5 PL", "0.5 LWP"
-- NEVER combine: "0.25 CL + 0.25 PL" is INVALID
-"""
-    elif duration % 1 == 0.5:
-        half_day_note = f"""
-MIXED DAYS ({daytype}):
-- Total: {duration} days (includes half-day)
-- Can use: {int(duration)} + 0.5 days
-- Only 0.5 increments allowed
-"""
-    
-    prompt = f"""You are an expert Leave Plan Generator. Create DIVERSE, VALID leave plan combinations.
-
-CRITICAL: Company uses ONLY CL, PL, and LWP (NO SL - Sick Leave).
-
-EMPLOYEE REQUEST:
-- Duration: {duration} days
-- Reason: {reason}
-- Day Type: {daytype}
-
-{half_day_note}
-
-STRICT CONSTRAINTS (YOU MUST OBEY):
-{chr(10).join(constraints)}
+    summary = [
+        {
+            "plan_name": plan["plan_name"],
+            "leave_breakdown": plan["leave_breakdown"],
+            "balance_after": plan["balance_after"],
+            "is_recommended": plan["is_recommended"]
+        }
+        for plan in plans
+    ]
 
-MANDATORY RULES:
-1. Generate 3-6 DIFFERENT combinations
-2. Total days MUST = {duration} (EXACTLY)
-3. Use ONLY eligible leave types
-4. NEVER exceed max_usable limits shown above
-5. Use ONLY 0.5 or whole numbers (NO 0.25, 0.75, 1.3, etc.)
-6. Mark the best plan with "is_recommended": true
-7. If insufficient paid leave, supplement with LWP (if eligible)
+    prompt = f"""An employee requested {duration} days of leave ({daytype}) for: {reason}.
+Company uses ONLY CL, PL, and LWP (NO SL - Sick Leave).
 
-EXAMPLES OF VALID PLANS (adapt to actual constraints):
-- If CL max = 3, PL max = 2, duration = 5: "3 CL + 2 PL"
-- If CL max = 2, PL max = 0, duration = 5: "2 CL + 3 LWP"
-- If CL max = 0, PL max = 0, duration = 4: "4 LWP"
+These leave plans are final and valid. Do NOT change them:
+{json.dumps(summary, indent=2)}
 
-OUTPUT FORMAT (JSON only, NO markdown):
-[
-    {{
-        "plan_name": "Plan 1: <description>",
-        "leave_breakdown": [
-            {{"type": "CL", "days": <number>}},
-            {{"type": "PL", "days": <number>}}
-        ],
-        "is_recommended": true,
-        "explanation": "<Why this plan is optimal>"
-    }}
-]
+Write a one or two sentence explanation for each plan telling the employee
+why they might pick it (balances kept, unpaid days, simplicity).
 
-VALIDATION CHECKLIST (before responding):
-✓ Total days = {duration}?
-✓ CL days ≤ {cl_info['max_usable']}?
-✓ PL days ≤ {pl_info['max_usable']}?
-✓ LWP days ≤ {max_lwp_days}?
-✓ Only 0.5 or whole numbers?
-✓ Only eligible leave types used?
+OUTPUT FORMAT (JSON only, NO markdown): a list of {len(plans)} strings, in plan order.
 """
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a leave planning expert. Generate ONLY valid plans using CL, PL, LWP. "
-                               "NO SL. Strictly respect all constraints. Use ONLY 0.5 or whole numbers. "
-                               "Respond with ONLY valid JSON, no markdown."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        ai_response = response.choices[0].message.content.strip()
+        messages = [
+            {
+                "role": "system",
+                "content": "You explain leave plans to employees. Respond with ONLY a valid JSON list of strings, no markdown."
+            },
+            {"role": "user", "content": prompt}
+        ]
+
+        def call_gpt4():
+            response = openai.ChatCompletion.create(
+                model="gpt-4",
+                messages=messages,
+                temperature=0,
+                max_tokens=800
+            )
+            return response.choices[0].message.content
+
+        ai_response = cached_llm_call(
+            "gpt-4", messages, {"temperature": 0, "max_tokens": 800}, call_gpt4
+        ).strip()
         ai_response = ai_response.replace("```json", "").replace("```", "").strip()
-        plans = json.loads(ai_response)
-        
-        # STRICT VALIDATION
-        valid_plans = []
-        for plan in plans:
-            # Check total days
-            total_days = sum(leave["days"] for leave in plan["leave_breakdown"])
-            if abs(total_days - duration) > 0.01:
-                continue
-            
-            # Check individual constraints
-            plan_valid = True
-            for leave in plan["leave_breakdown"]:
-                leave_type = leave["type"]
-                days = leave["days"]
-                
-                # Check eligibility
-                if leave_type == "CL" and not cl_info["eligible"]:
-                    plan_valid = False
-                    break
-                if leave_type == "PL" and not pl_info["eligible"]:
-                    plan_valid = False
-                    break
-                if leave_type == "LWP" and not lwp_info["eligible"]:
-                    plan_valid = False
-                    break
-                
-                # Check limits
-                if leave_type == "CL" and days > cl_info["max_usable"]:
-                    plan_valid = False
-                    break
-                if leave_type == "PL" and days > pl_info["max_usable"]:
-                    plan_valid = False
-                    break
-                if leave_type == "LWP" and days > max_lwp_days:
-                    plan_valid = False
-                    break
-                
-                # Check fractional validity
-                if days % 0.5 != 0:
-                    plan_valid = False
-                    break
-            
-            if plan_valid:
-                plan["balance_after"] = calculate_balance_after(
-                    plan["leave_breakdown"],
-                    leave_balance
-                )
-                valid_plans.append(plan)
-        
-        # If AI produced valid plans, use them
-        if valid_plans:
-            return valid_plans
-        
-        # Otherwise, fallback to rule-based
-        print("⚠️ AI plans validation failed, using rule-based fallback")
-        return generate_intelligent_plans(
-            duration, usable_limits, leave_balance, max_lwp_days, daytype, reason
-        )
-        
+        explanations = json.loads(ai_response)
+
+        if (
+            not isinstance(explanations, list)
+            or len(explanations) != len(plans)
+            or not all(isinstance(text, str) and text.strip() for text in explanations)
+        ):
+            print("⚠️ AI explanations did not match the plans, keeping solver explanations")
+            return plans
+
+        for plan, text in zip(plans, explanations):
+            plan["explanation"] = text.strip()
+        return plans
+
     except Exception as e:
-        print(f"⚠️ AI Error: {e}, using rule-based fallback")
-        return generate_intelligent_plans(
-            duration, usable_limits, leave_balance, max_lwp_days, daytype, reason
-        )
+        print(f"⚠️ AI Error: {e}, keeping solver explanations")
+        return plans
 
 
 # ============================================
 # PRIMARY FUNCTION: OPTIMIZE LEAVE PLAN
 # ============================================
 
-def optimize_leave_plan() -> Dict[str, Any]:
+def optimize_leave_plan(session_id: Optional[str] = None) -> Dict[str, Any]:
     """
     PRIMARY FUNCTION: Generate diverse leave plans with MAXIMUM accuracy
     
@@ -628,11 +296,13 @@ def optimize_leave_plan() -> Dict[str, Any]:
     2. Validate critical conditions (recommendation, eligibility, team)
     3. Calculate actual duration (including sandwich)
     4. Calculate usable limits (min of balance, eligibility, policy)
-    5. Generate plans using AI + rule-based fallback
-    6. Return structured output
+    5. Solve for all feasible plans, keep a diverse top-k (AI explanations optional)
+    6. Store the result for the session's confirm step and return it
+
+    Pass the caller's session_id: without one the plans go to a shared
+    default session, where another employee's confirm step can read them.
     """
-    global _cached_plans_state
-    
+    session_id = _plan_session(session_id, "optimize_leave_plan")
     try:
         print("\n" + "="*70)
         print("📥 AGENT A5 V2: Reading LangGraph State")
@@ -761,19 +431,21 @@ def optimize_leave_plan() -> Dict[str, Any]:
             actual_duration = max_lwp_policy
         
         # ========================================
-        # STEP 9: GENERATE PLANS (AI + Fallback)
+        # STEP 9: GENERATE PLANS (Solver + optional AI explanations)
         # ========================================
-        print(f"\n🤖 Generating plans for {actual_duration} days...")
+        print(f"\n🧮 Solving plans for {actual_duration} days...")
         
-        plans = generate_diverse_plans_with_ai(
+        plans = solve_leave_plans(
             duration=actual_duration,
             usable_limits=usable_limits,
             leave_balance=leave_balance,
             max_lwp_days=max_lwp_policy,
-            reason=reason,
             daytype=daytype
         )
         
+        if plans and PLAN_LLM_EXPLANATIONS:
+            plans = explain_plans_with_ai(plans, actual_duration, reason, daytype)
+        
         if not plans:
             print("❌ No valid plans could be generated")
             return {
@@ -832,8 +504,9 @@ def optimize_leave_plan() -> Dict[str, Any]:
         if extra_leave_message:
             result["extra_leave_message"] = extra_leave_message
         
-        # CACHE IT
-        _cached_plans_state = result
+        # STORE FOR THIS SESSION (a new set of plans clears any confirmation)
+        # (a copy: the caller owns the returned dict)
+        plan_sessions.put(session_id, {"plans_state": copy.deepcopy(result), "confirmed_plan_id": None})
         
         print("\n" + "="*70)
         print("✅ AGENT A5 V2: Plans Generated Successfully")
@@ -856,7 +529,7 @@ def optimize_leave_plan() -> Dict[str, Any]:
 # SEPARATE FUNCTION: CONFIRM LEAVE PLAN
 # ============================================
 
-def confirm_leave_plan(plan_id: int) -> Dict[str, Any]:
+def confirm_leave_plan(plan_id: int, session_id: Optional[str] = None) -> Dict[str, Any]:
     """
     SEPARATE FUNCTION: Confirm employee's selected plan
     
@@ -864,30 +537,33 @@ def confirm_leave_plan(plan_id: int) -> Dict[str, Any]:
     
     Args:
         plan_id: Index of selected plan (0-based)
+        session_id: Session whose plans were generated by optimize_leave_plan()
+            (omitted: the shared default session)
     
     Returns:
         Confirmed plan data with chat_response
     """
-    global _cached_plans_state, _last_confirmed_plan_id
-    
+    session_id = _plan_session(session_id, "confirm_leave_plan")
     try:
         print(f"\n{'='*70}")
-        print(f"📥 CONFIRM_LEAVE_PLAN: plan_id = {plan_id}")
+        print(f"📥 CONFIRM_LEAVE_PLAN: plan_id = {plan_id} (session {session_id})")
         print(f"{'='*70}")
         
         # Get current state
-        if _cached_plans_state is None:
-            print("⚠️ No cached plans, generating...")
-            current_state = optimize_leave_plan()
+        session = plan_sessions.get(session_id)
+        if session is None:
+            print("⚠️ No stored plans for this session, generating...")
+            current_state = optimize_leave_plan(session_id)
+            session = plan_sessions.get(session_id)
         else:
-            print("✅ Using cached plans")
-            current_state = _cached_plans_state
+            print("✅ Using stored plans")
+            current_state = session["plans_state"]
         
         # Check for errors
         if current_state.get("error") or current_state.get("status") in [
             "not_approved", "rejected_team_unavailable", "not_eligible", "no_plans"
         ]:
-            return current_state
+            return copy.deepcopy(current_state)
         
         # Validate plan_id
         plans = current_state.get("leave_plan_options", [])
@@ -902,7 +578,9 @@ def confirm_leave_plan(plan_id: int) -> Dict[str, Any]:
             }
         
         # Store confirmation
-        _last_confirmed_plan_id = plan_id
+        if session is not None and session.get("confirmed_plan_id") != plan_id:
+            session["confirmed_plan_id"] = plan_id
+            plan_sessions.update(session_id, session, {"confirmed_plan_id": plan_id})
         selected_plan = plans[plan_id]
         
         print(f"✅ Selected: {selected_plan.get('plan_name')}")
@@ -968,25 +646,27 @@ def confirm_leave_plan(plan_id: int) -> Dict[str, Any]:
 # HELPER: GET LAST CONFIRMED PLAN
 # ============================================
 
-def get_last_confirmed_plan() -> Dict[str, Any]:
-    """Get the most recently confirmed plan"""
-    global _last_confirmed_plan_id
+def get_last_confirmed_plan(session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Get the session's most recently confirmed plan"""
+    session_id = _plan_session(session_id, "get_last_confirmed_plan")
+    session = plan_sessions.get(session_id)
     
-    if _last_confirmed_plan_id is None:
+    if session is None or session.get("confirmed_plan_id") is None:
         return {
             "error": "No plan has been confirmed yet",
             "status": "not_confirmed"
         }
     
-    return confirm_leave_plan(_last_confirmed_plan_id)
+    return confirm_leave_plan(session["confirmed_plan_id"], session_id)
 
 
 # ============================================
 # SEPARATE FUNCTION: CANCEL REQUEST
 # ============================================
 
-def cancel_leave_request() -> Dict[str, Any]:
-    """Handle cancellation"""
+def cancel_leave_request(session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Handle cancellation; the session's plans are dropped"""
+    plan_sessions.delete(_plan_session(session_id, "cancel_leave_request"))
     return {
         "status": "cancelled",
         "cancelled_at": datetime.now().isoformat(),
@@ -1004,7 +684,7 @@ if __name__ == "__main__":
     print("TESTING AGENT A5 V2.0 - ULTRA-OPTIMIZED")
     print("="*70)
     
-    result = optimize_leave_plan()
+    result = optimize_leave_plan("test-session")
     
     if result.get("error"):
         print(f"\n❌ Error: {result['error']}")
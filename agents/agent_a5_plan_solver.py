@@ -0,0 +1,289 @@
+"""
+A5 Plan Solver - exact leave-plan enumeration for Agent A5
+A plan splits the requested duration into CL + PL + LWP in half-day units,
+each type within its usable limit. That is a tiny integer program, so every
+feasible split is enumerated, scored by a configurable objective, and a
+diverse top-k is returned in the plan shape A5 has always produced.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import copy
+import logging
+import math
+import os
+
+PLAN_OBJECTIVE = os.getenv("A5_PLAN_OBJECTIVE", "minimize_lwp")
+PLAN_TOP_K = int(os.getenv("A5_PLAN_TOP_K", "6"))
+# Distinct solver inputs kept; identical requests reuse the solved plans
+PLAN_MEMO_SIZE = int(os.getenv("A5_PLAN_MEMO_SIZE", "1024"))
+
+logger = logging.getLogger(__name__)
+
+LEAVE_TYPES = ("CL", "PL", "LWP")
+
+# Cost per day of each leave type, plus a cost per extra leave type in the
+# split and per half day (whole-day splits read better). Lower is better.
+OBJECTIVES: Dict[str, Dict[str, float]] = {
+    # Paid leave first, CL before PL (CL is meant for short absences)
+    "minimize_lwp": {"CL": 1.0, "PL": 1.2, "LWP": 10.0, "split": 0.3, "half": 0.05},
+    # Paid leave first, PL before CL (keep CL for emergencies)
+    "preserve_cl": {"CL": 1.2, "PL": 1.0, "LWP": 10.0, "split": 0.3, "half": 0.05},
+    # Keep PL, then CL; LWP is acceptable
+    "preserve_pl": {"CL": 1.0, "PL": 3.0, "LWP": 2.0, "split": 0.3, "half": 0.05},
+    # Keep both balances intact, take unpaid leave where allowed
+    "preserve_balance": {"CL": 3.0, "PL": 3.0, "LWP": 1.0, "split": 0.3, "half": 0.05},
+    # Fewest leave types in one application
+    "fewest_types": {"CL": 1.0, "PL": 1.2, "LWP": 3.0, "split": 10.0, "half": 0.05},
+}
+
+LEAVE_NAMES = {"CL": "Casual Leave", "PL": "Privileged Leave", "LWP": "Leave Without Pay"}
+
+# Units are half days: (CL, PL, LWP)
+Split = Tuple[int, int, int]
+
+
+def _units(days: float) -> int:
+    """Whole half-days that fit in `days` (limits round down)."""
+    if days == float("inf"):
+        return 10 ** 6
+    return max(0, int(math.floor(days * 2 + 1e-9)))
+
+
+def _days(units: int):
+    return units // 2 if units % 2 == 0 else units / 2
+
+
+def enumerate_splits(duration: float, cl_max: float, pl_max: float, lwp_max: float) -> List[Split]:
+    """Every (CL, PL, LWP) split of duration in half-day units within the limits."""
+    total = int(round(duration * 2))
+    cl_cap = min(_units(cl_max), total)
+    pl_cap = min(_units(pl_max), total)
+    lwp_cap = _units(lwp_max)
+
+    splits = []
+    for cl in range(cl_cap + 1):
+        # PL must leave no more than lwp_cap for LWP
+        for pl in range(max(0, total - cl - lwp_cap), min(pl_cap, total - cl) + 1):
+            splits.append((cl, pl, total - cl - pl))
+    return splits
+
+
+def split_cost(split: Split, weights: Dict[str, float]) -> float:
+    cl, pl, lwp = split
+    return (
+        (weights["CL"] * cl + weights["PL"] * pl + weights["LWP"] * lwp) / 2
+        + weights["split"] * max(0, (cl > 0) + (pl > 0) + (lwp > 0) - 1)
+        + weights["half"] * (cl % 2 + pl % 2 + lwp % 2)
+    )
+
+
+def _halves(split: Split) -> int:
+    return split[0] % 2 + split[1] % 2 + split[2] % 2
+
+
+def candidate_splits(splits: List[Split], total: int, paid_units: int) -> List[Split]:
+    """
+    The splits worth offering: no LWP when paid leave (CL + PL usable,
+    paid_units) covers the whole duration, and, for each amount of LWP,
+    only the splits with the fewest half days (a half day is never traded
+    for more unpaid leave).
+    """
+    if paid_units >= total:
+        splits = [s for s in splits if not s[2]]
+    fewest: Dict[int, int] = {}
+    for s in splits:
+        fewest[s[2]] = min(fewest.get(s[2], 3), _halves(s))
+    return [s for s in splits if _halves(s) == fewest[s[2]]]
+
+
+def _distance(a: Split, b: Split) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])
+
+
+def select_diverse(splits: List[Split], objective: str, top_k: int) -> List[Split]:
+    """
+    With the total fixed, every feasible split trades one leave type for
+    another, so all of them sit on the (CL, PL, LWP) trade-off front. The
+    selection starts from the optimum of the chosen objective and of each
+    other objective (the extremes of the front), then fills the remaining
+    slots with the split farthest from those already chosen, ties going to
+    the lower cost. The result is ordered by the chosen objective.
+    """
+    if not splits:
+        return []
+
+    names = [objective] + [o for o in OBJECTIVES if o != objective]
+    costs = {name: [split_cost(s, OBJECTIVES[name]) for s in splits] for name in names}
+    cost = costs[objective]
+    order = range(len(splits))
+
+    chosen: List[int] = []
+    for name in names:
+        best = min(order, key=lambda i: (costs[name][i], cost[i]))
+        if best not in chosen:
+            chosen.append(best)
+        if len(chosen) >= top_k:
+            break
+
+    # Distance from each split to the nearest chosen one, kept up to date
+    nearest = [min(_distance(splits[i], splits[c]) for c in chosen) for i in order]
+    while len(chosen) < min(top_k, len(splits)):
+        best = max((i for i in order if nearest[i]), key=lambda i: (nearest[i], -cost[i]), default=None)
+        if best is None:
+            break
+        chosen.append(best)
+        for i in order:
+            nearest[i] = min(nearest[i], _distance(splits[i], splits[best]))
+
+    return [splits[i] for i in sorted(chosen[:top_k], key=lambda i: cost[i])]
+
+
+def calculate_balance_after(leave_breakdown: List[Dict], current_balance: Dict) -> Dict:
+    """
+    Calculate remaining balance after applying leave plan
+
+    Args:
+        leave_breakdown: [{"type": "CL", "days": 2.5}, {"type": "PL", "days": 3}]
+        current_balance: {"CL": 4.0, "PL": 0.0}
+
+    Returns:
+        {"CL": 1.5, "PL": 0.0}
+    """
+    balance_after = {
+        "CL": current_balance.get("CL", 0.0),
+        "PL": current_balance.get("PL", 0.0)
+    }
+
+    for leave in leave_breakdown:
+        if leave["type"] in balance_after:
+            balance_after[leave["type"]] = round(balance_after[leave["type"]] - leave["days"], 1)
+
+    return balance_after
+
+
+def _breakdown(split: Split) -> List[Dict]:
+    return [
+        {"type": leave_type, "days": _days(units)}
+        for leave_type, units in zip(LEAVE_TYPES, split)
+        if units
+    ]
+
+
+def _explain(split: Split, limits: Dict[str, float], daytype: str, lwp_needed: int = 0) -> str:
+    """
+    Deterministic explanation; the LLM may rewrite it when enabled in A5.
+    lwp_needed: LWP units the duration needs beyond usable paid leave.
+    """
+    lwp = split[2]
+    types = [t for t, units in zip(LEAVE_TYPES, split) if units]
+
+    if len(types) == 1:
+        text = f"Uses only {LEAVE_NAMES[types[0]]}."
+        if types == ["CL"]:
+            text += " Quick approval for a short absence."
+        elif types == ["PL"]:
+            text += " Preserves CL for emergencies."
+        else:
+            text += " Keeps your paid leave balances intact." if (
+                limits["CL"] or limits["PL"]
+            ) else " No paid leave available."
+    else:
+        parts = []
+        for leave_type, units in zip(LEAVE_TYPES, split):
+            if not units:
+                continue
+            all_of = leave_type != "LWP" and _units(limits[leave_type]) == units
+            parts.append(f"{'all available ' if all_of else ''}{leave_type} ({_days(units)} day{'' if units <= 2 else 's'})")
+        text = "Combines " + ", ".join(parts[:-1]) + f" and {parts[-1]}."
+        if lwp and lwp <= lwp_needed:
+            text += " Unpaid days cover what paid leave does not."
+        elif lwp:
+            text += " Takes some unpaid days to keep part of your paid leave."
+
+    if "halfday" in (daytype or "").lower():
+        text += f" Includes a half day ({daytype})."
+    return text
+
+
+def solve_leave_plans(
+    duration: float,
+    usable_limits: Dict,
+    leave_balance: Dict,
+    max_lwp_days: float,
+    daytype: str,
+    objective: Optional[str] = None,
+    top_k: Optional[int] = None
+) -> List[Dict]:
+    """
+    Feasible leave plans for `duration` days, best first.
+
+    Args:
+        duration: Total days needed (multiple of 0.5, including sandwich)
+        usable_limits: From calculate_usable_limits()
+        leave_balance: Current balances, for balance_after
+        max_lwp_days: Max consecutive LWP from Agent 3
+        daytype: "fullday", "halfday_1st", "halfday_2nd"
+        objective: Key of OBJECTIVES (default A5_PLAN_OBJECTIVE)
+        top_k: Number of plans (default A5_PLAN_TOP_K)
+
+    Returns:
+        [{"plan_name", "leave_breakdown", "is_recommended", "explanation",
+          "balance_after"}, ...]; empty when nothing is feasible
+    """
+    objective = objective or PLAN_OBJECTIVE
+    if objective not in OBJECTIVES:
+        logger.warning(f"Unknown plan objective '{objective}', using 'minimize_lwp'")
+        objective = "minimize_lwp"
+
+    cl_max = usable_limits["CL"]["max_usable"] if usable_limits["CL"]["eligible"] else 0.0
+    pl_max = usable_limits["PL"]["max_usable"] if usable_limits["PL"]["eligible"] else 0.0
+    lwp_max = max_lwp_days if usable_limits["LWP"]["eligible"] else 0.0
+
+    plans = _solve(
+        float(duration), float(cl_max), float(pl_max), float(lwp_max),
+        float(leave_balance.get("CL", 0.0)), float(leave_balance.get("PL", 0.0)),
+        daytype, objective, top_k or PLAN_TOP_K
+    )
+    # Callers may edit plans (explanations), the memoized ones stay intact
+    return [dict(p) for p in copy.deepcopy(plans)]
+
+
+@lru_cache(maxsize=PLAN_MEMO_SIZE)
+def _solve(
+    duration: float,
+    cl_max: float,
+    pl_max: float,
+    lwp_max: float,
+    cl_balance: float,
+    pl_balance: float,
+    daytype: str,
+    objective: str,
+    top_k: int
+) -> Tuple[Dict, ...]:
+    total = int(round(duration * 2))
+    paid_units = min(_units(cl_max), total) + min(_units(pl_max), total)
+    splits = candidate_splits(enumerate_splits(duration, cl_max, pl_max, lwp_max), total, paid_units)
+    chosen = select_diverse(splits, objective, top_k)
+    lwp_needed = max(0, total - paid_units)
+
+    limits = {"CL": cl_max, "PL": pl_max}
+    balance = {"CL": cl_balance, "PL": pl_balance}
+    plans = []
+    for i, split in enumerate(chosen):
+        breakdown = _breakdown(split)
+        label = " + ".join(f"{item['days']} {item['type']}" for item in breakdown)
+        if len(breakdown) == 1:
+            label = f"{breakdown[0]['days']} days {breakdown[0]['type']}"
+        plans.append({
+            "plan_name": f"Plan {i + 1}: {label}",
+            "leave_breakdown": breakdown,
+            "is_recommended": i == 0,
+            "explanation": _explain(split, limits, daytype, lwp_needed),
+            "balance_after": calculate_balance_after(breakdown, balance)
+        })
+    return tuple(plans)
+
+
+def plan_memo_stats() -> Dict[str, int]:
+    info = _solve.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
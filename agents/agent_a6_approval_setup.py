@@ -6,16 +6,21 @@ from typing import Dict, Any, Literal
 import secrets
 import redis
 import json
+import os
 import requests
 from datetime import timedelta, datetime
 
+from employee_context_cache import employee_key, invalidate_employee_context
+from team_calendar import record_leave_event
+from leave_history_store import invalidate_leave_history
+
 REDIS_CONFIG = {'host': 'localhost', 'port': 6379, 'db': 0, 'decode_responses': True}
 TOKEN_EXPIRY_HOURS = 48
 TOKEN_PREFIX = 'leave_approval:'
 
 # API Configuration
-API_BASE_URL = "https://devmcdphcmplatform.omfysgroup.com"
-AUTH_URL = "https://dev_mcdp_be.omfysgroup.com/auth/token"
+API_BASE_URL = os.getenv("PLATFORM_API_BASE_URL", "https://devmcdphcmplatform.omfysgroup.com")
+AUTH_URL = os.getenv("PLATFORM_AUTH_URL", "https://dev_mcdp_be.omfysgroup.com/auth/token")
 
 
 def setup_approval_workflow(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -66,6 +71,14 @@ def setup_approval_workflow(state: Dict[str, Any]) -> Dict[str, Any]:
             )
             
             _update_employee_status(redis_client, state['employee_id'], 'applied', leave_data)
+
+        record_leave_event(
+            employee_key(state),
+            state['leave_start_date'],
+            state['leave_end_date'],
+            'pending',
+            leave_id=approval_id
+        )
         
         result = {
             "approval_workflow": {
@@ -213,6 +226,18 @@ def validate_token(token: str, action: str, admin_ip: str = None) -> Dict[str, A
     leave_data['admin_ip'] = admin_ip
     
     _update_employee_status(redis_client, leave_data['employee_id'], new_status, leave_data)
+
+    if new_status == 'approved':
+        invalidate_employee_context(employee_key(leave_data))
+    invalidate_leave_history(employee_key(leave_data))
+
+    record_leave_event(
+        employee_key(leave_data),
+        leave_data.get('leave_start_date'),
+        leave_data.get('leave_end_date'),
+        new_status,
+        leave_id=leave_data.get('approval_id')
+    )
     
     audit_key = f"leave_audit:{leave_data['employee_id']}:{token[:8]}"
     redis_client.setex(audit_key, timedelta(days=365), json.dumps(leave_data))
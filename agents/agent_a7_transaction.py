@@ -4,10 +4,15 @@ Calls real API to create leave, no external files needed
 """
 from typing import Dict, Any
 import json
+import os
 import requests
 
-API_BASE_URL = "https://devmcdphcmplatform.omfysgroup.com"
-AUTH_URL = "https://dev_mcdp_be.omfysgroup.com/auth/token"
+from employee_context_cache import employee_key, invalidate_employee_context
+from team_calendar import record_leave_event
+from leave_history_store import invalidate_leave_history
+
+API_BASE_URL = os.getenv("PLATFORM_API_BASE_URL", "https://devmcdphcmplatform.omfysgroup.com")
+AUTH_URL = os.getenv("PLATFORM_AUTH_URL", "https://dev_mcdp_be.omfysgroup.com/auth/token")
 
 
 def _log_state(agent_name: str, state: Dict[str, Any], output: Dict[str, Any]):
@@ -79,6 +84,17 @@ def execute_transaction(state: Dict[str, Any]) -> Dict[str, Any]:
             raise Exception("API did not return Leave Request ID")
         
         leave_request_id = str(leave_request_id)
+
+        # Balances changed - next A4 run must refetch them
+        invalidate_employee_context(employee_key(state))
+        invalidate_leave_history(employee_key(state))
+        record_leave_event(
+            employee_key(state),
+            state.get('leave_start_date'),
+            state.get('leave_end_date'),
+            'approved',
+            leave_id=state.get('approval_id') or state.get('Approval_ID') or leave_request_id
+        )
         
         # FINAL STATE
         result = {
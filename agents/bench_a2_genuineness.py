@@ -0,0 +1,211 @@
+# bench_a2_genuineness.py
+# --------------------------------------------------
+# Benchmark for the Genuineness/Pattern Analyzer (A2)
+# --------------------------------------------------
+#
+#   python bench_a2_genuineness.py --sizes 10 1000 100000 --output a2_bench.json
+#   python bench_a2_genuineness.py --compare a2_bench.json
+#
+# Generates synthetic leave histories in the exact shape get_leaves()
+# returns, serves them from the local mock platform (mock_platform_server),
+# and times every calc_* factor plus perform_analysis end to end.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import agent_a2_genuineness as a2
+import leave_history_store
+from mock_platform_server import MockPlatform, MockPlatformServer, generate_history, leave_counts
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+# ================= TIMING =================
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "min_ms": round(min(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "mean_ms": round(statistics.mean(ms), 4),
+        "runs": len(ms),
+    }
+
+
+def _time(fn, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples)
+
+
+async def _atime(fn, repeat: int, before=None) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples)
+
+
+def _reset_employee_state():
+    """Forget stored history and snapshots so the next call is cold."""
+    leave_history_store.clear_leave_history()
+    a2.clear_feature_snapshots()
+    a2._parse_date_cached.cache_clear()
+
+
+async def bench_size(n: int, repeat: int, token: str, leaves, curr) -> Dict[str, Any]:
+    curr_start = a2.parse_date(curr.start_date)
+    curr_dur = (a2.parse_date(curr.end_date) - curr_start).days + 1
+    curr_adv = (curr_start - a2.parse_date(curr.application_date)).days
+    counts = leave_counts(leaves)
+
+    emp_code = f"BENCH{n}"
+    history = a2.LeaveHistory(leaves)
+    result = {
+        "records": n,
+        "LeaveHistory": _time(lambda: a2.LeaveHistory(leaves), repeat),
+        "calc_reason_freq": _time(lambda: a2.calc_reason_freq(history, curr.reason_category), repeat),
+        "calc_timing": _time(lambda: a2.calc_timing(history, curr_start), repeat),
+        "calc_duration": _time(lambda: a2.calc_duration(history, curr_dur, curr.reason_category), repeat),
+        "calc_notice": _time(lambda: a2.calc_notice(history, curr_adv), repeat),
+        "calc_behaviour": _time(lambda: a2.calc_behaviour(history, counts), repeat),
+        "analyze_leave_history": _time(
+            lambda: a2.analyze_leave_history(emp_code, curr, leaves, counts), repeat
+        ),
+    }
+
+    result["perform_analysis_cold"] = await _atime(
+        lambda: a2.perform_analysis(token, emp_code, curr), repeat, before=_reset_employee_state
+    )
+    result["perform_analysis_warm"] = await _atime(
+        lambda: a2.perform_analysis(token, emp_code, curr), repeat
+    )
+    result["perform_analysis_no_store"] = await _atime(
+        lambda: a2.perform_analysis(token, None, curr), repeat
+    )
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(sizes: List[int], repeat: int = 5, seed: int = 7, latency: float = 0.0) -> Dict[str, Any]:
+    end = date.today()
+    curr = a2.CurrentRequest(
+        reason_category="Sickness for Self",
+        start_date=(end - timedelta(days=2)).isoformat(),
+        end_date=end.isoformat(),
+        application_date=(end - timedelta(days=5)).isoformat()
+    )
+
+    platform_state = MockPlatform(employees=0, latency=latency)
+    histories = {}
+    for n in sizes:
+        leaves = generate_history(n, end, seed=seed + n)
+        histories[platform_state.add_employee(f"BENCH{n}", leaves=leaves)] = leaves
+    server = MockPlatformServer(platform=platform_state).start()
+    server.configure_agents()
+
+    original_store = leave_history_store.HISTORY_STORE_PATH
+    workdir = tempfile.mkdtemp(prefix="a2-bench-")
+    leave_history_store.HISTORY_STORE_PATH = os.path.join(workdir, "leave_history.db")
+
+    results = {}
+    try:
+        for n in sizes:
+            token = server.token_for(f"BENCH{n}")
+            print(f"⏱️  {n:>7} records ...", flush=True)
+            results[str(n)] = await bench_size(n, repeat, token, histories[token], curr)
+    finally:
+        await a2.close_http_client()
+        server.stop()
+        leave_history_store.HISTORY_STORE_PATH = original_store
+
+    return {
+        "meta": {
+            "benchmark": "agent_a2_genuineness",
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "seed": seed,
+            "api_latency_s": latency,
+        },
+        "results": results,
+    }
+
+
+# ================= REPORTING =================
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    for size, timings in report["results"].items():
+        print(f"\n📊 {size} records")
+        base = (baseline or {}).get("results", {}).get(size, {})
+        for name, t in timings.items():
+            if not isinstance(t, dict):
+                continue
+            line = f"   {name:<28} median {t['median_ms']:>10.3f} ms   min {t['min_ms']:>10.3f} ms"
+            if name in base:
+                ratio = t["median_ms"] / base[name]["median_ms"] if base[name]["median_ms"] else float("inf")
+                line += f"   x{ratio:.2f} vs {baseline['meta'].get('commit') or 'baseline'}"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the A2 genuineness analyzer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock platform latency (seconds)")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("agent_a2_genuineness").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(args.sizes, args.repeat, args.seed, args.latency))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
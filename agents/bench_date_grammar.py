@@ -0,0 +1,192 @@
+# bench_date_grammar.py
+# --------------------------------------------------
+# Corpus benchmark for the A1 date grammar
+# --------------------------------------------------
+#
+#   python bench_date_grammar.py
+#   python bench_date_grammar.py --output date_bench.json --verbose
+#
+# Every phrase is parsed relative to Monday 2026-01-12 (the date used in
+# the A1 prompt examples). A phrase either has an expected (start, end) or
+# None when no single reading is safe and it must go to the LLM. Reports
+# how many phrases are resolved locally, how many of those are wrong (the
+# number that matters), how many are escalated, and the parse time.
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from date_grammar import DATE_GRAMMAR_MIN_CONFIDENCE, parse_dates
+
+REFERENCE = datetime(2026, 1, 12)
+
+# (phrase, (start, end) or None)
+CORPUS: List[Tuple[str, Optional[Tuple[str, str]]]] = [
+    # relative days
+    ("tomorrow", ("2026-01-13", "2026-01-13")),
+    ("I want leave tomorrow", ("2026-01-13", "2026-01-13")),
+    ("apply my leave for tomorrow", ("2026-01-13", "2026-01-13")),
+    ("tmrw", ("2026-01-13", "2026-01-13")),
+    ("today", ("2026-01-12", "2026-01-12")),
+    ("not feeling well, taking leave today", ("2026-01-12", "2026-01-12")),
+    ("day after tomorrow", ("2026-01-14", "2026-01-14")),
+    ("leave from tomorrow to day after tomorrow", ("2026-01-13", "2026-01-14")),
+    ("from today till tomorrow", ("2026-01-12", "2026-01-13")),
+    ("half day tomorrow", ("2026-01-13", "2026-01-13")),
+    ("first half tomorrow", ("2026-01-13", "2026-01-13")),
+    # durations
+    ("next 3 days", ("2026-01-12", "2026-01-14")),
+    ("upcoming 2 days", ("2026-01-12", "2026-01-13")),
+    ("for 5 days", ("2026-01-12", "2026-01-16")),
+    ("leave for two days from tomorrow", ("2026-01-13", "2026-01-14")),
+    ("from tmrw for 3 days", ("2026-01-13", "2026-01-15")),
+    ("1.5 days", None),
+    # weekdays
+    ("next monday", ("2026-01-19", "2026-01-19")),
+    ("this friday", ("2026-01-16", "2026-01-16")),
+    ("on friday", ("2026-01-16", "2026-01-16")),
+    ("coming wednesday", ("2026-01-14", "2026-01-14")),
+    ("this monday", ("2026-01-12", "2026-01-12")),
+    ("tuesday to thursday", ("2026-01-13", "2026-01-15")),
+    ("wed to fri", ("2026-01-14", "2026-01-16")),
+    ("next tuesday till friday", ("2026-01-13", "2026-01-16")),
+    ("this thursday and friday", ("2026-01-15", "2026-01-16")),
+    ("monday", None),                       # said on a Monday
+    ("from monday to wednesday", None),
+    ("can I take leave on monday", None),
+    ("leave for 1 week from monday", None),
+    # day + month
+    ("5th to 8th March", ("2026-03-05", "2026-03-08")),
+    ("5-8 march", ("2026-03-05", "2026-03-08")),
+    ("from 5th march to 8th march", ("2026-03-05", "2026-03-08")),
+    ("march 5 to march 8", ("2026-03-05", "2026-03-08")),
+    ("between 5th and 8th feb", ("2026-02-05", "2026-02-08")),
+    ("from 28th jan to 2nd feb", ("2026-01-28", "2026-02-02")),
+    ("28th jan - 2nd feb", ("2026-01-28", "2026-02-02")),
+    ("28th march to 2nd", ("2026-03-28", "2026-04-02")),
+    ("from 24th dec to 2nd jan", ("2026-12-24", "2027-01-02")),
+    ("20th jan", ("2026-01-20", "2026-01-20")),
+    ("on 20th january", ("2026-01-20", "2026-01-20")),
+    ("jan 20", ("2026-01-20", "2026-01-20")),
+    ("20 jan 2026", ("2026-01-20", "2026-01-20")),
+    ("on 5th feb", ("2026-02-05", "2026-02-05")),
+    ("5th of feb", ("2026-02-05", "2026-02-05")),
+    ("feb 5th", ("2026-02-05", "2026-02-05")),
+    ("leave on 3rd april", ("2026-04-03", "2026-04-03")),
+    ("leave on 25th december", ("2026-12-25", "2026-12-25")),
+    ("on 20th jan for 3 days", ("2026-01-20", "2026-01-22")),
+    ("3 days leave from 20th jan", ("2026-01-20", "2026-01-22")),
+    ("a week from 2nd feb", ("2026-02-02", "2026-02-08")),
+    ("for a week starting 2nd feb", ("2026-02-02", "2026-02-08")),
+    ("i'll be out from 19th to 23rd", ("2026-01-19", "2026-01-23")),
+    ("from 5th jan to 8th jan", None),       # already past: backdated or next year?
+    ("on 10th jan", None),
+    ("on 10th", None),
+    ("15th", None),
+    ("2nd to 4th", None),
+    # numeric dates (dd/mm)
+    ("leave on 20/01/2026", ("2026-01-20", "2026-01-20")),
+    ("20/1", ("2026-01-20", "2026-01-20")),
+    ("20/01 to 23/01", ("2026-01-20", "2026-01-23")),
+    ("leave on 13/01", ("2026-01-13", "2026-01-13")),
+    ("13.01.2026", ("2026-01-13", "2026-01-13")),
+    ("on 05-02-2026", ("2026-02-05", "2026-02-05")),
+    ("2026-01-20", ("2026-01-20", "2026-01-20")),
+    ("from 2026-01-20 to 2026-01-23", ("2026-01-20", "2026-01-23")),
+    # open-ended, offsets and lists: the LLM decides
+    ("leave on 12 and 13 jan", ("2026-01-12", "2026-01-13")),
+    ("extend my leave till 20th jan", None),
+    ("leave till friday", None),
+    ("in 2 days", None),
+    ("after 3 days", None),
+    ("last friday", None),
+    ("not tomorrow", None),
+    ("not on monday", None),
+    ("it is not 5th march", None),
+    # vague or no dates
+    ("next week", None),
+    ("sometime next month", None),
+    ("sick leave for today and tomorrow", ("2026-01-12", "2026-01-13")),
+    ("I am not well", None),
+    ("family function", None),
+    ("yes", None),
+]
+
+
+def evaluate(corpus, reference: datetime) -> Dict[str, Any]:
+    resolved = correct = wrong = escalated = missed = 0
+    failures = []
+    timings = []
+
+    for phrase, expected in corpus:
+        t0 = time.perf_counter()
+        parsed = parse_dates(phrase, reference)
+        timings.append(time.perf_counter() - t0)
+
+        got = (parsed.start_date, parsed.end_date) if parsed.confident else None
+        if got is None:
+            escalated += 1
+            if expected is not None:
+                missed += 1
+                failures.append({"phrase": phrase, "expected": expected, "got": None,
+                                 "confidence": parsed.confidence, "kind": "escalated"})
+            continue
+
+        resolved += 1
+        if got == tuple(expected or ()):
+            correct += 1
+        else:
+            wrong += 1
+            failures.append({"phrase": phrase, "expected": expected, "got": got,
+                             "confidence": parsed.confidence, "kind": "wrong"})
+
+    total = len(corpus)
+    answerable = sum(1 for _, expected in corpus if expected is not None)
+    us = [t * 1e6 for t in timings]
+    return {
+        "phrases": total,
+        "answerable": answerable,
+        "resolved_locally": resolved,
+        "correct": correct,
+        "wrong": wrong,
+        "escalated": escalated,
+        "escalated_but_answerable": missed,
+        "precision": round(correct / resolved, 4) if resolved else None,
+        "coverage": round(correct / answerable, 4) if answerable else None,
+        "parse_us": {"median": round(statistics.median(us), 2), "max": round(max(us), 2)},
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the A1 date grammar on a phrase corpus")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="list escalated and wrong phrases")
+    args = parser.parse_args(argv)
+
+    report = evaluate(CORPUS, REFERENCE)
+    report["min_confidence"] = DATE_GRAMMAR_MIN_CONFIDENCE
+
+    print(f"📊 {report['phrases']} phrases ({report['answerable']} with a single safe reading)")
+    print(f"   resolved locally   {report['resolved_locally']:>4}   correct {report['correct']}   wrong {report['wrong']}")
+    print(f"   escalated to LLM   {report['escalated']:>4}   of which answerable {report['escalated_but_answerable']}")
+    print(f"   precision {report['precision']}   coverage {report['coverage']}")
+    print(f"   parse time         median {report['parse_us']['median']} µs   max {report['parse_us']['max']} µs")
+
+    if args.verbose:
+        for f in report["failures"]:
+            print(f"   {f['kind']:<9} {f['phrase']!r}: expected {f['expected']}, got {f['got']} ({f['confidence']})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
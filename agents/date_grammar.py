@@ -0,0 +1,463 @@
+"""
+Date Grammar - deterministic parser for leave date expressions (A1)
+Tokenizes common Indian-English date phrases (relative days, weekdays,
+"5th March" / "March 5" / dd/mm forms, ranges and "for N days" durations)
+and resolves them against a reference date. Every result carries a
+confidence; A1 trusts results at or above DATE_GRAMMAR_MIN_CONFIDENCE and
+leaves anything vaguer to the LLM.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import os
+import re
+
+from pydantic import BaseModel, Field
+
+DATE_GRAMMAR_MIN_CONFIDENCE = float(os.getenv("DATE_GRAMMAR_MIN_CONFIDENCE", "0.8"))
+# A yearless date up to this many days in the past stays in the current year
+# (backdated sick leave); older ones roll over to next year
+PAST_DATE_GRACE_DAYS = 30
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+WEEKDAY_MAP = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+WEEKDAYS = dict(WEEKDAY_MAP, mon=0, tue=1, tues=1, wed=2, thu=3, thur=3, thurs=3, fri=4, sat=5, sun=6)
+
+RELATIVE_DAYS = {"today": 0, "tomorrow": 1, "tmrw": 1, "tmr": 1, "dayaftertomorrow": 2}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+UNITS = {"day": 1, "days": 1, "week": 7, "weeks": 7}
+MODIFIERS = {"this", "next", "coming", "upcoming", "last", "previous"}
+RANGE_OPENERS = {"from", "between", "starting"}
+RANGE_SEPARATORS = {"to", "till", "until", "til", "through", "thru", "upto"}
+
+# Words that may surround a date without changing its meaning
+FILLER = {
+    "on", "from", "the", "of", "for", "leave", "leaves", "i", "im", "i'm", "am",
+    "will", "be", "want", "to", "take", "apply", "need", "a", "an", "off",
+    "please", "pls", "my", "me", "it", "its", "it's", "make", "is", "and",
+    "starting", "till", "until", "day", "days", "in", "at", "would", "like",
+    "available", "back", "absent", "by", "date", "start", "end",
+}
+# A date right after one of these may be the one the user rules out ("not tomorrow")
+NEGATIONS = {"not", "no", "dont", "don't", "cant", "can't", "cannot", "except", "instead"}
+
+_PHRASES = [
+    (re.compile(r"\b(?:the\s+)?day\s+after\s+(?:tomorrow|tmrw|tmr)\b"), "dayaftertomorrow"),
+    (re.compile(r"\bup\s+to\b"), "upto"),
+]
+_TOKEN = re.compile(
+    r"(?P<iso>\d{4}-\d{1,2}-\d{1,2})"
+    r"|(?P<numdate>\d{1,2}/\d{1,2}(?:/\d{2,4})?|\d{1,2}(?P<numsep>[.-])\d{1,2}(?P=numsep)\d{2,4})"
+    r"|(?P<decimal>\d+\.\d+)"
+    r"|(?P<ord>\d{1,2}(?:st|nd|rd|th)\b)"
+    r"|(?P<num>\d+)"
+    r"|(?P<word>[a-z]+(?:'[a-z]+)?)"
+    r"|(?P<dash>[-–—])"
+)
+
+
+class DateParse(BaseModel):
+    """Dates found in a message, as ISO strings, with a 0-1 confidence."""
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    confidence: float = 0.0
+    phrases: List[str] = Field(default_factory=list)
+    # Non-filler words outside any date phrase ("sick", "change", ...)
+    unparsed: List[str] = Field(default_factory=list)
+
+    @property
+    def confident(self) -> bool:
+        return self.start_date is not None and self.confidence >= DATE_GRAMMAR_MIN_CONFIDENCE
+
+
+def next_weekday(reference: datetime, weekday: int) -> datetime:
+    """Return next occurrence of a weekday"""
+    days_ahead = weekday - reference.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return reference + timedelta(days=days_ahead)
+
+
+# ================= TOKENIZER =================
+def tokenize(text: str) -> List[Tuple[str, Any, str]]:
+    """(kind, value, text) tokens; word tokens are classified by vocabulary."""
+    t = text.lower()
+    for pattern, replacement in _PHRASES:
+        t = pattern.sub(replacement, t)
+
+    tokens = []
+    for m in _TOKEN.finditer(t):
+        kind, raw = m.lastgroup, m.group()
+        if kind == "num":
+            tokens.append(("num", int(raw), raw))
+        elif kind == "ord":
+            tokens.append(("ord", int(raw[:-2]), raw))
+        elif kind == "dash":
+            tokens.append(("sep", "-", raw))
+        elif kind == "word":
+            if raw in RELATIVE_DAYS:
+                tokens.append(("rel", RELATIVE_DAYS[raw], raw))
+            elif raw in MONTHS:
+                tokens.append(("month", MONTHS[raw], raw))
+            elif raw in WEEKDAYS:
+                tokens.append(("weekday", WEEKDAYS[raw], raw))
+            elif raw in MODIFIERS:
+                tokens.append(("mod", raw, raw))
+            elif raw in UNITS:
+                tokens.append(("unit", UNITS[raw], raw))
+            elif raw in NUMBER_WORDS:
+                tokens.append(("numword", NUMBER_WORDS[raw], raw))
+            elif raw in RANGE_SEPARATORS:
+                tokens.append(("sep", raw, raw))
+            elif raw in RANGE_OPENERS:
+                tokens.append(("open", raw, raw))
+            else:
+                tokens.append((raw if raw in ("for", "of", "and") else "word", raw, raw))
+        else:
+            tokens.append((kind, raw, raw))
+    return tokens
+
+
+# ================= GRAMMAR =================
+class _Parser:
+    """
+    Recursive-descent matcher over the token list. Points are dicts:
+      {"date": d, "conf": c}                 resolved already
+      {"weekday": w, "mod": m}               resolved against the reference
+      {"d": day, "m": month|None, "y": year|None}
+    """
+
+    def __init__(self, tokens, reference: date):
+        self.tokens = tokens
+        self.ref = reference
+
+    def kind(self, i: int) -> Optional[str]:
+        return self.tokens[i][0] if i < len(self.tokens) else None
+
+    def value(self, i: int):
+        return self.tokens[i][1]
+
+    def _year(self, i: int) -> Optional[int]:
+        if self.kind(i) == "num" and 1900 < self.value(i) < 2100:
+            return self.value(i)
+        return None
+
+    def _day(self, i: int, bare: bool) -> Optional[int]:
+        if self.kind(i) == "ord" or (bare and self.kind(i) == "num"):
+            day = self.value(i)
+            return day if 1 <= day <= 31 else None
+        return None
+
+    # ---------- single dates ----------
+    def point(self, i: int, bare: bool = False):
+        kind = self.kind(i)
+
+        if kind == "rel":
+            return {"date": self.ref + timedelta(days=self.value(i)), "conf": 1.0}, i + 1
+
+        if kind == "mod" and self.kind(i + 1) == "weekday":
+            return {"weekday": self.value(i + 1), "mod": self.value(i)}, i + 2
+        if kind == "mod" and self.kind(i + 1) == "unit" and self.value(i + 1) == 7 and self.value(i) in ("next", "coming", "upcoming"):
+            # "next week": a week from today is one reading among several
+            return {"date": self.ref + timedelta(days=7), "conf": 0.6}, i + 2
+        if kind == "weekday":
+            return {"weekday": self.value(i), "mod": None}, i + 1
+
+        if kind == "iso":
+            try:
+                return {"date": date.fromisoformat(_pad_iso(self.value(i))), "conf": 1.0}, i + 1
+            except ValueError:
+                return None
+
+        if kind == "numdate":
+            parts = [int(p) for p in re.split(r"[/.-]", self.value(i))]
+            year = parts[2] if len(parts) == 3 else None
+            if year is not None and year < 100:
+                year += 2000
+            # Day first (dd/mm), as written in India
+            return {"d": parts[0], "m": parts[1], "y": year}, i + 1
+
+        if kind == "month":
+            day = self._day(i + 1, bare=True)
+            if day is not None:
+                year = self._year(i + 2)
+                return {"d": day, "m": self.value(i), "y": year}, i + (3 if year else 2)
+            return None
+
+        day = self._day(i, bare=True)
+        if day is not None:
+            j = i + 1 + (self.kind(i + 1) == "of")
+            if self.kind(j) == "month":
+                year = self._year(j + 1)
+                return {"d": day, "m": self.value(j), "y": year}, j + (2 if year else 1)
+            # A lone "5th" is a day of some month; a lone "5" only inside a range
+            if kind == "ord" or bare:
+                return {"d": day, "m": None, "y": None, "bare": kind == "num"}, i + 1
+        return None
+
+    def resolve(self, p: Dict[str, Any], after: Optional[date] = None) -> Optional[Tuple[date, float]]:
+        if "date" in p:
+            return p["date"], p["conf"]
+
+        if "weekday" in p:
+            wd, mod = p["weekday"], p["mod"]
+            if after is not None:
+                return after + timedelta(days=(wd - after.weekday()) % 7), 0.95
+            if mod == "this":
+                days_ahead = wd - self.ref.weekday()
+                if days_ahead >= 0:
+                    return self.ref + timedelta(days=days_ahead), 0.95
+                return next_weekday(self.ref, wd), 0.5
+            if mod in ("last", "previous"):
+                # Backdated leave, or "the last Friday of the month": LLM decides
+                days_back = (self.ref.weekday() - wd) % 7 or 7
+                return self.ref - timedelta(days=days_back), 0.5
+            if mod is None and wd == self.ref.weekday():
+                # "friday" said on a Friday: today or next week
+                return next_weekday(self.ref, wd), 0.6
+            return next_weekday(self.ref, wd), 0.95
+
+        day, month, year = p["d"], p["m"], p["y"]
+        if month is None:
+            base = after or self.ref
+            month, year = base.month, base.year
+            if day < base.day:
+                month, year = (1, year + 1) if month == 12 else (month + 1, year)
+            conf = 0.8 if after else 0.6
+        elif year is not None:
+            conf = 1.0
+        else:
+            year, conf = None, 0.95
+
+        try:
+            if year is not None:
+                return date(year, month, day), conf
+
+            candidate = date(self.ref.year, month, day)
+            if after is not None:
+                while candidate < after:
+                    candidate = candidate.replace(year=candidate.year + 1)
+                return candidate, conf
+            if candidate >= self.ref:
+                return candidate, conf
+            if (self.ref - candidate).days <= PAST_DATE_GRACE_DAYS:
+                return candidate, 0.7
+            return candidate.replace(year=candidate.year + 1), 0.85
+        except ValueError:
+            return None
+
+    # ---------- ranges ----------
+    def range(self, i: int):
+        j = i
+        between = False
+        if self.kind(j) == "open":
+            between = self.value(j) == "between"
+            j += 1
+
+        first = self.point(j, bare=True)
+        if first is None:
+            return None
+        a, k = first
+        if not (self.kind(k) == "sep" or (between and self.kind(k) == "and")):
+            return None
+        second = self.point(k + 1, bare=True)
+        if second is None:
+            return None
+        b, end = second
+
+        # "5th to 8th March" / "5th March to 8th": share the month
+        inferred = False
+        if "d" in a and "d" in b:
+            if a["m"] is None and b["m"] is None:
+                # "19th to 23rd": this month if still ahead, else too vague
+                if a.get("bare") or b.get("bare") or a["d"] < self.ref.day:
+                    return None
+                if b["d"] < a["d"]:
+                    return None
+                a = dict(a, m=self.ref.month)
+                b = dict(b, m=self.ref.month)
+                inferred = True
+            if a["m"] is None:
+                a = dict(a, m=b["m"], y=b["y"])
+            elif b["m"] is None:
+                b = dict(b, m=a["m"], y=a["y"])
+                if b["d"] < a["d"]:
+                    b = dict(b, m=a["m"] % 12 + 1, y=(a["y"] + 1 if a["y"] and a["m"] == 12 else a["y"]))
+        elif ("d" in a and a["m"] is None) or ("d" in b and b["m"] is None):
+            return None
+
+        start = self.resolve(a)
+        if start is None:
+            return None
+        stop = self.resolve(b, after=start[0])
+        if stop is None:
+            return None
+
+        conf = min(start[1], stop[1], 0.8 if inferred else 1.0)
+        if stop[0] < start[0]:
+            conf = min(conf, 0.4)
+        return {"start": start[0], "end": stop[0], "conf": conf}, end
+
+    # ---------- durations ----------
+    def duration(self, i: int):
+        j = i
+        anchored = False
+        if self.kind(j) == "for":
+            j += 1
+        elif self.kind(j) == "mod" and self.value(j) in ("next", "upcoming", "coming"):
+            anchored = True
+            j += 1
+
+        if self.kind(j) in ("num", "numword") and self.kind(j + 1) == "unit":
+            count = self.value(j) * self.value(j + 1)
+            if 1 <= count <= 366:
+                # "in 2 days" / "after 3 days" is an offset from today, not a length
+                offset = j == i and i > 0 and self.tokens[i - 1][2] in ("in", "after", "within")
+                return {"days": count, "anchored": anchored, "offset": offset}, j + 2
+        return None
+
+    def run(self):
+        ranges, points, durations = [], [], []
+        consumed = set()
+        i = 0
+        while i < len(self.tokens):
+            for fn, bucket in ((self.range, ranges), (self.duration, durations), (self.point, points)):
+                found = fn(i)
+                if found:
+                    item, j = found
+                    if fn == self.point:
+                        # "till 20th jan": an end date with no start
+                        item["end_only"] = self.kind(i - 1) == "sep" if i else False
+                        # "12 and 13 jan": the last item of a list of days
+                        item["listed"] = i > 1 and self.kind(i - 1) == "and" and self.kind(i - 2) in ("num", "ord")
+                    bucket.append(item)
+                    consumed.update(range(i, j))
+                    i = j
+                    break
+            else:
+                i += 1
+        return ranges, points, durations, consumed
+
+
+def _pad_iso(value: str) -> str:
+    y, m, d = value.split("-")
+    return f"{y}-{int(m):02d}-{int(d):02d}"
+
+
+def _negated(tokens, consumed) -> bool:
+    """A negation word before a date phrase, with only filler in between."""
+    for i in consumed:
+        if i - 1 in consumed:
+            continue
+        j = i - 1
+        while j >= 0 and tokens[j][2] in FILLER and tokens[j][2] not in NEGATIONS:
+            j -= 1
+        if j >= 0 and tokens[j][2] in NEGATIONS:
+            return True
+    return False
+
+
+def _combine(parser: _Parser, ranges, points, durations) -> Optional[Tuple[date, date, float]]:
+    """
+    One (start, end, confidence) from the phrases found in a message;
+    start is None when only an end date was given ("till friday").
+    """
+    resolved = [parser.resolve(p) for p in points]
+    if any(r is None for r in resolved):
+        return None
+    end_only = any(p["end_only"] for p in points)
+    listed = any(p["listed"] for p in points)
+
+    if len(ranges) + len(resolved) > 2 or len(durations) > 1 or (ranges and resolved):
+        # Several competing dates: only the LLM can tell which is meant
+        first = ranges[0] if ranges else {"start": resolved[0][0], "end": resolved[0][0], "conf": 1.0}
+        return first["start"], first["end"], 0.3
+
+    duration = durations[0] if durations else None
+
+    if ranges:
+        r = ranges[0]
+        conf = r["conf"]
+        if duration and (r["end"] - r["start"]).days + 1 != duration["days"]:
+            conf = min(conf, 0.5)
+        return r["start"], r["end"], conf
+
+    if len(resolved) == 2:
+        (start, c1), (end, c2) = resolved
+        return start, end, min(c1, c2, 0.6 if end >= start else 0.3)
+
+    if len(resolved) == 1:
+        start, conf = resolved[0]
+        if end_only:
+            return None, start, min(conf, 0.5)
+        if listed:
+            # Only the last day of the list was parsed
+            conf = min(conf, 0.4)
+        if duration is None:
+            return start, start, conf
+        if duration["anchored"] or duration["offset"]:
+            return start, start, min(conf, 0.4)
+        return start, start + timedelta(days=duration["days"] - 1), conf
+
+    if duration:
+        if duration["offset"]:
+            # A single day N days out, or a leave starting then: LLM decides
+            start = parser.ref + timedelta(days=duration["days"])
+            return start, start, 0.4
+        # "next 3 days" starts today; a bare "for 3 days" is assumed to as well
+        conf = 0.95 if duration["anchored"] else 0.8
+        return parser.ref, parser.ref + timedelta(days=duration["days"] - 1), conf
+
+    return None
+
+
+def parse_dates(text: str, reference: Optional[datetime] = None) -> DateParse:
+    """Parse the leave dates in a message relative to reference (default now)."""
+    ref = (reference or datetime.now())
+    ref = ref.date() if isinstance(ref, datetime) else ref
+
+    tokens = tokenize(text or "")
+    parser = _Parser(tokens, ref)
+    ranges, points, durations, consumed = parser.run()
+
+    unparsed = [
+        tok[2] for i, tok in enumerate(tokens)
+        if i not in consumed and tok[2] not in FILLER and tok[0] not in ("sep", "open", "for", "of", "and")
+    ]
+    phrases = []
+    for i in sorted(consumed):
+        if phrases and i - 1 in consumed:
+            phrases[-1] += " " + tokens[i][2]
+        else:
+            phrases.append(tokens[i][2])
+
+    combined = _combine(parser, ranges, points, durations)
+    if combined is None:
+        return DateParse(phrases=phrases, unparsed=unparsed)
+
+    start, end, conf = combined
+    if _negated(tokens, consumed):
+        conf = min(conf, 0.3)
+    return DateParse(
+        start_date=start.isoformat() if start else None,
+        end_date=end.isoformat(),
+        confidence=round(conf, 2),
+        phrases=phrases,
+        unparsed=unparsed
+    )
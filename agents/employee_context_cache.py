@@ -0,0 +1,159 @@
+"""
+Employee Context Cache - leave balance / employee details for A4
+TTL cache keyed by empCode (see employee_key). A6 (approval recorded) and
+A7 (leave applied) invalidate an employee's entries so the next eligibility
+check refetches.
+Invalidation bumps a per-employee version stamp in a SQLite file shared by
+the worker processes on the host (or in Redis with
+EMPLOYEE_CONTEXT_REDIS_URL); an entry cached under an older version is
+refetched by every process, not just the one that saw the write.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+EMPLOYEE_CONTEXT_TTL_SECONDS = int(os.getenv("EMPLOYEE_CONTEXT_TTL_SECONDS", "300"))
+EMPLOYEE_CONTEXT_VERSION_PATH = os.getenv(
+    "EMPLOYEE_CONTEXT_VERSION_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'employee_context.db')
+)
+EMPLOYEE_CONTEXT_REDIS_URL = os.getenv("EMPLOYEE_CONTEXT_REDIS_URL")
+
+# Keys that may hold the employee's code in a state, row or API payload,
+# in order of preference
+EMPLOYEE_KEYS = ("empCode", "emp_code", "employee_code", "employee_id", "emp_id")
+
+logger = logging.getLogger(__name__)
+
+# (emp_code, kind) -> (expires_at, version, value)
+_cache: Dict[Tuple[str, str], Tuple[float, int, Any]] = {}
+_lock = threading.Lock()
+_local = threading.local()
+_redis = None
+
+CONTEXT_CACHE_STATS = {"hits": 0, "misses": 0, "invalidations": 0, "stale": 0}
+
+
+# ================= VERSION STAMPS =================
+def _redis_client():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(EMPLOYEE_CONTEXT_REDIS_URL)
+    return _redis
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; the schema is created on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == EMPLOYEE_CONTEXT_VERSION_PATH:
+        return conn
+
+    os.makedirs(os.path.dirname(os.path.abspath(EMPLOYEE_CONTEXT_VERSION_PATH)), exist_ok=True)
+    conn = sqlite3.connect(EMPLOYEE_CONTEXT_VERSION_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_versions (
+            emp_code TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    _local.conn = conn
+    _local.path = EMPLOYEE_CONTEXT_VERSION_PATH
+    return conn
+
+
+def context_version(emp_code: str) -> Optional[int]:
+    """Current version stamp of an employee's context; None if unreadable."""
+    try:
+        if EMPLOYEE_CONTEXT_REDIS_URL:
+            value = _redis_client().get(f"employee_context:version:{emp_code}")
+            return int(value or 0)
+        row = _connect().execute(
+            "SELECT version FROM context_versions WHERE emp_code = ?", (emp_code,)
+        ).fetchone()
+        return row[0] if row else 0
+    except Exception:
+        return None
+
+
+def _bump_version(emp_code: str):
+    try:
+        if EMPLOYEE_CONTEXT_REDIS_URL:
+            _redis_client().incr(f"employee_context:version:{emp_code}")
+            return
+        _connect().execute("""
+            INSERT INTO context_versions (emp_code, version) VALUES (?, 1)
+            ON CONFLICT(emp_code) DO UPDATE SET version = version + 1
+        """, (emp_code,))
+    except Exception as e:
+        logger.warning(f"Employee context version bump failed for {emp_code}: {e}")
+
+
+def employee_key(record: Dict[str, Any]) -> Optional[str]:
+    """
+    The employee's code from a workflow state, bulk row or payload - the one
+    key A4 caches under and A6/A7 invalidate. None if no key is set.
+    """
+    for key in EMPLOYEE_KEYS:
+        if record.get(key) not in (None, ""):
+            return str(record[key])
+    return None
+
+
+# ================= CACHE =================
+def get_employee_context(emp_code: Optional[str], kind: str, fetch: Callable[[], Any]) -> Any:
+    """
+    Cached payload of the given kind ("leave_balance", "employee_details")
+    for an employee; fetch() is called on a miss, after expiry, or when
+    another process has invalidated the employee since it was cached.
+    Without an emp_code, or when the version stamp cannot be read,
+    nothing is cached.
+    """
+    if not emp_code:
+        return fetch()
+
+    key = (str(emp_code), kind)
+    # Read before fetching: an invalidation during the fetch leaves the
+    # new entry already stale
+    version = context_version(key[0])
+    if version is None:
+        return fetch()
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > time.time():
+            if entry[1] == version:
+                CONTEXT_CACHE_STATS["hits"] += 1
+                return entry[2]
+            CONTEXT_CACHE_STATS["stale"] += 1
+        CONTEXT_CACHE_STATS["misses"] += 1
+
+    value = fetch()
+
+    with _lock:
+        _cache[key] = (time.time() + EMPLOYEE_CONTEXT_TTL_SECONDS, version, value)
+    return value
+
+
+def invalidate_employee_context(*emp_codes: Any):
+    """Drop every cached payload for the given employee identifiers, in all processes."""
+    targets = {str(code) for code in emp_codes if code not in (None, "")}
+    if not targets:
+        return
+
+    for code in targets:
+        _bump_version(code)
+
+    with _lock:
+        for key in [k for k in _cache if k[0] in targets]:
+            del _cache[key]
+        CONTEXT_CACHE_STATS["invalidations"] += 1
+
+
+def clear_employee_context_cache():
+    with _lock:
+        _cache.clear()
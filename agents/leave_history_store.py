@@ -0,0 +1,256 @@
+"""
+Leave History Store - incremental copy of the leave report for A2
+SQLite table of leaves per employee plus the window already synced, so a
+genuineness check only fetches the recent delta (with an overlap to pick up
+status changes) instead of the full 12-month report.
+A6 (status change) and A7 (leave applied) mark an employee stale.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import date, timedelta
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+HISTORY_STORE_PATH = os.getenv(
+    "HISTORY_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'leave_history.db')
+)
+# Days before the resync anchor (the sync date, or the window end if earlier)
+# that are re-fetched on every delta sync
+HISTORY_RESYNC_DAYS = int(os.getenv("HISTORY_RESYNC_DAYS", "30"))
+# A sync younger than this is served without contacting the leave API
+HISTORY_FRESH_SECONDS = int(os.getenv("HISTORY_FRESH_SECONDS", "300"))
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "365"))
+
+logger = logging.getLogger(__name__)
+
+HISTORY_STATS = {"full_syncs": 0, "delta_syncs": 0, "fresh_hits": 0, "invalidations": 0}
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; the schema is created on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == HISTORY_STORE_PATH:
+        return conn
+
+    os.makedirs(os.path.dirname(os.path.abspath(HISTORY_STORE_PATH)), exist_ok=True)
+    conn = sqlite3.connect(HISTORY_STORE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leave_history_sync (
+            emp_code TEXT PRIMARY KEY,
+            window_start TEXT NOT NULL,
+            synced_until TEXT NOT NULL,
+            synced_at REAL NOT NULL,
+            resync_from TEXT
+        )
+    """)
+    try:
+        # Stores created before the resync anchor existed
+        conn.execute("ALTER TABLE leave_history_sync ADD COLUMN resync_from TEXT")
+    except sqlite3.OperationalError:
+        pass
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leave_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_code TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            payload TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_leave_history_emp ON leave_history (emp_code, start_date)")
+
+    _local.conn = conn
+    _local.path = HISTORY_STORE_PATH
+    return conn
+
+
+def _count(name: str):
+    with _stats_lock:
+        HISTORY_STATS[name] += 1
+
+
+def _shift(iso_date: str, days: int) -> str:
+    return (date.fromisoformat(iso_date) + timedelta(days=days)).isoformat()
+
+
+def status_counts(leaves: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    The leave report's count block for these leaves: one count per
+    lowercased status, approved / rejected / cancelled / pending always present.
+    """
+    counts = {"approved": 0, "rejected": 0, "cancelled": 0, "pending": 0}
+    for leave in leaves:
+        status = str(leave.get("status", "")).lower()
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def _merge(conn, emp_code: str, fetch_start: str, fetch_end: str,
+           leaves: List[Dict[str, Any]], to_iso: Callable[[str], str]):
+    """Replace the stored leaves starting in [fetch_start, fetch_end] with a fresh fetch."""
+    conn.execute(
+        "DELETE FROM leave_history WHERE emp_code = ? AND start_date BETWEEN ? AND ?",
+        (emp_code, fetch_start, fetch_end)
+    )
+    rows = []
+    for leave in leaves:
+        try:
+            start = to_iso(leave["start_date"])
+        except (KeyError, TypeError, ValueError):
+            # Kept (so totals match the API) and replaced by the next overlapping sync
+            start = fetch_start
+        rows.append((emp_code, start, json.dumps(leave)))
+    conn.executemany(
+        "INSERT INTO leave_history (emp_code, start_date, payload) VALUES (?, ?, ?)", rows
+    )
+
+
+def _sync_row(emp_code: str):
+    return _connect().execute(
+        "SELECT window_start, synced_until, synced_at, resync_from FROM leave_history_sync WHERE emp_code = ?",
+        (emp_code,)
+    ).fetchone()
+
+
+def _store(emp_code: str, start: str, window_start: str, fetch_start: str, fetch_end: str,
+           leaves: List[Dict[str, Any]], to_iso: Callable[[str], str]):
+    conn = _connect()
+    # Trim to the retention window, but never below what was just requested
+    cutoff = min(start, _shift(fetch_end, -HISTORY_RETENTION_DAYS))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _merge(conn, emp_code, fetch_start, fetch_end, leaves, to_iso)
+        conn.execute(
+            "DELETE FROM leave_history WHERE emp_code = ? AND start_date < ?",
+            (emp_code, cutoff)
+        )
+        conn.execute("""
+            INSERT OR REPLACE INTO leave_history_sync
+                (emp_code, window_start, synced_until, synced_at, resync_from)
+            VALUES (?, ?, ?, ?, ?)
+        """, (emp_code, max(window_start, cutoff), fetch_end, time.time(),
+              min(date.today().isoformat(), fetch_end)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _stored_window(emp_code: str, start: str, end: str) -> List[Dict[str, Any]]:
+    return [
+        json.loads(row[0]) for row in _connect().execute(
+            "SELECT payload FROM leave_history WHERE emp_code = ? AND start_date BETWEEN ? AND ? ORDER BY start_date, id",
+            (emp_code, start, end)
+        )
+    ]
+
+
+async def sync_leave_history(
+    emp_code: str,
+    start: str,
+    end: str,
+    fetch: Callable[[str, str], Awaitable[Dict[str, Any]]],
+    to_iso: Callable[[str], str]
+) -> Dict[str, Any]:
+    """
+    Leaves starting in [start, end] (ISO dates) in the get_leaves() shape.
+
+    fetch(start, end) calls the leave API and raises on failure; to_iso()
+    turns an API start_date into YYYY-MM-DD. The first call for an employee fetches the whole window;
+    later calls fetch [anchor - HISTORY_RESYNC_DAYS, end] and merge it, where
+    the anchor is the last sync date (or the synced end, if earlier): leaves
+    filed since then may start anywhere before synced_until, which is often
+    in the future.
+    Counts are the API's count block when this call fetched exactly
+    [start, end], otherwise recounted from the stored statuses the same way.
+    SQLite work runs in a worker thread so a locked writer cannot stall the
+    event loop.
+    """
+    sync = await asyncio.to_thread(_sync_row, emp_code)
+    counts = None
+
+    if sync and start >= sync[0] and end <= sync[1] and time.time() - sync[2] < HISTORY_FRESH_SECONDS:
+        _count("fresh_hits")
+    else:
+        if sync is None or start < sync[0]:
+            fetch_start = start
+            fetch_end = max(end, sync[1]) if sync else end
+            window_start = start
+            _count("full_syncs")
+        else:
+            # No anchor (older store): refetch the whole stored window
+            fetch_start = max(sync[0], _shift(sync[3], -HISTORY_RESYNC_DAYS)) if sync[3] else sync[0]
+            fetch_end = max(end, sync[1])
+            window_start = sync[0]
+            _count("delta_syncs")
+
+        try:
+            data = await fetch(fetch_start, fetch_end)
+        except Exception as e:
+            if sync is None:
+                raise
+            # Serve the stored copy; the next request retries the sync
+            logger.warning(f"Leave history sync failed for {emp_code}, using stored copy: {e}")
+            data = None
+
+        if data is not None:
+            await asyncio.to_thread(
+                _store, emp_code, start, window_start, fetch_start, fetch_end, data.get("leaves", []), to_iso
+            )
+            if (fetch_start, fetch_end) == (start, end):
+                counts = data.get("counts")
+
+    leaves = await asyncio.to_thread(_stored_window, emp_code, start, end)
+    if counts is not None:
+        return {"leaves": leaves, "counts": dict(counts)}
+    return {"leaves": leaves, "counts": status_counts(leaves) if leaves else {}}
+
+
+def stored_leaves(emp_code: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Leaves already stored for an employee (no API call), optionally starting on/after `since`."""
+    rows = _connect().execute(
+        "SELECT payload FROM leave_history WHERE emp_code = ? AND start_date >= ? ORDER BY start_date, id",
+        (str(emp_code), since or "")
+    )
+    return [json.loads(row[0]) for row in rows]
+
+
+def leave_history_sync_state(emp_code: str) -> Optional[Dict[str, Any]]:
+    """The employee's synced window and sync time, or None if never synced."""
+    row = _connect().execute(
+        "SELECT window_start, synced_until, synced_at FROM leave_history_sync WHERE emp_code = ?",
+        (str(emp_code),)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"window_start": row[0], "synced_until": row[1], "synced_at": row[2]}
+
+
+def invalidate_leave_history(*emp_codes: Any):
+    """Force a delta sync on the next request for these employees."""
+    targets = [str(code) for code in emp_codes if code not in (None, "")]
+    if not targets:
+        return
+    try:
+        _connect().executemany(
+            "UPDATE leave_history_sync SET synced_at = 0 WHERE emp_code = ?",
+            [(code,) for code in targets]
+        )
+        _count("invalidations")
+    except sqlite3.Error as e:
+        logger.warning(f"Leave history invalidation failed: {e}")
+
+
+def clear_leave_history():
+    conn = _connect()
+    conn.execute("DELETE FROM leave_history")
+    conn.execute("DELETE FROM leave_history_sync")
@@ -0,0 +1,252 @@
+"""
+LLM Response Cache - shared by A1, A3 and A5
+SQLite-backed so every worker process on the host reuses the same answers.
+Keyed by model + messages + call params, with TTL expiry and an LRU size cap.
+Cache hits are read-only: last_access is refreshed at most every
+LLM_CACHE_TOUCH_SECONDS, counters are kept in process and flushed with the
+next write, and expiry/eviction runs on every LLM_CACHE_EVICT_EVERY-th put.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'llm_cache.db')
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "false").lower() == "true"
+# LRU order only needs to be roughly right
+LLM_CACHE_TOUCH_SECONDS = int(os.getenv("LLM_CACHE_TOUCH_SECONDS", "3600"))
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+
+logger = logging.getLogger(__name__)
+
+# Counters for this process; cache_stats() also reports the shared totals
+CACHE_STATS = {"hits": 0, "misses": 0, "bypassed": 0}
+# Counts not yet added to the shared llm_cache_stats table
+_unflushed = {"hits": 0, "misses": 0, "bypassed": 0}
+_puts = 0
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; the schema is created on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == LLM_CACHE_PATH:
+        return conn
+
+    os.makedirs(os.path.dirname(os.path.abspath(LLM_CACHE_PATH)), exist_ok=True)
+    conn = sqlite3.connect(LLM_CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_responses (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_access ON llm_responses (last_access)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+
+    _local.conn = conn
+    _local.path = LLM_CACHE_PATH
+    return conn
+
+
+def _count(name: str):
+    with _stats_lock:
+        CACHE_STATS[name] += 1
+        _unflushed[name] += 1
+
+
+def _flush_stats(conn: sqlite3.Connection):
+    """Add this process's unflushed counts to the shared totals."""
+    with _stats_lock:
+        pending = {name: n for name, n in _unflushed.items() if n}
+        for name in pending:
+            _unflushed[name] = 0
+    if not pending:
+        return
+    try:
+        conn.executemany("""
+            INSERT INTO llm_cache_stats (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """, list(pending.items()))
+    except sqlite3.Error:
+        with _stats_lock:
+            for name, n in pending.items():
+                _unflushed[name] += n
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> str:
+    """Stable hash of everything that determines the response."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params or {}},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached(key: str) -> Optional[Any]:
+    """Cached value for key, or None if missing/expired."""
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT response, created_at, last_access FROM llm_responses WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row[1] > LLM_CACHE_TTL_SECONDS:
+            # Overwritten by the next put, or removed by the next eviction pass
+            return None
+
+        if now - row[2] > LLM_CACHE_TOUCH_SECONDS:
+            conn.execute("UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (now, key))
+        return json.loads(row[0])
+    except (sqlite3.Error, ValueError):
+        return None
+
+
+def _evict(conn: sqlite3.Connection, now: float):
+    conn.execute(
+        "DELETE FROM llm_responses WHERE created_at < ?", (now - LLM_CACHE_TTL_SECONDS,)
+    )
+    overflow = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0] - LLM_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        conn.execute("""
+            DELETE FROM llm_responses WHERE cache_key IN (
+                SELECT cache_key FROM llm_responses ORDER BY last_access ASC LIMIT ?
+            )
+        """, (overflow,))
+
+
+def put_cached(key: str, value: Any, model: Optional[str] = None):
+    """
+    Store a JSON-serialisable value. TTL and the LRU cap are enforced on
+    every LLM_CACHE_EVICT_EVERY-th put of this process (the first included).
+    """
+    global _puts
+    try:
+        conn = _connect()
+        now = time.time()
+        conn.execute("""
+            INSERT OR REPLACE INTO llm_responses (cache_key, model, response, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+        """, (key, model, json.dumps(value), now, now))
+        _flush_stats(conn)
+
+        with _stats_lock:
+            evict = _puts % max(1, LLM_CACHE_EVICT_EVERY) == 0
+            _puts += 1
+        if evict:
+            _evict(conn, now)
+    except sqlite3.Error as e:
+        logger.warning("LLM cache write failed: %s", e)
+
+
+def _lookup(model, messages, params, bypass):
+    if bypass or LLM_CACHE_DISABLED:
+        _count("bypassed")
+        return None, None
+
+    key = cache_key(model, messages, params)
+    value = get_cached(key)
+    _count("hits" if value is not None else "misses")
+    return key, value
+
+
+def cached_llm_call(
+    model: str,
+    messages: List[Dict[str, Any]],
+    params: Optional[Dict[str, Any]],
+    compute: Callable[[], Any],
+    bypass: bool = False
+) -> Any:
+    """
+    Return the cached response for (model, messages, params), or call
+    compute() and cache its (JSON-serialisable) result.
+    bypass=True, or LLM_CACHE_DISABLED, always calls compute() and skips the write.
+    """
+    key, value = _lookup(model, messages, params, bypass)
+    if value is not None:
+        return value
+
+    value = compute()
+    if key is not None and value is not None:
+        put_cached(key, value, model)
+    return value
+
+
+async def acached_llm_call(
+    model: str,
+    messages: List[Dict[str, Any]],
+    params: Optional[Dict[str, Any]],
+    compute,
+    bypass: bool = False
+) -> Any:
+    """
+    Async cached_llm_call(); compute is a coroutine function. SQLite work
+    runs in a thread so the event loop is never blocked on the cache.
+    """
+    key, value = await asyncio.to_thread(_lookup, model, messages, params, bypass)
+    if value is not None:
+        return value
+
+    value = await compute()
+    if key is not None and value is not None:
+        await asyncio.to_thread(put_cached, key, value, model)
+    return value
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for this process and across all processes."""
+    shared = {}
+    entries = 0
+    try:
+        conn = _connect()
+        _flush_stats(conn)
+        shared = dict(conn.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+    except sqlite3.Error:
+        pass
+
+    lookups = CACHE_STATS["hits"] + CACHE_STATS["misses"]
+    return {
+        "process": dict(CACHE_STATS),
+        "process_hit_rate": round(CACHE_STATS["hits"] / lookups, 3) if lookups else 0.0,
+        "shared": shared,
+        "entries": entries,
+        "max_entries": LLM_CACHE_MAX_ENTRIES,
+        "ttl_seconds": LLM_CACHE_TTL_SECONDS,
+    }
+
+
+def clear_cache():
+    """Drop every cached response and reset the shared counters."""
+    conn = _connect()
+    conn.execute("DELETE FROM llm_responses")
+    conn.execute("DELETE FROM llm_cache_stats")
+    with _stats_lock:
+        for name in _unflushed:
+            _unflushed[name] = 0
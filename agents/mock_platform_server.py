@@ -0,0 +1,522 @@
+# mock_platform_server.py
+# --------------------------------------------------
+# Local stand-in for the HCM platform APIs used by the agents
+# --------------------------------------------------
+#
+# Covers, with the JSON shapes the agents parse:
+#   POST /auth/token                              A6, A7   {"token": ...}
+#   POST /user/leaves/showleavereport             A2       data.leaveReport / data.count
+#   GET  /user/leaves/balance                     A4       data[].leaveTypeCode / balance
+#   POST /user/leaves/totalLeaveWithSandwich      A4       data.noofleaves
+#   GET  /user/employee/details                   A4       data["Employee Details"]
+#   GET  /admin/workflow/assignment/{emp_id}      A6       approvermail / approvername
+#   POST /user/leaves/applyLeave                  A7       leaveRequestId
+#   GET  /__mock__/stats, POST /__mock__/config   request counters, runtime knobs
+#
+# Standalone (soak tests):
+#   python mock_platform_server.py --port 8765 --employees 50 --latency 0.05 --error-rate 0.01
+#   eval "$(python mock_platform_server.py --port 8765 --print-env)"   # env for the agents
+#
+# In-process / pytest:
+#   with MockPlatformServer(employees=10) as server:
+#       server.configure_agents()
+#       token = server.token_for("OMI-0001")
+#   or use the `mock_platform` fixture in tests/conftest.py.
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PASSWORD = "Omfys@123"
+
+# Reason mix roughly as seen in the leave report
+REASON_MIX = [
+    ("Sickness for Self", 0.30),
+    ("Family function", 0.20),
+    ("Going Outstation", 0.18),
+    ("Sickness of family member", 0.12),
+    ("Other", 0.10),
+    ("Death of Relatives", 0.05),
+    ("Death of family member", 0.03),
+    ("Personal work", 0.02),    # not canonical -> normalized to "Other" by A2
+]
+STATUS_MIX = [("Approved", 0.82), ("Rejected", 0.07), ("Cancelled", 0.06), ("Pending", 0.05)]
+LEAVE_TYPES = ["CL", "PL", "LWP"]
+LEAVE_TYPE_IDS = {"5": "PL", "6": "SL", "7": "CL"}
+
+DEPARTMENTS = ["Engineering", "Finance", "Operations", "Sales", "HR"]
+DESIGNATIONS = ["Associate", "Senior Associate", "Lead", "Manager"]
+FIRST_NAMES = ["Aarav", "Diya", "Kabir", "Meera", "Rohan", "Sara", "Vihaan", "Anaya", "Arjun", "Isha"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Khan", "Das", "Nair", "Joshi", "Rao"]
+
+
+# ================= SYNTHETIC DATA =================
+def _pick(rng: random.Random, mix):
+    return rng.choices([v for v, _ in mix], weights=[w for _, w in mix])[0]
+
+
+def generate_history(n: int, end: date, seed: int = 0, days: int = 365) -> List[Dict[str, Any]]:
+    """
+    n leave records starting within `days` before `end`, in the leaveReport
+    shape: dd-Mon-YYYY dates and the c_* fields A2 reads.
+    """
+    rng = random.Random(seed)
+    leaves = []
+    for i in range(n):
+        start = end - timedelta(days=rng.randrange(days))
+        duration = rng.choices([0.5, 1, 2, 3, 5, 10], weights=[8, 45, 22, 12, 9, 4])[0]
+        notice = rng.choices(
+            [0, 1, 2, rng.randint(3, 14), rng.randint(15, 60)], weights=[12, 10, 8, 40, 30]
+        )[0]
+        leaves.append({
+            "leave_id": f"LV{seed:03d}{i:07d}",
+            "leave_type": rng.choice(LEAVE_TYPES),
+            "start_date": start.strftime("%d-%b-%Y"),
+            "end_date": (start + timedelta(days=max(int(duration) - 1, 0))).strftime("%d-%b-%Y"),
+            "c_reason_category": _pick(rng, REASON_MIX),
+            "c_duration_days": duration,
+            "c_advance_notice_days": notice,
+            "c_leave_start_weekday": start.strftime("%A"),
+            "status": _pick(rng, STATUS_MIX),
+            "applied_on": (start - timedelta(days=notice)).strftime("%d-%b-%Y"),
+        })
+    leaves.sort(key=lambda l: datetime.strptime(l["start_date"], "%d-%b-%Y"))
+    return leaves
+
+
+def leave_counts(leaves: List[Dict[str, Any]]) -> Dict[str, int]:
+    """The report's `count` block."""
+    counts = {"approved": 0, "rejected": 0, "cancelled": 0, "pending": 0}
+    for l in leaves:
+        status = l["status"].lower()
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def _parse_day(value: str) -> date:
+    for fmt in ("%Y-%m-%d", "%d-%b-%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date format: {value}")
+
+
+# ================= PLATFORM STATE =================
+class MockPlatform:
+    """Seeded employees, their leave history and the request knobs/counters."""
+
+    def __init__(
+        self,
+        employees: int = 20,
+        history_size: int = 40,
+        seed: int = 7,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.employees: Dict[str, Dict[str, Any]] = {}
+        self.tokens: Dict[str, str] = {}
+        self.stats: Dict[str, int] = {}
+        self.applied: List[Dict[str, Any]] = []
+
+        rng = random.Random(seed)
+        today = date.today()
+        for i in range(1, employees + 1):
+            self.add_employee(
+                f"OMI-{i:04d}",
+                leaves=generate_history(rng.randint(history_size // 2, history_size), today, seed=seed + i),
+                employee_status=rng.choices(["Confirmed", "Probation", "Trainee"], weights=[75, 15, 10])[0],
+                balances={"CL": float(rng.randint(0, 12)), "PL": float(rng.randint(0, 24)), "SL": float(rng.randint(0, 8))},
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                department=rng.choice(DEPARTMENTS),
+            )
+
+    def add_employee(
+        self,
+        emp_code: str,
+        leaves: Optional[List[Dict[str, Any]]] = None,
+        employee_status: str = "Confirmed",
+        balances: Optional[Dict[str, float]] = None,
+        name: Optional[str] = None,
+        department: str = "Engineering",
+        password: str = DEFAULT_PASSWORD
+    ) -> str:
+        """Register (or replace) an employee; returns a ready-to-use token."""
+        emp_id = len(self.employees) + 1 if emp_code not in self.employees else self.employees[emp_code]["emp_id"]
+        employee = {
+            "emp_id": emp_id,
+            "empCode": emp_code,
+            "password": password,
+            "name": name or emp_code,
+            "department": department,
+            "designation": DESIGNATIONS[emp_id % len(DESIGNATIONS)],
+            "employee_status": employee_status,
+            "gender": "Female" if emp_id % 2 else "Male",
+            "balances": balances or {"CL": 6.0, "PL": 12.0, "SL": 4.0},
+            "leaves": [(_parse_day(l["start_date"]), l) for l in (leaves or [])],
+            "manager": {
+                "approvername": f"Manager {department}",
+                "approvermail": f"manager.{department.lower()}@example.com",
+            },
+        }
+        token = f"mock-token-{emp_code}"
+        with self._lock:
+            self.employees[emp_code] = employee
+            self.tokens[token] = emp_code
+        return token
+
+    def token_for(self, emp_code: str) -> str:
+        return f"mock-token-{emp_code}"
+
+    def issue_token(self, emp_code: str, password: str) -> Optional[str]:
+        employee = self.employees.get(emp_code)
+        if employee is None or employee["password"] != password:
+            return None
+        token = f"mock-{uuid.uuid4().hex}"
+        with self._lock:
+            self.tokens[token] = emp_code
+        return token
+
+    def employee_for_token(self, token: str) -> Optional[Dict[str, Any]]:
+        emp_code = self.tokens.get(token)
+        return self.employees.get(emp_code) if emp_code else None
+
+    def employee_by_id(self, emp_id: str) -> Optional[Dict[str, Any]]:
+        for employee in self.employees.values():
+            if str(employee["emp_id"]) == str(emp_id) or employee["empCode"] == str(emp_id):
+                return employee
+        return None
+
+    def count(self, route: str):
+        with self._lock:
+            self.stats[route] = self.stats.get(route, 0) + 1
+
+    def delay(self) -> float:
+        with self._lock:
+            return max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+# ================= HTTP HANDLER =================
+class MockPlatformHandler(BaseHTTPRequestHandler):
+    platform: MockPlatform = None
+    protocol_version = "HTTP/1.1"
+
+    # ---------- plumbing ----------
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _send(self, status: int, payload: Any):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _employee(self) -> Optional[Dict[str, Any]]:
+        auth = self.headers.get("Authorization", "")
+        token = auth[len("Bearer "):] if auth.startswith("Bearer ") else auth
+        return self.platform.employee_for_token(token)
+
+    def _dispatch(self, method: str):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        route, handler, args = self._route(method, path)
+        if handler is None:
+            self._send(404, {"status": "error", "message": f"No route for {method} {path}"})
+            return
+
+        self.platform.count(route)
+        body = self._body() if method == "POST" else {}
+
+        if not route.startswith("/__mock__"):
+            delay = self.platform.delay()
+            if delay:
+                time.sleep(delay)
+            if self.platform.should_fail():
+                self._send(503, {"status": "error", "message": "Injected failure"})
+                return
+
+        try:
+            status, payload = handler(body, *args)
+        except (KeyError, ValueError) as e:
+            status, payload = 400, {"status": "error", "message": f"Bad request: {e}"}
+        self._send(status, payload)
+
+    def _route(self, method: str, path: str) -> Tuple[str, Any, tuple]:
+        routes = {
+            ("POST", "/auth/token"): self.auth_token,
+            ("POST", "/user/leaves/showleavereport"): self.leave_report,
+            ("GET", "/user/leaves/balance"): self.leave_balance,
+            ("POST", "/user/leaves/totalLeaveWithSandwich"): self.sandwich_count,
+            ("GET", "/user/employee/details"): self.employee_details,
+            ("POST", "/user/leaves/applyLeave"): self.apply_leave,
+            ("GET", "/__mock__/stats"): self.mock_stats,
+            ("POST", "/__mock__/config"): self.mock_config,
+        }
+        if (method, path) in routes:
+            return path, routes[(method, path)], ()
+
+        prefix = "/admin/workflow/assignment/"
+        if method == "GET" and path.startswith(prefix):
+            return prefix + "{emp_id}", self.workflow_assignment, (path[len(prefix):],)
+        return path, None, ()
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, *args):
+        pass
+
+    # ---------- endpoints ----------
+    def auth_token(self, body):
+        token = self.platform.issue_token(body.get("empCode", ""), body.get("password", ""))
+        if token is None:
+            return 401, {"status": "error", "message": "Invalid credentials"}
+        employee = self.platform.employees[body["empCode"]]
+        return 200, {"token": token, "empCode": employee["empCode"], "username": employee["name"]}
+
+    def leave_report(self, body):
+        employee = self._employee()
+        if employee is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+
+        start, end = _parse_day(body["start_date"]), _parse_day(body["end_date"])
+        leaves = [l for day, l in employee["leaves"] if start <= day <= end]
+        return 200, {"status": "success", "data": {"leaveReport": leaves, "count": leave_counts(leaves)}}
+
+    def leave_balance(self, body):
+        employee = self._employee()
+        if employee is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+        return 200, {
+            "status": "success",
+            "data": [
+                {"leaveTypeCode": code, "balance": balance}
+                for code, balance in employee["balances"].items()
+            ]
+        }
+
+    def sandwich_count(self, body):
+        if self._employee() is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+
+        # Calendar days, so weekends inside the range count (sandwich rule)
+        start, end = _parse_day(body["startDate"]), _parse_day(body["endDate"])
+        return 200, {"status": "success", "data": {"noofleaves": max((end - start).days + 1, 0)}}
+
+    def employee_details(self, body):
+        employee = self._employee()
+        if employee is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+        return 200, {
+            "status": "success",
+            "data": {
+                "Employee Details": {
+                    "empCode": employee["empCode"],
+                    "employee_name": employee["name"],
+                    "employee_status": employee["employee_status"],
+                    "employee_gender": employee["gender"],
+                    "department": employee["department"],
+                    "designation": employee["designation"],
+                    "notice_period_status": False,
+                }
+            }
+        }
+
+    def workflow_assignment(self, body, emp_id):
+        if self._employee() is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+        employee = self.platform.employee_by_id(emp_id)
+        if employee is None:
+            return 404, {"status": "error", "message": f"No workflow for employee {emp_id}"}
+        return 200, dict(employee["manager"])
+
+    def apply_leave(self, body):
+        employee = self._employee()
+        if employee is None:
+            return 401, {"status": "error", "message": "Unauthorized"}
+
+        start, end = _parse_day(body["startDate"]), _parse_day(body["endDate"])
+        leave_request_id = f"LR{uuid.uuid4().hex[:10].upper()}"
+        leave = {
+            "leave_id": leave_request_id,
+            "leave_type": LEAVE_TYPE_IDS.get(str(body.get("leaveType")), "PL"),
+            "start_date": start.strftime("%d-%b-%Y"),
+            "end_date": end.strftime("%d-%b-%Y"),
+            "c_reason_category": body.get("purpose") or "Other",
+            "c_duration_days": (end - start).days + 1,
+            "c_advance_notice_days": (start - date.today()).days,
+            "c_leave_start_weekday": start.strftime("%A"),
+            "status": "Pending",
+            "applied_on": date.today().strftime("%d-%b-%Y"),
+        }
+        with self.platform._lock:
+            employee["leaves"].append((start, leave))
+            employee["leaves"].sort(key=lambda item: item[0])
+            self.platform.applied.append({"empCode": employee["empCode"], **leave})
+
+        return 200, {"status": "success", "leaveRequestId": leave_request_id, "data": {"id": leave_request_id}}
+
+    def mock_stats(self, body):
+        with self.platform._lock:
+            return 200, {
+                "requests": dict(self.platform.stats),
+                "employees": len(self.platform.employees),
+                "applied_leaves": len(self.platform.applied),
+                "latency": self.platform.latency,
+                "jitter": self.platform.jitter,
+                "error_rate": self.platform.error_rate,
+            }
+
+    def mock_config(self, body):
+        with self.platform._lock:
+            for knob in ("latency", "jitter", "error_rate"):
+                if knob in body:
+                    setattr(self.platform, knob, float(body[knob]))
+        return self.mock_stats(body)
+
+
+# ================= SERVER =================
+class MockPlatformServer:
+    """
+    Threaded mock platform on localhost. Usable as a context manager;
+    port=0 picks a free port.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, platform: Optional[MockPlatform] = None, **platform_kwargs):
+        self.platform = platform or MockPlatform(**platform_kwargs)
+        handler = type("BoundMockPlatformHandler", (MockPlatformHandler,), {"platform": self.platform})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._restore: List[Tuple[Any, str, Any]] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def token_for(self, emp_code: str) -> str:
+        return self.platform.token_for(emp_code)
+
+    def start(self) -> "MockPlatformServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.restore_agents()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockPlatformServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing the agents at this server."""
+        return {
+            "LEAVE_REPORT_API": f"{self.url}/user/leaves/showleavereport",
+            "LEAVE_BALANCE_API": f"{self.url}/user/leaves/balance",
+            "EMPLOYEE_DETAIL_API": f"{self.url}/user/employee/details",
+            "total_leave_with_sandwich": f"{self.url}/user/leaves/totalLeaveWithSandwich",
+            "PLATFORM_API_BASE_URL": self.url,
+            "PLATFORM_AUTH_URL": f"{self.url}/auth/token",
+        }
+
+    def configure_agents(self):
+        """
+        Point already imported agent modules at this server (their URLs are
+        read at import time). Undone by restore_agents() / stop().
+        """
+        env = self.env()
+        targets = [
+            ("agent_a2_genuineness", "config", "LEAVE_API", env["LEAVE_REPORT_API"]),
+            ("agent_a4_eligibility", None, "LEAVE_BALANCE_API", env["LEAVE_BALANCE_API"]),
+            ("agent_a4_eligibility", None, "EMPLOYEE_DETAILS_API", env["EMPLOYEE_DETAIL_API"]),
+            ("agent_a4_eligibility", None, "total_leave_with_sandwich", env["total_leave_with_sandwich"]),
+            ("agent_a6_approval_setup", None, "API_BASE_URL", env["PLATFORM_API_BASE_URL"]),
+            ("agent_a6_approval_setup", None, "AUTH_URL", env["PLATFORM_AUTH_URL"]),
+            ("agent_a7_transaction", None, "API_BASE_URL", env["PLATFORM_API_BASE_URL"]),
+            ("agent_a7_transaction", None, "AUTH_URL", env["PLATFORM_AUTH_URL"]),
+        ]
+        for module_name, attr, name, value in targets:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            obj = getattr(module, attr) if attr else module
+            self._restore.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+    def restore_agents(self):
+        while self._restore:
+            obj, name, value = self._restore.pop()
+            setattr(obj, name, value)
+
+
+# ================= CLI =================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the HCM platform APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--history-size", type=int, default=40, help="max leave records per employee")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--print-env", action="store_true", help="print export lines for the agents and exit")
+    args = parser.parse_args(argv)
+
+    server = MockPlatformServer(
+        host=args.host, port=args.port, employees=args.employees, history_size=args.history_size,
+        seed=args.seed, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    )
+    if args.print_env:
+        for key, value in server.env().items():
+            print(f"export {key}={value}")
+        server.httpd.server_close()
+        return
+
+    print(f"🧪 Mock platform on {server.url} ({args.employees} employees, password {DEFAULT_PASSWORD!r})")
+    for key, value in server.env().items():
+        print(f"   {key}={value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+"""
+Reason Classifier - local MiniLM classifier for A1's CANONICAL_REASONS
+Each canonical reason is a centroid of embedded example phrases; a reply is
+assigned the nearest reason only when it is similar enough and clearly ahead
+of the runner-up, otherwise None (ambiguous -> defer to the LLM).
+"""
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+REASON_CLASSIFIER_ENABLED = os.getenv("REASON_CLASSIFIER_ENABLED", "true").lower() == "true"
+# Cosine similarity to the best centroid, and lead over the second best
+REASON_MIN_SIMILARITY = float(os.getenv("REASON_MIN_SIMILARITY", "0.40"))
+REASON_MIN_MARGIN = float(os.getenv("REASON_MIN_MARGIN", "0.06"))
+
+logger = logging.getLogger(__name__)
+
+REASON_EXAMPLES: Dict[str, List[str]] = {
+    "Family function": [
+        "family function", "wedding in the family", "my sister's wedding",
+        "attending a marriage ceremony", "engagement of my brother",
+        "family get together", "house warming ceremony", "pooja at home",
+        "naming ceremony of my nephew", "festival celebration with family",
+    ],
+    "Going Outstation": [
+        "going outstation", "travelling to my hometown", "going out of station",
+        "trip to goa", "vacation with friends", "visiting my native place",
+        "travel out of the city", "going on a holiday", "flight to delhi",
+        "road trip",
+    ],
+    "Sickness for Self": [
+        "i am sick", "i have fever", "not feeling well", "i am unwell",
+        "doctor appointment for myself", "i have a cold and cough",
+        "stomach ache", "migraine", "i got injured", "recovering from surgery",
+    ],
+    "Sickness of family member": [
+        "my mom is unwell", "my father is sick", "my child has fever",
+        "wife is hospitalized", "taking my mother to the hospital",
+        "my son is not well", "caring for my sick parent",
+        "my husband had an accident", "daughter is ill", "grandmother is admitted in hospital",
+    ],
+    "Death of Relatives": [
+        "death of a relative", "my uncle passed away", "my aunt passed away",
+        "cousin died", "funeral of a relative", "my uncle's funeral",
+        "death in the extended family", "relative expired",
+    ],
+    "Death of family member": [
+        "death in the family", "my father passed away", "my mother passed away",
+        "my grandfather died", "funeral of my brother", "my sister passed away",
+        "loss of my parent", "death of my spouse",
+    ],
+    "Other": [
+        "personal work", "bank work", "shifting my house", "personal reasons",
+        "exam", "passport appointment", "vehicle registration", "moving to a new flat",
+        "government office work", "property registration",
+    ],
+}
+
+REASON_CLASSIFIER_STATS = {"classified": 0, "deferred": 0, "unavailable": 0}
+
+_embeddings = None
+_centroids = None
+_unavailable = False
+_lock = threading.Lock()
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _load():
+    """(embeddings, labels, centroid matrix), built on first use."""
+    global _embeddings, _centroids
+    with _lock:
+        if _centroids is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+            labels = list(REASON_EXAMPLES)
+            centroids = [
+                _normalize(_embeddings.embed_documents(REASON_EXAMPLES[label])).mean(axis=0)
+                for label in labels
+            ]
+            _centroids = (labels, _normalize(centroids))
+    return _embeddings, _centroids
+
+
+def reason_similarities(text: str) -> Dict[str, float]:
+    """Cosine similarity of text to every reason centroid."""
+    embeddings, (labels, centroids) = _load()
+    query = _normalize(embeddings.embed_query(text))
+    scores = centroids @ query
+    return {label: float(score) for label, score in zip(labels, scores)}
+
+
+def classify_reason(text: str) -> Optional[str]:
+    """
+    The canonical reason for a short reason reply, or None when the
+    classifier is disabled/unavailable or the match is weak or ambiguous.
+    """
+    global _unavailable
+    if not REASON_CLASSIFIER_ENABLED or _unavailable or not text or not text.strip():
+        return None
+
+    try:
+        scores = reason_similarities(text.strip())
+    except (ImportError, OSError) as e:
+        # Missing package or model: stop trying, the LLM keeps classifying
+        _unavailable = True
+        REASON_CLASSIFIER_STATS["unavailable"] += 1
+        logger.warning(f"Reason classifier unavailable: {e}")
+        return None
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, best_score), (_, second_score) = ranked[0], ranked[1]
+
+    if best_score < REASON_MIN_SIMILARITY or best_score - second_score < REASON_MIN_MARGIN:
+        REASON_CLASSIFIER_STATS["deferred"] += 1
+        return None
+
+    REASON_CLASSIFIER_STATS["classified"] += 1
+    return best
+
+
+def warm_reason_classifier():
+    """Load the model and centroids ahead of the first chat turn."""
+    if REASON_CLASSIFIER_ENABLED:
+        _load()
@@ -0,0 +1,287 @@
+"""
+Session Store - per-session state held server-side between chat turns
+In-process LRU with a sliding TTL, so abandoned sessions expire. With
+SESSION_REDIS_URL set, sessions live in Redis instead (one hash per session,
+one field per attribute) and any worker can serve the next turn. Field-level
+updates rewrite only the changed fields; values are serialized (orjson when
+installed, else json) only when written to Redis. SESSION_SQLITE_PATH shares
+sessions between worker processes on one host without a Redis server.
+"""
+from typing import Any, Dict, Optional, Type
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ================= BACKENDS =================
+class MemoryBackend:
+    """Live objects in an OrderedDict (LRU order) with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: int, stats: Dict[str, int]):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                stats["expired"] += 1
+                return None
+            entry[0] = now + ttl
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: Any, ttl: int, stats: Dict[str, int]):
+        with self._lock:
+            self._entries[key] = [time.time() + ttl, value]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                stats["evicted"] += 1
+
+    def update(self, key: str, value: Any, fields: Dict[str, Any], ttl: int, stats: Dict[str, int]):
+        # value was changed in place by the caller; just refresh its slot
+        self.put(key, value, ttl, stats)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self, stats: Dict[str, int]) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+            for key in expired:
+                del self._entries[key]
+        stats["expired"] += len(expired)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """One Redis hash per session; Redis handles expiry and eviction."""
+
+    def __init__(self, url: str, to_fields, from_fields):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.to_fields = to_fields
+        self.from_fields = from_fields
+
+    def get(self, key: str, ttl: int, stats: Dict[str, int]):
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        pipe.expire(key, ttl)
+        raw, _ = pipe.execute()
+        if not raw:
+            return None
+        return self.from_fields({k.decode(): loads(v) for k, v in raw.items()})
+
+    def put(self, key: str, value: Any, ttl: int, stats: Dict[str, int]):
+        fields = {k: dumps(v) for k, v in self.to_fields(value).items()}
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if fields:
+            pipe.hset(key, mapping=fields)
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def update(self, key: str, value: Any, fields: Dict[str, Any], ttl: int, stats: Dict[str, int]):
+        pipe = self.client.pipeline()
+        if fields:
+            pipe.hset(key, mapping={k: dumps(v) for k, v in fields.items()})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def purge_expired(self, stats: Dict[str, int]) -> int:
+        return 0
+
+    def __len__(self):
+        return 0
+
+
+class SQLiteBackend:
+    """One row per session in a WAL-mode SQLite file shared by local workers."""
+
+    def __init__(self, path: str, max_entries: int, to_fields, from_fields):
+        self.path = path
+        self.max_entries = max_entries
+        self.to_fields = to_fields
+        self.from_fields = from_fields
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; the schema is created on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+        self._local.conn = conn
+        return conn
+
+    def get(self, key: str, ttl: int, stats: Dict[str, int]):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM sessions WHERE session_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM sessions WHERE session_key = ?", (key,))
+            stats["expired"] += 1
+            return None
+        conn.execute(
+            "UPDATE sessions SET expires_at = ?, last_access = ? WHERE session_key = ?",
+            (now + ttl, now, key)
+        )
+        return self.from_fields(loads(row[0]))
+
+    def put(self, key: str, value: Any, ttl: int, stats: Dict[str, int]):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO sessions (session_key, value, expires_at, last_access) VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_key) DO UPDATE SET
+                value = excluded.value, expires_at = excluded.expires_at, last_access = excluded.last_access
+        """, (key, dumps(self.to_fields(value)), now + ttl, now))
+
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            conn.execute("""
+                DELETE FROM sessions WHERE session_key IN (
+                    SELECT session_key FROM sessions ORDER BY last_access LIMIT ?
+                )
+            """, (overflow,))
+            stats["evicted"] += overflow
+
+    def update(self, key: str, value: Any, fields: Dict[str, Any], ttl: int, stats: Dict[str, int]):
+        # A row holds the whole value, so an update rewrites it
+        self.put(key, value, ttl, stats)
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM sessions WHERE session_key = ?", (key,))
+
+    def purge_expired(self, stats: Dict[str, int]) -> int:
+        cursor = self._connect().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        stats["expired"] += cursor.rowcount
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+# ================= STORE =================
+class SessionStore:
+    """
+    Session objects keyed by session id. model (a pydantic class) is used
+    to rebuild objects read back from Redis or SQLite; without it values
+    are dicts.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        model: Optional[Type] = None,
+        ttl_seconds: int = SESSION_TTL_SECONDS,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        redis_url: Optional[str] = SESSION_REDIS_URL,
+        sqlite_path: Optional[str] = SESSION_SQLITE_PATH,
+        backend: Any = None
+    ):
+        self.namespace = namespace
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "writes": 0}
+
+        if backend is not None:
+            self.backend = backend
+        elif redis_url:
+            self.backend = RedisBackend(redis_url, self._to_fields, self._from_fields)
+        elif sqlite_path:
+            self.backend = SQLiteBackend(sqlite_path, max_entries, self._to_fields, self._from_fields)
+        else:
+            self.backend = MemoryBackend(max_entries)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.namespace}:{session_id}"
+
+    def _to_fields(self, value: Any) -> Dict[str, Any]:
+        return value.dict() if hasattr(value, "dict") else dict(value)
+
+    def _from_fields(self, fields: Dict[str, Any]) -> Any:
+        return self.model(**fields) if self.model is not None else fields
+
+    def get(self, session_id: str) -> Optional[Any]:
+        value = self.backend.get(self._key(session_id), self.ttl_seconds, self.stats)
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, session_id: str, value: Any):
+        self.backend.put(self._key(session_id), value, self.ttl_seconds, self.stats)
+        self.stats["writes"] += 1
+
+    def update(self, session_id: str, value: Any, changes: Dict[str, Any]):
+        """
+        Record that `changes` were applied to value (already mutated in
+        place by the caller); only those fields are rewritten.
+        """
+        self.backend.update(self._key(session_id), value, changes, self.ttl_seconds, self.stats)
+        self.stats["writes"] += 1
+
+    def delete(self, session_id: str):
+        self.backend.delete(self._key(session_id))
+
+    def purge_expired(self) -> int:
+        """Drop expired in-memory sessions now rather than on next access."""
+        return self.backend.purge_expired(self.stats)
+
+    def __len__(self):
+        return len(self.backend)
@@ -0,0 +1,345 @@
+"""
+Team Calendar - approved/pending leaves per team for availability checks
+Each team keeps its leaves in an interval index sorted by start date, so
+"how many members are out on any day in [start, end]" is answered from a
+bisect window instead of scanning every teammate's history.
+Teams come from the roster file (TEAM_ROSTER_PATH, {team_id: [empCode, ...]})
+and their leaves from the stored leave history; both are reloaded on first
+use and every TEAM_CALENDAR_REFRESH_SECONDS. In between, A6 (pending /
+approved / rejected) and A7 (approved leave applied on the platform) events
+keep the calendars current. The leave history only holds employees A2 has
+synced, so a team with any member outside it has no availability figure.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from leave_history_store import leave_history_sync_state, stored_leaves
+
+logger = logging.getLogger(__name__)
+
+TEAM_ROSTER_PATH = os.getenv("TEAM_ROSTER_PATH")
+TEAM_CALENDAR_REFRESH_SECONDS = int(os.getenv("TEAM_CALENDAR_REFRESH_SECONDS", "900"))
+# Leaves that ended before this many days ago are not loaded
+TEAM_CALENDAR_LOOKBACK_DAYS = int(os.getenv("TEAM_CALENDAR_LOOKBACK_DAYS", "60"))
+
+ACTIVE_STATUSES = {"pending", "approved"}
+
+# Substring -> status, checked in order (matched like status_counts in A2)
+_STATUS_MARKERS = (
+    ("reject", "rejected"), ("cancel", "cancelled"),
+    ("approved", "approved"), ("pending", "pending"), ("applied", "pending"),
+)
+
+
+def normalize_status(status: Any) -> str:
+    """ "Approved by Manager" -> approved, "Pending Approval" -> pending, ..."""
+    text = str(status or "").lower()
+    return next((name for marker, name in _STATUS_MARKERS if marker in text), text)
+
+# (start_ordinal, end_ordinal, member_id, leave_id)
+Interval = Tuple[int, int, str, str]
+
+
+def _ordinal(value: Any) -> int:
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        # Leave report format, e.g. 20-Jan-2026
+        return datetime.strptime(str(value).strip(), "%d-%b-%Y").toordinal()
+
+
+class TeamCalendar:
+    """
+    Leaves of one team in a sorted-interval index.
+
+    Intervals are kept sorted by start day. Because no leave is longer than
+    the longest one indexed (max_length), every interval overlapping
+    [start, end] starts in [start - max_length + 1, end]; two bisects find
+    that window, so a query costs O(log n + k) where k is the number of
+    leaves starting in it.
+    """
+
+    def __init__(self, team_id: str, members: Iterable[Any] = ()):
+        self.team_id = team_id
+        self.members = {str(m) for m in members}
+        self._intervals: List[Interval] = []
+        self._by_leave_id: Dict[str, Interval] = {}
+        self._max_length = 1
+        self._lock = threading.Lock()
+        # Members whose leaves are not known (no synced history)
+        self.uncovered: set = set()
+
+    @property
+    def team_size(self) -> int:
+        return len(self.members)
+
+    def add_leave(self, member_id: Any, start_date: Any, end_date: Any, leave_id: Optional[str] = None):
+        """Insert (or replace, when leave_id is already known) a leave."""
+        start, end = _ordinal(start_date), _ordinal(end_date)
+        if end < start:
+            start, end = end, start
+
+        member_id = str(member_id)
+        leave_id = str(leave_id) if leave_id is not None else f"{member_id}:{start}:{end}"
+        interval = (start, end, member_id, leave_id)
+
+        with self._lock:
+            self._remove_locked(leave_id)
+            insort(self._intervals, interval)
+            self._by_leave_id[leave_id] = interval
+            self.members.add(member_id)
+            self._max_length = max(self._max_length, end - start + 1)
+
+    def remove_leave(self, leave_id: str) -> bool:
+        with self._lock:
+            return self._remove_locked(str(leave_id))
+
+    def _remove_locked(self, leave_id: str) -> bool:
+        interval = self._by_leave_id.pop(leave_id, None)
+        if interval is None:
+            return False
+        i = bisect_left(self._intervals, interval)
+        if i < len(self._intervals) and self._intervals[i] == interval:
+            del self._intervals[i]
+        return True
+
+    def overlapping(self, start_date: Any, end_date: Any) -> List[Interval]:
+        """Leaves overlapping [start_date, end_date] (inclusive)."""
+        start, end = _ordinal(start_date), _ordinal(end_date)
+
+        with self._lock:
+            lo = bisect_left(self._intervals, (start - self._max_length + 1,))
+            hi = bisect_right(self._intervals, (end, float("inf")))
+            return [iv for iv in self._intervals[lo:hi] if iv[1] >= start]
+
+    def members_out(self, start_date: Any, end_date: Any, exclude_member: Any = None) -> int:
+        """Peak number of distinct members on leave on any single day in the window."""
+        start, end = _ordinal(start_date), _ordinal(end_date)
+        exclude_member = str(exclude_member) if exclude_member is not None else None
+
+        # Clip per member and merge, so overlapping leaves of one person count once
+        per_member: Dict[str, List[Tuple[int, int]]] = {}
+        for s, e, member_id, _ in self.overlapping(start_date, end_date):
+            if member_id == exclude_member:
+                continue
+            per_member.setdefault(member_id, []).append((max(s, start), min(e, end)))
+
+        events = []
+        for spans in per_member.values():
+            spans.sort()
+            cur_s, cur_e = spans[0]
+            for s, e in spans[1:]:
+                if s <= cur_e + 1:
+                    cur_e = max(cur_e, e)
+                else:
+                    events += [(cur_s, 1), (cur_e + 1, -1)]
+                    cur_s, cur_e = s, e
+            events += [(cur_s, 1), (cur_e + 1, -1)]
+
+        peak = current = 0
+        for _, delta in sorted(events):
+            current += delta
+            peak = max(peak, current)
+        return peak
+
+    def availability(self, start_date: Any, end_date: Any, exclude_member: Any = None) -> Optional[float]:
+        """Lowest % of the team available on any day in the window."""
+        if not self.team_size:
+            return None
+        out = self.members_out(start_date, end_date, exclude_member)
+        return ((self.team_size - out) / self.team_size) * 100
+
+
+# ============================================
+# REGISTRY + EVENT HOOKS
+# ============================================
+
+_calendars: Dict[str, TeamCalendar] = {}
+_member_team: Dict[str, str] = {}
+_registry_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_refreshed_at = 0.0
+# Leaves recorded by A6/A7 since the last refresh, replayed over the rebuilt
+# calendars until the leave history has synced them
+_events: Dict[str, Tuple[str, Any, Any, str]] = {}
+
+
+def load_team_calendar(
+    team_id: str,
+    members: Iterable[Any],
+    leaves: Iterable[Dict[str, Any]] = (),
+    uncovered: Iterable[Any] = ()
+) -> TeamCalendar:
+    """
+    (Re)build a team's calendar.
+    leaves: dicts with employee_id, start_date, end_date, status and optional leave_id;
+    only pending/approved leaves are indexed.
+    uncovered: members whose leaves are unknown.
+    """
+    calendar = TeamCalendar(team_id, members)
+    calendar.uncovered = {str(m) for m in uncovered}
+    for leave in leaves:
+        if normalize_status(leave.get("status", "pending")) in ACTIVE_STATUSES:
+            calendar.add_leave(
+                leave["employee_id"], leave["start_date"], leave["end_date"], leave.get("leave_id")
+            )
+
+    with _registry_lock:
+        _calendars[team_id] = calendar
+        for member in calendar.members:
+            _member_team[member] = team_id
+    return calendar
+
+
+def get_team_calendar(member_id: Any = None, team_id: Optional[str] = None) -> Optional[TeamCalendar]:
+    with _registry_lock:
+        if team_id is None and member_id is not None:
+            team_id = _member_team.get(str(member_id))
+        return _calendars.get(team_id) if team_id is not None else None
+
+
+def record_leave_event(
+    member_id: Any,
+    start_date: Any,
+    end_date: Any,
+    status: str,
+    leave_id: Optional[str] = None,
+    team_id: Optional[str] = None
+):
+    """
+    Incremental update from A6/A7: pending/approved leaves are (re)indexed,
+    rejected/cancelled ones removed. Unknown teams are ignored.
+    """
+    if member_id is None or not start_date or not end_date:
+        return
+
+    calendar = get_team_calendar(member_id, team_id)
+    if calendar is None:
+        return
+
+    if leave_id is not None:
+        with _registry_lock:
+            _events[str(leave_id)] = (str(member_id), start_date, end_date, str(status))
+
+    if normalize_status(status) in ACTIVE_STATUSES:
+        calendar.add_leave(member_id, start_date, end_date, leave_id)
+    elif leave_id is not None:
+        calendar.remove_leave(leave_id)
+
+
+def load_team_roster(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """{team_id: [empCode, ...]} from the roster file; empty when none is configured."""
+    path = path or TEAM_ROSTER_PATH
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        roster = json.load(f)
+    return {str(team_id): [str(m) for m in members] for team_id, members in roster.items()}
+
+
+def history_covers(member: str, since: str) -> bool:
+    """The member's stored leave history spans [since, today]."""
+    state = leave_history_sync_state(member)
+    return (
+        state is not None
+        and state["window_start"] <= since
+        and state["synced_until"] >= date.today().isoformat()
+    )
+
+
+def refresh_team_calendars(
+    roster: Optional[Dict[str, List[str]]] = None,
+    leaves_for: Callable[[str, str], List[Dict[str, Any]]] = stored_leaves,
+    covers: Callable[[str, str], bool] = history_covers
+) -> int:
+    """
+    Rebuild every team's calendar from the roster and each member's stored
+    leave history (leaves_for(empCode, since_iso) -> leave report rows);
+    covers(empCode, since_iso) says whether that history is complete.
+    Call at startup or from a scheduler; team_availability() also calls it
+    lazily. Returns the number of teams loaded.
+    """
+    global _refreshed_at
+    roster = load_team_roster() if roster is None else roster
+    since = date.today() - timedelta(days=TEAM_CALENDAR_LOOKBACK_DAYS)
+
+    with _registry_lock:
+        events = dict(_events)
+
+    synced = set()
+    for team_id, members in roster.items():
+        leaves: Dict[str, Dict[str, Any]] = {}
+        uncovered = [m for m in members if not covers(m, since.isoformat())]
+        for member in members:
+            for leave in leaves_for(member, since.isoformat()):
+                try:
+                    _ordinal(leave["start_date"]), _ordinal(leave["end_date"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                leave_id = str(leave.get("leave_id") or f"{member}:{leave['start_date']}:{leave['end_date']}")
+                leaves[leave_id] = {**leave, "employee_id": member, "leave_id": leave_id}
+
+        member_set = set(members)
+        for leave_id, (member, start, end, status) in events.items():
+            if member not in member_set:
+                continue
+            stored = leaves.get(leave_id)
+            if stored is not None and normalize_status(stored.get("status")) == normalize_status(status):
+                synced.add(leave_id)
+                continue
+            # Newer than the stored history (or not in it yet)
+            leaves[leave_id] = {
+                "employee_id": member, "start_date": start, "end_date": end,
+                "status": status, "leave_id": leave_id
+            }
+        load_team_calendar(team_id, members, leaves.values(), uncovered)
+
+    with _registry_lock:
+        # Drop events the stored history has caught up with, or that have ended
+        for leave_id, (_, _, end, _) in list(_events.items()):
+            if leave_id in synced or _ordinal(end) < since.toordinal():
+                del _events[leave_id]
+        _refreshed_at = time.time()
+    return len(roster)
+
+
+def _refresh_if_stale():
+    global _refreshed_at
+    if not TEAM_ROSTER_PATH or time.time() - _refreshed_at < TEAM_CALENDAR_REFRESH_SECONDS:
+        return
+    # One refresher at a time; other callers use the current calendars
+    if not _refresh_lock.acquire(blocking=not _refreshed_at):
+        return
+    try:
+        if time.time() - _refreshed_at >= TEAM_CALENDAR_REFRESH_SECONDS:
+            refresh_team_calendars()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        # Keep the current calendars and retry after the next interval
+        logger.warning(f"Team calendar refresh failed: {e}")
+        _refreshed_at = time.time()
+    finally:
+        _refresh_lock.release()
+
+
+def team_availability(member_id: Any, start_date: Any, end_date: Any) -> Optional[float]:
+    """
+    Team availability (%) during the member's requested leave, excluding the
+    member; None when the member is on no loaded team, or when a teammate's
+    leaves are unknown (the figure would count them as available).
+    """
+    _refresh_if_stale()
+    calendar = get_team_calendar(member_id)
+    if calendar is None or calendar.uncovered - {str(member_id)}:
+        return None
+    return calendar.availability(start_date, end_date, exclude_member=member_id)
@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the agent tests.
+The agents import each other as top-level modules, so agents/ goes on sys.path.
+
+    python -m pytest agents/tests -q
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_platform_server import MockPlatformServer  # noqa: E402
+
+
+@pytest.fixture
+def mock_platform():
+    """Running MockPlatformServer with the imported agents pointed at it."""
+    with MockPlatformServer(employees=10) as server:
+        server.configure_agents()
+        yield server
+
+
+@pytest.fixture
+def history_store(tmp_path, monkeypatch):
+    """Empty leave history store in a temporary SQLite file."""
+    import leave_history_store
+
+    monkeypatch.setattr(leave_history_store, "HISTORY_STORE_PATH", str(tmp_path / "leave_history.db"))
+    return leave_history_store
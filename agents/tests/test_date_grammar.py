@@ -0,0 +1,38 @@
+"""A1 date grammar: the benchmark corpus plus negation and unparsed words."""
+import pytest
+
+from bench_date_grammar import CORPUS, REFERENCE
+from date_grammar import parse_dates
+
+
+@pytest.mark.parametrize("phrase, expected", CORPUS)
+def test_corpus_has_no_wrong_confident_parse(phrase, expected):
+    # Escalating to the LLM is allowed; resolving to the wrong dates is not
+    parsed = parse_dates(phrase, REFERENCE)
+    if parsed.confident:
+        assert expected is not None
+        assert (parsed.start_date, parsed.end_date) == expected
+
+
+def test_negated_date_is_not_confident():
+    assert parse_dates("tomorrow", REFERENCE).confident
+    assert not parse_dates("not tomorrow", REFERENCE).confident
+    assert not parse_dates("i can't take leave on monday", REFERENCE).confident
+
+
+def test_negation_elsewhere_in_message_is_ignored():
+    parsed = parse_dates("not feeling well, taking leave today", REFERENCE)
+    assert parsed.confident
+    assert parsed.start_date == "2026-01-12"
+
+
+def test_reports_words_outside_date_phrases():
+    parsed = parse_dates("sick leave tomorrow", REFERENCE)
+    assert parsed.start_date == "2026-01-13"
+    assert "sick" in parsed.unparsed
+
+
+def test_no_dates():
+    parsed = parse_dates("i want to apply for leave", REFERENCE)
+    assert parsed.start_date is None
+    assert not parsed.confident
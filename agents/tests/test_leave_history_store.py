@@ -0,0 +1,39 @@
+"""Leave history store: count block and syncs against the mock platform."""
+import asyncio
+from datetime import date, timedelta
+
+import agent_a2_genuineness as a2
+from leave_history_store import status_counts
+
+
+def test_status_counts_keeps_every_status():
+    leaves = [{"status": "Approved"}, {"status": "Pending"}, {"status": "pending"}, {"status": "On Hold"}]
+    assert status_counts(leaves) == {"approved": 1, "rejected": 0, "cancelled": 0, "pending": 2, "on hold": 1}
+    assert status_counts([]) == {"approved": 0, "rejected": 0, "cancelled": 0, "pending": 0}
+
+
+def fetch_both(token, emp_code, start, end):
+    async def run():
+        try:
+            return await a2.request_leaves(token, start, end), await a2.get_leave_history(token, emp_code, start, end)
+        finally:
+            await a2.close_http_client()
+    return asyncio.run(run())
+
+
+def test_synced_history_matches_leave_api(mock_platform, history_store):
+    end = date.today().isoformat()
+    start = (date.today() - timedelta(days=365)).isoformat()
+    token = mock_platform.token_for("OMI-0003")
+
+    direct, stored = fetch_both(token, "OMI-0003", start, end)
+    assert stored["counts"] == direct["counts"]
+    assert len(stored["leaves"]) == len(direct["leaves"])
+    assert history_store.leave_history_sync_state("OMI-0003")["window_start"] == start
+
+    # Delta sync over a narrower window recounts the stored leaves
+    history_store.invalidate_leave_history("OMI-0003")
+    start = (date.today() - timedelta(days=200)).isoformat()
+    direct, stored = fetch_both(token, "OMI-0003", start, end)
+    assert stored["counts"] == direct["counts"]
+    assert status_counts(stored["leaves"]) == direct["counts"]
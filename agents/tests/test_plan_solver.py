@@ -0,0 +1,52 @@
+"""A5 plan solver: feasible splits, ordering and memo isolation."""
+from agent_a5_plan_solver import solve_leave_plans
+
+BALANCE = {"CL": 2, "PL": 2}
+
+
+def limits(cl=2.0, pl=2.0, lwp=True):
+    return {
+        "CL": {"eligible": True, "max_usable": cl},
+        "PL": {"eligible": True, "max_usable": pl},
+        "LWP": {"eligible": lwp},
+    }
+
+
+def days(plan):
+    return {item["type"]: item["days"] for item in plan["leave_breakdown"]}
+
+
+def test_every_plan_covers_the_duration_within_limits():
+    plans = solve_leave_plans(6, limits(), BALANCE, 10, "fullday")
+    assert plans
+    for plan in plans:
+        split = days(plan)
+        assert sum(split.values()) == 6
+        assert split.get("CL", 0) <= 2 and split.get("PL", 0) <= 2
+
+
+def test_paid_leave_first_and_only_best_recommended():
+    plans = solve_leave_plans(3, limits(), BALANCE, 10, "fullday")
+    assert days(plans[0]) == {"CL": 2, "PL": 1}
+    assert plans[0]["balance_after"] == {"CL": 0.0, "PL": 1.0}
+    assert [p["is_recommended"] for p in plans] == [True] + [False] * (len(plans) - 1)
+    # Paid leave covers 3 days, so no plan takes unpaid leave
+    assert all("LWP" not in days(p) for p in plans)
+
+
+def test_no_plans_when_infeasible():
+    assert solve_leave_plans(6, limits(lwp=False), BALANCE, 10, "fullday") == []
+
+
+def test_half_day():
+    plans = solve_leave_plans(0.5, limits(), BALANCE, 10, "halfday_1st")
+    assert [days(p) for p in plans] == [{"CL": 0.5}, {"PL": 0.5}]
+
+
+def test_editing_returned_plans_leaves_memo_intact():
+    plans = solve_leave_plans(3, limits(), BALANCE, 10, "fullday")
+    plans[0]["explanation"] = "edited"
+    plans[0]["leave_breakdown"].clear()
+    again = solve_leave_plans(3, limits(), BALANCE, 10, "fullday")
+    assert again[0]["explanation"] != "edited"
+    assert days(again[0]) == {"CL": 2, "PL": 1}
@@ -0,0 +1,61 @@
+"""Team calendar index: members out, availability and status handling."""
+from team_calendar import TeamCalendar, load_team_calendar, normalize_status
+
+
+def make_calendar():
+    calendar = TeamCalendar("T1", ["E1", "E2", "E3", "E4"])
+    calendar.add_leave("E2", "2026-10-20", "2026-10-22", "L1")
+    calendar.add_leave("E3", "2026-10-22", "2026-10-23", "L2")
+    calendar.add_leave("E4", "2026-10-24", "2026-10-25", "L3")
+    return calendar
+
+
+def test_members_out_is_peak_on_a_single_day():
+    calendar = make_calendar()
+    assert calendar.members_out("2026-10-19", "2026-10-19") == 0
+    assert calendar.members_out("2026-10-20", "2026-10-21") == 1
+    # E2 and E3 overlap on the 22nd
+    assert calendar.members_out("2026-10-20", "2026-10-25") == 2
+    # E3 and E4 are both out, but never on the same day
+    assert calendar.members_out("2026-10-23", "2026-10-25") == 1
+
+
+def test_members_out_counts_overlapping_leaves_of_one_member_once():
+    calendar = make_calendar()
+    calendar.add_leave("E2", "2026-10-21", "2026-10-27", "L4")
+    assert calendar.members_out("2026-10-26", "2026-10-26") == 1
+    assert calendar.members_out("2026-10-20", "2026-10-27") == 2
+
+
+def test_members_out_excludes_member():
+    calendar = make_calendar()
+    assert calendar.members_out("2026-10-22", "2026-10-22", exclude_member="E2") == 1
+    assert calendar.availability("2026-10-22", "2026-10-22", exclude_member="E2") == 75.0
+
+
+def test_replaced_and_removed_leaves():
+    calendar = make_calendar()
+    calendar.add_leave("E2", "2026-11-02", "2026-11-03", "L1")
+    assert calendar.members_out("2026-10-20", "2026-10-21") == 0
+    assert calendar.remove_leave("L2")
+    assert calendar.members_out("2026-10-22", "2026-10-23") == 0
+    assert not calendar.remove_leave("L2")
+
+
+def test_load_indexes_active_statuses_only():
+    leaves = [
+        {"employee_id": "E1", "start_date": "2026-10-20", "end_date": "2026-10-20", "status": "Approved by Manager"},
+        {"employee_id": "E2", "start_date": "2026-10-20", "end_date": "2026-10-20", "status": "Pending Approval"},
+        {"employee_id": "E3", "start_date": "2026-10-20", "end_date": "2026-10-20", "status": "Rejected"},
+        {"employee_id": "E4", "start_date": "2026-10-20", "end_date": "2026-10-20", "status": "Cancelled"},
+    ]
+    calendar = load_team_calendar("T1", ["E1", "E2", "E3", "E4"], leaves)
+    assert calendar.members_out("2026-10-20", "2026-10-20") == 2
+
+
+def test_normalize_status():
+    assert normalize_status("Approved") == "approved"
+    assert normalize_status("Applied") == "pending"
+    assert normalize_status("Pending Approval") == "pending"
+    assert normalize_status("Cancelled by employee") == "cancelled"
+    assert normalize_status("REJECTED") == "rejected"